@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Read merge sources directly from tar or zip archives.
+
+A source archive holds the same layout as an extracted source directory
+(optionally under one top-level directory):
+
+    nuimages-vru-coco/train/_annotations.coco.json
+    nuimages-vru-coco/train/<image files>
+    ...
+
+The member index is read once per archive (zip central directory, or one pass
+over a tar) and shared by every split. Images are extracted by reading members
+in archive order, so reads stay sequential even for compressed tars, while
+the destination files are written from a thread pool.
+
+Usage:
+    from archives import is_archive, open_archive, extract_members
+
+    python archives.py ARCHIVE   (lists the splits and image counts)
+"""
+
+import json
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+# Constants
+SPLITS = ['train', 'valid', 'test']
+ANNOTATIONS_FILE = '_annotations.coco.json'
+ARCHIVE_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz', '.zip')
+EXTRACT_WORKERS = 16
+
+
+def is_archive(path: Path) -> bool:
+    """True if path is a tar or zip archive file."""
+    path = Path(path)
+    return path.name.lower().endswith(ARCHIVE_SUFFIXES) and path.is_file()
+
+
+class SourceArchive:
+    """A tar or zip merge source with its member index loaded once."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.is_zip = zipfile.is_zipfile(self.path)
+
+        if self.is_zip:
+            self._archive = zipfile.ZipFile(self.path)
+            infos = self._archive.infolist()
+            self.members = {info.filename: info for info in infos if not info.is_dir()}
+        else:
+            self._archive = tarfile.open(self.path, 'r:*')
+            infos = self._archive.getmembers()
+            self.members = {info.name: info for info in infos if info.isfile()}
+
+        self.root = self._find_root()
+
+    def __repr__(self) -> str:
+        return f"SourceArchive({self.path}, {len(self.members):,} members)"
+
+    def _find_root(self) -> str:
+        """Directory prefix holding the split directories ('' or 'dir/')."""
+        for name in self.members:
+            parts = name.split('/')
+            if len(parts) >= 2 and parts[-1] == ANNOTATIONS_FILE and parts[-2] in SPLITS:
+                return '/'.join(parts[:-2]) + '/' if len(parts) > 2 else ''
+        raise ValueError(f"No <split>/{ANNOTATIONS_FILE} found in {self.path}")
+
+    def member_name(self, split: str, file_name: str) -> str:
+        return f"{self.root}{split}/{file_name}"
+
+    def offset(self, name: str) -> int:
+        """Position of a member in the archive (for sequential read order)."""
+        info = self.members[name]
+        return info.header_offset if self.is_zip else info.offset
+
+    def mtime(self, name: str) -> float:
+        info = self.members[name]
+        if self.is_zip:
+            return time.mktime(info.date_time + (0, 0, -1))
+        return info.mtime
+
+    def read(self, name: str) -> bytes:
+        """Read one member's contents."""
+        if self.is_zip:
+            return self._archive.read(self.members[name])
+        with self._archive.extractfile(self.members[name]) as f:
+            return f.read()
+
+    def load_annotations(self, split: str) -> dict:
+        """Load a split's COCO annotations from the archive."""
+        return json.loads(self.read(self.member_name(split, ANNOTATIONS_FILE)))
+
+    def split_files(self, split: str) -> List[str]:
+        """Image file names of a split."""
+        prefix = f"{self.root}{split}/"
+        return [name[len(prefix):] for name in self.members
+                if name.startswith(prefix) and name[len(prefix):] != ANNOTATIONS_FILE
+                and '/' not in name[len(prefix):]]
+
+
+@lru_cache(maxsize=None)
+def _open_archive(path: str) -> SourceArchive:
+    return SourceArchive(Path(path))
+
+
+def open_archive(path: Path) -> SourceArchive:
+    """Open an archive, reusing the already-indexed instance for the same path."""
+    return _open_archive(str(Path(path).resolve()))
+
+
+def write_member(dst: Path, data: bytes, mtime: float, tmp_suffix: str):
+    """Write one extracted member atomically, keeping its modification time."""
+    tmp = dst.with_name(dst.name + tmp_suffix)
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.utime(tmp, (mtime, mtime))
+    os.replace(tmp, dst)
+
+
+def extract_members(archive: SourceArchive, jobs: List[Tuple[str, Path]],
+                    skip_existing: bool = True, workers: int = EXTRACT_WORKERS,
+                    tmp_suffix: str = '.part') -> Iterator[Tuple[int, str]]:
+    """
+    Extract (member name, destination) jobs.
+
+    Members are read one at a time in archive order and their destination
+    writes run on a thread pool, with at most 2 * workers writes in flight.
+    Yields (job index, outcome) as jobs complete, where outcome is 'copied',
+    'skipped' (destination exists) or 'missing' (not in the archive).
+    """
+    order = []
+    for index, (name, dst) in enumerate(jobs):
+        if name not in archive.members:
+            yield index, 'missing'
+        elif skip_existing and os.path.lexists(dst):
+            yield index, 'skipped'
+        else:
+            order.append(index)
+    order.sort(key=lambda index: archive.offset(jobs[index][0]))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for index in order:
+            name, dst = jobs[index]
+            data = archive.read(name)
+            in_flight.append((index, pool.submit(write_member, Path(dst), data,
+                                                 archive.mtime(name), tmp_suffix)))
+            if len(in_flight) >= 2 * workers:
+                done_index, future = in_flight.popleft()
+                future.result()
+                yield done_index, 'copied'
+        while in_flight:
+            done_index, future = in_flight.popleft()
+            future.result()
+            yield done_index, 'copied'
+
+
+def main() -> int:
+    if len(sys.argv) != 2:
+        print("Usage: python archives.py ARCHIVE")
+        return 2
+
+    start = time.perf_counter()
+    archive = open_archive(Path(sys.argv[1]))
+    print(f"{archive.path}: {len(archive.members):,} members "
+          f"(indexed in {time.perf_counter() - start:.1f}s), root '{archive.root}'")
+    for split in SPLITS:
+        name = archive.member_name(split, ANNOTATIONS_FILE)
+        if name not in archive.members:
+            print(f"  {split}: (missing)")
+            continue
+        data = archive.load_annotations(split)
+        print(f"  {split}: {len(data['images']):,} images, {len(data['annotations']):,} annotations, "
+              f"{len(archive.split_files(split)):,} image files")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
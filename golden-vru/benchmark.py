@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Golden-VRU dataset tooling on synthetic data.
+
+Generates golden-vru-shaped splits (same categories, `source` tags, split
+ratios, resolutions, density and size distributions as STATS.md) with tiny
+stub image files, then times each tooling stage end to end:
+
+1. load_coco_annotations
+2. filter_small_objects
+3. separate_rsud_data
+4. validate_split
+5. merge_split
+
+Each stage must sustain a minimum throughput (images/s); the run exits
+non-zero when any stage regresses past its threshold.
+
+Usage:
+    python benchmark.py [--scale 70k|700k|7m] [--all] [--thresholds FILE]
+                        [--workdir DIR] [--keep] [--output FILE]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import extract_rsud
+import filter_small_objects
+import merge_nuimages
+import validate_dataset
+
+# Constants
+SPLITS = ['train', 'valid', 'test']
+SCALES = {
+    '70k': 70_000,
+    '700k': 700_000,
+    '7m': 7_000_000,
+}
+SEED = 42
+
+CATEGORIES = [
+    {'id': 0, 'name': 'pedestrian', 'supercategory': 'person'},
+    {'id': 1, 'name': 'cyclist', 'supercategory': 'vehicle'},
+]
+CYCLIST_RATIO = 0.222
+
+# Split ratios (v9.0: 55,878 / 7,013 / 7,005)
+SPLIT_RATIOS = {'train': 0.800, 'valid': 0.100, 'test': 0.100}
+
+# Source mix and resolution (v8.0, which still contains RSUD20K)
+SOURCES = {
+    'nuimages': {'weight': 45677, 'width': 1600, 'height': 900},
+    'bdd100k': {'weight': 21326, 'width': 1280, 'height': 720},
+    'rsud20k': {'weight': 15961, 'width': 1280, 'height': 720},
+    'cityscapes': {'weight': 2893, 'width': 2048, 'height': 1024},
+}
+
+# Annotations per image (DATASET_REPORT.md density table)
+DENSITY_BUCKETS = [
+    (0.700, 1, 3),
+    (0.264, 4, 10),
+    (0.030, 11, 20),
+    (0.006, 21, 40),
+]
+
+# Size mix before filtering (v6.0 -> v7.0 removed 31.1% small objects,
+# the remainder is 79.9% medium / 20.1% large)
+SMALL_RATIO = 0.311
+MEDIUM_RATIO = (1 - SMALL_RATIO) * 0.799
+SIZE_SMALL = 32 * 32
+SIZE_MEDIUM = 96 * 96
+SIZE_LARGE_MAX = 400 * 400
+
+# Images added by the merge stage, as a fraction of the golden split
+MERGE_FRACTION = 0.1
+
+# Minimum throughput per stage (images/s)
+THRESHOLDS = {
+    'load_coco_annotations': 20_000,
+    'filter_small_objects': 100_000,
+    'separate_rsud_data': 100_000,
+    'validate_split': 5_000,
+    'merge_split': 1_000,
+}
+
+STUB_BYTES = {
+    '.jpg': b'\xff\xd8\xff\xd9',
+    '.png': b'\x89PNG\r\n\x1a\n',
+}
+
+CAMERAS = ['CAM_FRONT', 'CAM_FRONT_LEFT', 'CAM_FRONT_RIGHT',
+           'CAM_BACK', 'CAM_BACK_LEFT', 'CAM_BACK_RIGHT']
+CITIES = ['aachen', 'bochum', 'bremen', 'cologne', 'frankfurt', 'munster']
+
+
+def pick_weighted(rng: random.Random, items: List[str], cum_weights: List[float]) -> str:
+    """Pick an item from a cumulative weight table."""
+    return rng.choices(items, cum_weights=cum_weights)[0]
+
+
+def make_file_name(source: str, index: int, rng: random.Random) -> str:
+    """Build a file name following the naming convention of each source."""
+    if source == 'nuimages':
+        return f"nuimages_{rng.choice(CAMERAS)}_{1526915243000000 + index * 50000}.jpg"
+    if source == 'cityscapes':
+        return f"cityscapes_{rng.choice(CITIES)}_{index // 30:06d}_{index % 30:06d}.png"
+    if source == 'rsud20k':
+        return f"rsud20k_{index:08d}.jpg"
+    return f"{index:08x}-{rng.getrandbits(32):08x}.jpg"
+
+
+def sample_box_count(rng: random.Random) -> int:
+    """Sample the number of annotations for an image."""
+    r = rng.random()
+    for weight, low, high in DENSITY_BUCKETS:
+        if r < weight:
+            return rng.randint(low, high)
+        r -= weight
+    return 1
+
+
+def sample_area(rng: random.Random) -> float:
+    """Sample an annotation area (log-uniform within its COCO size bucket)."""
+    r = rng.random()
+    if r < SMALL_RATIO:
+        low, high = 64, SIZE_SMALL
+    elif r < SMALL_RATIO + MEDIUM_RATIO:
+        low, high = SIZE_SMALL, SIZE_MEDIUM
+    else:
+        low, high = SIZE_MEDIUM, SIZE_LARGE_MAX
+    return math.exp(rng.uniform(math.log(low), math.log(high)))
+
+
+def generate_records(num_images: int, first_image_id: int, first_ann_id: int,
+                     seed: int, sources: Dict[str, dict] = None
+                     ) -> Iterator[Tuple[dict, List[dict]]]:
+    """Yield (image, annotations) pairs for a synthetic split."""
+    rng = random.Random(seed)
+    sources = sources or SOURCES
+    names = list(sources)
+    cum_weights = []
+    total = 0
+    for name in names:
+        total += sources[name]['weight']
+        cum_weights.append(total)
+
+    ann_id = first_ann_id
+    for index in range(num_images):
+        source = pick_weighted(rng, names, cum_weights)
+        width = sources[source]['width']
+        height = sources[source]['height']
+        image = {
+            'id': first_image_id + index,
+            'file_name': make_file_name(source, first_image_id + index, rng),
+            'width': width,
+            'height': height,
+            'source': source,
+        }
+
+        annotations = []
+        for _ in range(sample_box_count(rng)):
+            category_id = 1 if rng.random() < CYCLIST_RATIO else 0
+            area = sample_area(rng)
+            aspect = rng.uniform(0.3, 0.6) if category_id == 0 else rng.uniform(0.5, 1.2)
+            w = min(math.sqrt(area * aspect), width)
+            h = min(area / w, height)
+            x = rng.uniform(0, width - w)
+            y = rng.uniform(0, height - h)
+            annotations.append({
+                'id': ann_id,
+                'image_id': image['id'],
+                'category_id': category_id,
+                'bbox': [round(x, 2), round(y, 2), round(w, 2), round(h, 2)],
+                'area': round(w * h, 2),
+                'iscrowd': 0,
+            })
+            ann_id += 1
+
+        yield image, annotations
+
+
+def write_split(split_dir: Path, num_images: int, seed: int,
+                sources: Dict[str, dict] = None) -> Dict[str, int]:
+    """
+    Write a synthetic split (annotations + stub images) to disk.
+
+    The annotation file is streamed: images are written directly and
+    annotations are spooled to a side file, so memory stays flat at any scale.
+    """
+    split_dir.mkdir(parents=True, exist_ok=True)
+    ann_path = split_dir / '_annotations.coco.json'
+    spool_path = split_dir / '_annotations.spool'
+
+    num_annotations = 0
+    with open(ann_path, 'w') as out, open(spool_path, 'w') as spool:
+        out.write('{"categories": ')
+        json.dump(CATEGORIES, out)
+        out.write(', "images": [')
+
+        for index, (image, annotations) in enumerate(generate_records(num_images, 0, 0, seed, sources)):
+            if index:
+                out.write(', ')
+            json.dump(image, out)
+
+            for ann in annotations:
+                if num_annotations:
+                    spool.write(', ')
+                json.dump(ann, spool)
+                num_annotations += 1
+
+            (split_dir / image['file_name']).write_bytes(STUB_BYTES[Path(image['file_name']).suffix])
+
+        out.write('], "annotations": [')
+        spool.close()
+        with open(spool_path, 'r') as spool_in:
+            shutil.copyfileobj(spool_in, out)
+        out.write(']}')
+
+    spool_path.unlink()
+    return {'images': num_images, 'annotations': num_annotations}
+
+
+def generate_dataset(root: Path, scale: int, seed: int = SEED) -> Dict[str, Dict[str, int]]:
+    """Generate golden-vru and a nuImages-style merge source under root."""
+    counts = {}
+    for offset, split in enumerate(SPLITS):
+        num_images = int(scale * SPLIT_RATIOS[split])
+        counts[split] = write_split(root / 'golden-vru' / split, num_images, seed + offset)
+
+        merge_images = max(1, int(num_images * MERGE_FRACTION))
+        nuimages_only = {'nuimages': dict(SOURCES['nuimages'], weight=1)}
+        write_split(root / 'nuimages' / split, merge_images, seed + 100 + offset, nuimages_only)
+    return counts
+
+
+@contextlib.contextmanager
+def patched_paths(golden_dir: Path, nuimages_dir: Path):
+    """Point the tooling modules at the synthetic dataset."""
+    modules = [extract_rsud, filter_small_objects, merge_nuimages, validate_dataset]
+    saved = [(module, module.BASE_DIR) for module in modules]
+    saved_nuimages = merge_nuimages.NUIMAGES_DIR
+    try:
+        for module in modules:
+            module.BASE_DIR = golden_dir
+        merge_nuimages.NUIMAGES_DIR = nuimages_dir
+        yield
+    finally:
+        for module, base_dir in saved:
+            module.BASE_DIR = base_dir
+        merge_nuimages.NUIMAGES_DIR = saved_nuimages
+
+
+def timed(func, *args, **kwargs):
+    """Run func with its console output suppressed, returning (result, seconds)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+    return result, elapsed
+
+
+def run_stages(split: str) -> Dict[str, float]:
+    """Time every tooling stage on one split, returning seconds per stage."""
+    timings = {}
+
+    data, timings['load_coco_annotations'] = timed(filter_small_objects.load_coco_annotations, split)
+    _, timings['filter_small_objects'] = timed(filter_small_objects.filter_small_objects, data)
+    _, timings['separate_rsud_data'] = timed(extract_rsud.separate_rsud_data, data)
+    del data
+
+    _, timings['validate_split'] = timed(validate_dataset.validate_split, split)
+    _, timings['merge_split'] = timed(merge_nuimages.merge_split, split, dry_run=False)
+
+    return timings
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def benchmark_scale(label: str, scale: int, workdir: Path, keep: bool = False) -> dict:
+    """Generate one scale, run all stages and return the results."""
+    root = workdir / f"scale-{label}"
+    print(f"\n{'='*60}")
+    print(f"Scale {label}: {scale:,} images")
+    print(f"{'='*60}")
+
+    start = time.perf_counter()
+    counts = generate_dataset(root, scale)
+    print(f"  Generated in {time.perf_counter() - start:.1f}s "
+          f"({sum(c['annotations'] for c in counts.values()):,} annotations)")
+
+    totals = {stage: 0.0 for stage in THRESHOLDS}
+    try:
+        with patched_paths(root / 'golden-vru', root / 'nuimages'):
+            for split in SPLITS:
+                timings = run_stages(split)
+                for stage, seconds in timings.items():
+                    totals[stage] += seconds
+                print(f"  {split:<6} " + ", ".join(f"{stage} {seconds:.2f}s"
+                                                   for stage, seconds in timings.items()))
+    finally:
+        if not keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    num_images = sum(c['images'] for c in counts.values())
+    throughput = {stage: num_images / seconds if seconds > 0 else float('inf')
+                  for stage, seconds in totals.items()}
+
+    return {
+        'scale': label,
+        'images': num_images,
+        'annotations': sum(c['annotations'] for c in counts.values()),
+        'seconds': totals,
+        'images_per_second': throughput,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def check_thresholds(result: dict, thresholds: Dict[str, float]) -> List[str]:
+    """Return the stages whose throughput fell below the configured minimum."""
+    failures = []
+    for stage, minimum in thresholds.items():
+        actual = result['images_per_second'].get(stage)
+        if actual is not None and actual < minimum:
+            failures.append(f"{result['scale']} {stage}: {actual:,.0f} img/s < {minimum:,.0f} img/s")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark Golden-VRU tooling on synthetic data')
+    parser.add_argument('--scale', choices=list(SCALES), default='70k',
+                        help='Dataset size to generate (default: 70k)')
+    parser.add_argument('--all', action='store_true',
+                        help='Run every scale (70k, 700k, 7m)')
+    parser.add_argument('--thresholds', type=Path,
+                        help='JSON file of minimum images/s per stage')
+    parser.add_argument('--workdir', type=Path,
+                        help='Directory for generated data (default: temporary)')
+    parser.add_argument('--keep', action='store_true',
+                        help='Keep generated data after the run')
+    parser.add_argument('--output', type=Path,
+                        help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    thresholds = dict(THRESHOLDS)
+    if args.thresholds:
+        with open(args.thresholds, 'r') as f:
+            thresholds.update(json.load(f))
+
+    print("=" * 60)
+    print("Golden-VRU Tooling Benchmark")
+    print("=" * 60)
+
+    labels = list(SCALES) if args.all else [args.scale]
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix='golden-vru-bench-'))
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    failures = []
+    for label in labels:
+        result = benchmark_scale(label, SCALES[label], workdir, keep=args.keep)
+        results.append(result)
+        failures.extend(check_thresholds(result, thresholds))
+
+    if not args.keep and args.workdir is None:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # Print summary
+    print("\n" + "=" * 60)
+    print("BENCHMARK SUMMARY (images/s)")
+    print("=" * 60)
+    print(f"\n{'Stage':<24} {'Minimum':>10} " + " ".join(f"{r['scale']:>10}" for r in results))
+    print("-" * 60)
+    for stage in THRESHOLDS:
+        print(f"{stage:<24} {thresholds[stage]:>10,.0f} "
+              + " ".join(f"{r['images_per_second'][stage]:>10,.0f}" for r in results))
+    print("-" * 60)
+    print(f"{'Peak RSS (MB)':<24} {'':>10} " + " ".join(f"{r['peak_rss_mb']:>10,.0f}" for r in results))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'thresholds': thresholds, 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if failures:
+        print("\n[FAIL] Throughput regressions:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+
+    print("\n[PASS] All stages above their throughput thresholds")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Diff Golden-VRU annotations between dataset versions.
+
+Image and annotation IDs are remapped between versions (merge offsets, re-
+splits), so records are compared by content instead:
+
+- images by `file_name`
+- boxes by (file_name, category name, bbox rounded to --decimals places),
+  with an occurrence index so exact duplicate boxes are counted separately
+
+Every key becomes one row of an integer array (file names and category
+names are coded against the union of both versions); both versions' rows are
+lexsorted together, so a key present in both ends up in adjacent rows.
+Within an image kept in both versions, removed and added boxes of the same
+category are paired up as `changed` boxes.
+
+The result is reported per split and per source and checked against
+STATS.md: the split tables of both versions, and what the version is claimed
+to have done (e.g. v9.0 only removed RSUD20K, v7.0 only removed boxes under
+1024 px²).
+
+Versions are backup files next to each split's annotations
+(_annotations.coco.v8.0.json) or `current` (_annotations.coco.json).
+
+Usage:
+    python diff_versions.py OLD [NEW] [--decimals 1] [--output FILE.json]
+    python diff_versions.py v8.0            (v8.0 -> current)
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from collections import defaultdict
+from itertools import chain
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Constants
+BASE_DIR = Path(__file__).parent
+SPLITS = ['train', 'valid', 'test']
+STATS_PATH = BASE_DIR / 'STATS.md'
+CURRENT = 'current'
+SMALL_AREA = 32 * 32
+
+KEY_COLUMNS = ('image', 'category', 'x', 'y', 'w', 'h', 'occurrence')
+IMAGE, CATEGORY, OCCURRENCE = 0, 1, 6
+
+# What each version change did (STATS.md "Version History"), as checkable rules:
+# added_sources / removed_sources: sources images may be added / removed from
+# (None = any); changed: whether kept images may change; removed_box_max_area:
+# removed boxes must be smaller than this
+VERSION_CLAIMS = {
+    'v9.0': {'from': 'v8.0', 'added_sources': set(), 'removed_sources': {'rsud20k'},
+             'removes_all_of': {'rsud20k'}, 'changed': False},
+    'v8.0': {'from': 'v7.0', 'added_sources': {'nuimages'}, 'removed_sources': set(),
+             'changed': False},
+    'v7.0': {'from': 'v6.0', 'added_sources': set(), 'removed_sources': None,
+             'changed': True, 'removed_box_max_area': SMALL_AREA},
+}
+
+
+def version_path(split_dir: Path, version: str) -> Path:
+    if version == CURRENT:
+        return split_dir / '_annotations.coco.json'
+    return split_dir / f'_annotations.coco.{version}.json'
+
+
+def load_version(split_dir: Path, version: str) -> dict:
+    with open(version_path(split_dir, version), 'r') as f:
+        return json.load(f)
+
+
+# Keys
+
+def image_table(data: dict) -> Dict[str, np.ndarray]:
+    """Columns of a version's images, indexed like data['images']."""
+    images = data['images']
+    return {
+        'file_name': np.array([img['file_name'] for img in images], dtype=object),
+        'source': np.array([img.get('source', 'unknown') for img in images], dtype=object),
+        'size': np.array([(img.get('width') or 0, img.get('height') or 0) for img in images],
+                         dtype=np.int64).reshape(-1, 2),
+    }
+
+
+def box_keys(data: dict, name_codes: Dict[str, int], category_codes: Dict[str, int],
+             decimals: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Content keys of a version's annotations as an (n, len(KEY_COLUMNS)) int64
+    array (orphans are dropped), with the annotation areas.
+    """
+    file_by_id = {img['id']: img['file_name'] for img in data['images']}
+    category_names = {cat['id']: cat['name'] for cat in data['categories']}
+    anns = [ann for ann in data['annotations'] if ann['image_id'] in file_by_id]
+
+    keys = np.zeros((len(anns), len(KEY_COLUMNS)), dtype=np.int64)
+    keys[:, IMAGE] = np.fromiter((name_codes[file_by_id[ann['image_id']]] for ann in anns),
+                                 dtype=np.int64, count=len(anns))
+    keys[:, CATEGORY] = np.fromiter(
+        (category_codes[category_names.get(ann['category_id'], 'unknown')] for ann in anns),
+        dtype=np.int64, count=len(anns))
+    boxes = np.fromiter(chain.from_iterable(ann['bbox'][:4] for ann in anns),
+                        dtype=np.float64, count=4 * len(anns)).reshape(-1, 4)
+    keys[:, 2:6] = np.rint(boxes * 10 ** decimals)
+
+    # Number identical boxes 0, 1, ... so duplicates stay distinct keys
+    order = np.lexsort(keys[:, :OCCURRENCE].T[::-1])
+    starts = np.ones(len(order), dtype=bool)
+    starts[1:] = np.any(keys[order[1:], :OCCURRENCE] != keys[order[:-1], :OCCURRENCE], axis=1)
+    run_start = np.maximum.accumulate(np.where(starts, np.arange(len(order)), 0))
+    keys[order, OCCURRENCE] = np.arange(len(order)) - run_start
+
+    areas = np.fromiter((ann['area'] for ann in anns), dtype=np.float64, count=len(anns))
+    return keys, areas
+
+
+def matched_rows(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    For two arrays of unique key rows, which rows of a are in b and which rows
+    of b are in a (one lexsort of both; shared keys end up adjacent).
+    """
+    rows = np.concatenate([a, b])
+    order = np.lexsort(rows.T[::-1])
+    ordered = rows[order]
+    equal = np.all(ordered[1:] == ordered[:-1], axis=1)
+    matched = np.zeros(len(rows), dtype=bool)
+    matched[1:] |= equal
+    matched[:-1] |= equal
+    result = np.empty(len(rows), dtype=bool)
+    result[order] = matched
+    return result[:len(a)], result[len(a):]
+
+
+def diff_split(old: dict, new: dict, decimals: int = 1) -> dict:
+    """
+    Compare two versions of one split.
+
+    Returns per-source counts (by the new source for added/kept images, the
+    old source for removed ones) and the raw arrays the claim checks need.
+    """
+    old_images, new_images = image_table(old), image_table(new)
+    names, codes = np.unique(np.concatenate([old_images['file_name'], new_images['file_name']]).astype(str),
+                             return_inverse=True)
+    name_codes = {name: code for code, name in enumerate(names.tolist())}
+    categories = sorted({cat['name'] for cat in old['categories'] + new['categories']} | {'unknown'})
+    category_codes = {name: code for code, name in enumerate(categories)}
+
+    # Images: membership of file-name codes
+    old_codes, new_codes = codes[:len(old['images'])], codes[len(old['images']):]
+    old_kept = np.isin(old_codes, new_codes)
+    new_kept = np.isin(new_codes, old_codes)
+
+    old_keys, old_areas = box_keys(old, name_codes, category_codes, decimals)
+    new_keys, new_areas = box_keys(new, name_codes, category_codes, decimals)
+    old_matched, new_matched = matched_rows(old_keys, new_keys)
+    box_removed, box_added = ~old_matched, ~new_matched
+
+    # Source of every name code (new version wins) and kept-image flags
+    source_of = np.empty(len(names), dtype=object)
+    source_of[old_codes] = old_images['source']
+    source_of[new_codes] = new_images['source']
+    kept = np.zeros(len(names), dtype=bool)
+    kept[new_codes[new_kept]] = True
+
+    # Pair removed/added boxes of kept images per (image, category) as 'changed'
+    group = lambda keys: keys[:, IMAGE] * len(categories) + keys[:, CATEGORY]
+    removed_kept = box_removed & kept[old_keys[:, IMAGE]]
+    added_kept = box_added & kept[new_keys[:, IMAGE]]
+    size = len(names) * len(categories)
+    removed_per_group = np.bincount(group(old_keys[removed_kept]), minlength=size)
+    added_per_group = np.bincount(group(new_keys[added_kept]), minlength=size)
+    changed_per_group = np.minimum(removed_per_group, added_per_group)
+    changed_per_image = changed_per_group.reshape(len(names), len(categories)).sum(axis=1)
+
+    # An image kept in both versions changed if any of its boxes or its size did
+    touched = np.zeros(len(names), dtype=bool)
+    touched[old_keys[:, IMAGE][removed_kept]] = True
+    touched[new_keys[:, IMAGE][added_kept]] = True
+    old_size = np.zeros((len(names), 2), dtype=np.int64)
+    old_size[old_codes] = old_images['size']
+    resized = np.zeros(len(names), dtype=bool)
+    resized[new_codes] = np.any(old_size[new_codes] != new_images['size'], axis=1) & new_kept
+    changed_images = kept & (touched | resized)
+
+    per_source = defaultdict(lambda: defaultdict(int))
+
+    def count(key: str, image_codes: np.ndarray, weights: Optional[np.ndarray] = None):
+        sources = source_of[image_codes]
+        for source in np.unique(sources.astype(str)).tolist():
+            mask = sources == source
+            per_source[source][key] += int(weights[mask].sum() if weights is not None else mask.sum())
+
+    count('images_removed', old_codes[~old_kept])
+    count('images_added', new_codes[~new_kept])
+    count('images_changed', np.flatnonzero(changed_images))
+    count('images_unchanged', np.flatnonzero(kept & ~changed_images))
+    count('boxes_removed', old_keys[:, IMAGE][box_removed])
+    count('boxes_added', new_keys[:, IMAGE][box_added])
+    count('boxes_unchanged', new_keys[:, IMAGE][~box_added])
+    count('boxes_changed', np.flatnonzero(changed_per_image), changed_per_image[changed_per_image > 0])
+    for counts in per_source.values():
+        # Changed boxes were counted as one removal plus one addition
+        counts['boxes_removed'] -= counts['boxes_changed']
+        counts['boxes_added'] -= counts['boxes_changed']
+
+    return {
+        'sources': {source: dict(counts) for source, counts in sorted(per_source.items())},
+        'removed_image_sources': source_of[old_codes[~old_kept]].astype(str),
+        'added_image_sources': source_of[new_codes[~new_kept]].astype(str),
+        'old_sources': old_images['source'].astype(str),
+        'new_sources': new_images['source'].astype(str),
+        'removed_box_areas': old_areas[box_removed],
+        'changed_images': int(changed_images.sum()),
+        'counts': {'old': split_counts(old), 'new': split_counts(new)},
+    }
+
+
+def split_counts(data: dict) -> Tuple[int, int, int, int]:
+    """(images, annotations, pedestrian, cyclist) as in the STATS.md tables."""
+    names = {cat['id']: cat['name'] for cat in data['categories']}
+    per_class = defaultdict(int)
+    for ann in data['annotations']:
+        per_class[names.get(ann['category_id'])] += 1
+    return (len(data['images']), len(data['annotations']),
+            per_class['pedestrian'], per_class['cyclist'])
+
+
+# STATS.md claims
+
+def parse_stats_tables(path: Path) -> Tuple[Optional[str], Dict[str, Dict[str, Tuple[int, ...]]]]:
+    """
+    Current version and {version: {split: (images, annotations, pedestrian,
+    cyclist)}} from the per-split tables of STATS.md.
+    """
+    row = re.compile(r'^\|\s*(Train|Valid|Test)\s*\|\s*([\d,]+)\s*\|\s*([\d,]+)\s*\|'
+                     r'\s*([\d,]+)\s*\([\d.]+%\)\s*\|\s*([\d,]+)\s*\(')
+    current, version, tables = None, None, defaultdict(dict)
+    with open(path, 'r') as f:
+        for line in f:
+            match = re.match(r'^## Current Version:\s*(v[\d.]+)', line)
+            if match:
+                current = match.group(1)
+            match = re.match(r'^### (v[\d.]+)', line)
+            if match:
+                version = match.group(1)
+            match = row.match(line)
+            if match and version:
+                tables[version][match.group(1).lower()] = tuple(
+                    int(value.replace(',', '')) for value in match.groups()[1:])
+    return current, dict(tables)
+
+
+def check_claims(old_version: str, new_version: str, results: Dict[str, dict],
+                 tables: Dict[str, Dict[str, Tuple[int, ...]]]) -> List[Tuple[bool, str]]:
+    """(passed, message) for every STATS.md claim that applies to this diff."""
+    checks = []
+    for side, version in (('old', old_version), ('new', new_version)):
+        if version not in tables:
+            continue
+        for split, result in results.items():
+            claimed = tables[version].get(split)
+            if claimed is None:
+                continue
+            actual = result['counts'][side]
+            checks.append((actual == claimed,
+                           f"{version} {split}: images/annotations/pedestrian/cyclist "
+                           f"{'/'.join(f'{v:,}' for v in actual)}"
+                           + ('' if actual == claimed else f" (STATS.md: {'/'.join(f'{v:,}' for v in claimed)})")))
+
+    claim = VERSION_CLAIMS.get(new_version)
+    if claim is None or claim['from'] != old_version:
+        return checks
+
+    removed = np.concatenate([r['removed_image_sources'] for r in results.values()])
+    added = np.concatenate([r['added_image_sources'] for r in results.values()])
+    changed = sum(r['changed_images'] for r in results.values())
+
+    unexpected = sorted(set(added.tolist()) - claim['added_sources'])
+    checks.append((not unexpected, f"{new_version} adds images only from "
+                   f"{sorted(claim['added_sources']) or 'no source'}"
+                   + (f" (also added: {', '.join(unexpected)})" if unexpected else '')))
+    if claim['removed_sources'] is not None:
+        unexpected = sorted(set(removed.tolist()) - claim['removed_sources'])
+        checks.append((not unexpected, f"{new_version} removes images only from "
+                       f"{sorted(claim['removed_sources']) or 'no source'}"
+                       + (f" (also removed: {', '.join(unexpected)})" if unexpected else '')))
+    for source in sorted(claim.get('removes_all_of', ())):
+        left = sum(int((r['new_sources'] == source).sum()) for r in results.values())
+        checks.append((left == 0, f"{new_version} removes every {source} image"
+                       + (f" ({left:,} left)" if left else '')))
+    if not claim['changed']:
+        checks.append((changed == 0, f"{new_version} leaves kept images unchanged"
+                       + (f" ({changed:,} changed)" if changed else '')))
+    if 'removed_box_max_area' in claim:
+        areas = np.concatenate([r['removed_box_areas'] for r in results.values()])
+        too_large = int((areas >= claim['removed_box_max_area']).sum())
+        checks.append((too_large == 0, f"{new_version} removes only boxes with area < "
+                       f"{claim['removed_box_max_area']} px²"
+                       + (f" ({too_large:,} larger removed)" if too_large else '')))
+    return checks
+
+
+# Report
+
+COLUMNS = ['images_added', 'images_removed', 'images_changed', 'images_unchanged',
+           'boxes_added', 'boxes_removed', 'boxes_changed', 'boxes_unchanged']
+
+
+def print_table(title: str, sources: Dict[str, Dict[str, int]]):
+    print(f"\n{title}")
+    print(f"{'Source':<12} {'Img +':>8} {'Img -':>8} {'Img ~':>8} {'Img =':>8} "
+          f"{'Box +':>9} {'Box -':>9} {'Box ~':>8} {'Box =':>9}")
+    print("-" * 86)
+    totals = defaultdict(int)
+    for source, counts in sources.items():
+        print(f"{source:<12} " + ' '.join(f"{counts.get(col, 0):>{9 if col.startswith('boxes') and col != 'boxes_changed' else 8},}"
+                                          for col in COLUMNS))
+        for col in COLUMNS:
+            totals[col] += counts.get(col, 0)
+    print("-" * 86)
+    print(f"{'Total':<12} " + ' '.join(f"{totals[col]:>{9 if col.startswith('boxes') and col != 'boxes_changed' else 8},}"
+                                       for col in COLUMNS))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Diff annotations between dataset versions')
+    parser.add_argument('old', help="Old version (e.g. v8.0)")
+    parser.add_argument('new', nargs='?', default=CURRENT, help=f"New version (default: {CURRENT})")
+    parser.add_argument('--decimals', type=int, default=1, help='bbox rounding for box keys (default: 1)')
+    parser.add_argument('--output', type=Path, help='Write per-split, per-source counts as JSON')
+    args = parser.parse_args()
+
+    current, tables = parse_stats_tables(STATS_PATH) if STATS_PATH.exists() else (None, {})
+    resolve = lambda version: current if version == CURRENT and current else version
+    old_label, new_label = resolve(args.old), resolve(args.new)
+
+    print("=" * 60)
+    print(f"Golden-VRU Version Diff: {old_label} -> {new_label}")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    results = {}
+    for split in SPLITS:
+        split_dir = BASE_DIR / split
+        paths = [version_path(split_dir, v) for v in (args.old, args.new)]
+        missing = [p.name for p in paths if not p.exists()]
+        if missing:
+            print(f"\n{split}: skipped (missing {', '.join(missing)})")
+            continue
+        split_start = time.perf_counter()
+        results[split] = diff_split(load_version(split_dir, args.old), load_version(split_dir, args.new),
+                                    decimals=args.decimals)
+        print(f"\n{split}: diffed in {time.perf_counter() - split_start:.1f}s")
+        print_table(f"{split.capitalize()} by source", results[split]['sources'])
+
+    if not results:
+        print("\nNo split has both versions")
+        return 1
+
+    if len(results) > 1:
+        combined = defaultdict(lambda: defaultdict(int))
+        for result in results.values():
+            for source, counts in result['sources'].items():
+                for col, value in counts.items():
+                    combined[source][col] += value
+        print_table("All splits by source", dict(sorted(combined.items())))
+
+    checks = check_claims(old_label, new_label, results, tables)
+    if checks:
+        print("\nSTATS.md claims:")
+        for passed, message in checks:
+            print(f"  [{'OK' if passed else 'FAIL'}] {message}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({split: result['sources'] for split, result in results.items()}, f, indent=2)
+        print(f"\nCounts written to {args.output}")
+
+    print(f"\nDiffed in {time.perf_counter() - start:.1f}s")
+    return 0 if all(passed for passed, _ in checks) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
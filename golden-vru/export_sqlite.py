@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Export Golden-VRU annotations to an indexed SQLite database for ad-hoc queries.
+
+Bulk-loads every split's images, annotations and categories into
+golden_vru.sqlite, with indexes on split, image_id, source, category_id and
+area. Each split is reloaded only when its annotation fingerprint changes,
+both on export and before a query, so queries never read stale data.
+Annotations carry their image's `source` so per-source queries need no join.
+Splits without an annotation file and annotations without a valid
+[x, y, w, h] bbox are skipped with a warning.
+
+Usage:
+    python export_sqlite.py [--db PATH] [--force]
+    python export_sqlite.py query "SQL" [--db PATH]
+
+Example:
+    python export_sqlite.py query "SELECT COUNT(*) FROM annotations a
+        JOIN categories c ON c.split = a.split AND c.id = a.category_id
+        WHERE a.split = 'valid' AND a.source = 'cityscapes'
+        AND c.name = 'cyclist' AND a.area > 96 * 96"
+"""
+
+import argparse
+import contextlib
+import json
+import sqlite3
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fingerprint import annotation_path, fingerprint
+
+# Constants
+BASE_DIR = Path(__file__).parent
+SPLITS = ['train', 'valid', 'test']
+DB_PATH = BASE_DIR / 'golden_vru.sqlite'
+SIZE_SMALL = 32 * 32
+SIZE_MEDIUM = 96 * 96
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS splits (
+    split TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    images INTEGER NOT NULL,
+    annotations INTEGER NOT NULL,
+    loaded_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS categories (
+    split TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    supercategory TEXT,
+    PRIMARY KEY (split, id)
+);
+CREATE TABLE IF NOT EXISTS images (
+    split TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    file_name TEXT NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    source TEXT,
+    num_annotations INTEGER NOT NULL,
+    PRIMARY KEY (split, id)
+);
+CREATE TABLE IF NOT EXISTS annotations (
+    split TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    image_id INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    x REAL, y REAL, w REAL, h REAL,
+    area REAL NOT NULL,
+    iscrowd INTEGER,
+    source TEXT,
+    PRIMARY KEY (split, id)
+);
+"""
+
+INDEXES = {
+    'idx_images_split': 'images(split)',
+    'idx_images_source': 'images(source)',
+    'idx_annotations_split': 'annotations(split)',
+    'idx_annotations_image_id': 'annotations(image_id)',
+    'idx_annotations_source': 'annotations(source)',
+    'idx_annotations_category_id': 'annotations(category_id)',
+    'idx_annotations_area': 'annotations(area)',
+}
+
+
+def load_coco_annotations(split: str) -> dict:
+    """Load COCO annotations for a split."""
+    with open(annotation_path(split, BASE_DIR), 'r') as f:
+        return json.load(f)
+
+
+def connect(db_path: Optional[Path] = None) -> sqlite3.Connection:
+    """Open the annotation database, creating the schema if needed."""
+    conn = sqlite3.connect(db_path or DB_PATH)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def stored_fingerprints(conn: sqlite3.Connection) -> Dict[str, str]:
+    """Fingerprint each split was last loaded from."""
+    return dict(conn.execute('SELECT split, fingerprint FROM splits'))
+
+
+def create_indexes(conn: sqlite3.Connection):
+    for name, target in INDEXES.items():
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {target}')
+
+
+def drop_indexes(conn: sqlite3.Connection):
+    for name in INDEXES:
+        conn.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def valid_bbox(bbox: object) -> bool:
+    """True for an [x, y, w, h, ...] list of numbers."""
+    return (isinstance(bbox, (list, tuple)) and len(bbox) >= 4
+            and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in bbox[:4]))
+
+
+def load_split(conn: sqlite3.Connection, split: str, data: dict, split_fingerprint: str) -> int:
+    """
+    Replace a split's rows with the contents of data.
+
+    Annotations without a valid bbox are skipped; returns how many.
+    """
+    for table in ('splits', 'categories', 'images', 'annotations'):
+        conn.execute(f'DELETE FROM {table} WHERE split = ?', (split,))
+
+    conn.executemany(
+        'INSERT INTO categories VALUES (?, ?, ?, ?)',
+        ((split, cat['id'], cat['name'], cat.get('supercategory')) for cat in data['categories']))
+
+    annotations = [ann for ann in data['annotations'] if valid_bbox(ann.get('bbox'))]
+    ann_counts = Counter(ann['image_id'] for ann in annotations)
+    sources = {img['id']: img.get('source', 'unknown') for img in data['images']}
+
+    conn.executemany(
+        'INSERT INTO images VALUES (?, ?, ?, ?, ?, ?, ?)',
+        ((split, img['id'], img['file_name'], img.get('width'), img.get('height'),
+          sources[img['id']], ann_counts.get(img['id'], 0)) for img in data['images']))
+
+    conn.executemany(
+        'INSERT INTO annotations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        ((split, ann['id'], ann['image_id'], ann['category_id'], *ann['bbox'][:4],
+          ann['area'], ann.get('iscrowd', 0), sources.get(ann['image_id']))
+         for ann in annotations))
+
+    conn.execute('INSERT INTO splits VALUES (?, ?, ?, ?, ?)',
+                 (split, split_fingerprint, len(data['images']), len(annotations),
+                  datetime.now().isoformat(timespec='seconds')))
+    return len(data['annotations']) - len(annotations)
+
+
+def refresh(conn: sqlite3.Connection, splits: List[str] = None, force: bool = False) -> List[str]:
+    """
+    Reload splits whose annotation fingerprint changed since the last export.
+
+    Returns the splits that were reloaded.
+    """
+    stored = stored_fingerprints(conn)
+    current = {}
+    for split in splits or SPLITS:
+        path = annotation_path(split, BASE_DIR)
+        if not path.exists():
+            kept = ', keeping the previously loaded rows' if split in stored else ''
+            print(f"  [WARN] {split}: skipped (missing {path.name}){kept}")
+            continue
+        current[split] = fingerprint(path)
+    stale = [split for split in current if force or stored.get(split) != current[split]]
+
+    if not stale:
+        return []
+
+    # Bulk load without per-row index maintenance, then rebuild indexes once
+    conn.execute('PRAGMA synchronous = OFF')
+    with conn:
+        drop_indexes(conn)
+        for split in stale:
+            start = time.perf_counter()
+            data = load_coco_annotations(split)
+            skipped = load_split(conn, split, data, current[split])
+            print(f"  Loaded {split}: {len(data['images']):,} images, "
+                  f"{len(data['annotations']) - skipped:,} annotations in {time.perf_counter() - start:.1f}s")
+            if skipped:
+                print(f"  [WARN] {split}: skipped {skipped:,} annotations without a valid bbox")
+            del data
+        create_indexes(conn)
+    conn.execute('ANALYZE')
+    conn.execute('PRAGMA synchronous = FULL')
+    return stale
+
+
+# Distribution helpers (same results as the scripts' dict-based versions)
+
+def get_class_distribution(conn: sqlite3.Connection, split: str) -> Dict[str, int]:
+    """Get class distribution from annotations."""
+    return dict(conn.execute(
+        'SELECT c.name, COUNT(*) FROM annotations a '
+        'JOIN categories c ON c.split = a.split AND c.id = a.category_id '
+        'WHERE a.split = ? GROUP BY c.name', (split,)))
+
+
+def get_source_distribution(conn: sqlite3.Connection, split: str) -> Dict[str, int]:
+    """Get source distribution from images."""
+    return dict(conn.execute(
+        'SELECT source, COUNT(*) FROM images WHERE split = ? GROUP BY source', (split,)))
+
+
+def get_size_distribution(conn: sqlite3.Connection, split: str) -> Dict[str, int]:
+    """Get size distribution from annotations."""
+    row = conn.execute(
+        'SELECT SUM(area < ?), SUM(area >= ? AND area < ?), SUM(area >= ?) '
+        'FROM annotations WHERE split = ?',
+        (SIZE_SMALL, SIZE_SMALL, SIZE_MEDIUM, SIZE_MEDIUM, split)).fetchone()
+    return {'small': row[0] or 0, 'medium': row[1] or 0, 'large': row[2] or 0}
+
+
+def run_query(conn: sqlite3.Connection, sql: str):
+    """Run an ad-hoc query and print the rows with timing."""
+    start = time.perf_counter()
+    cursor = conn.execute(sql)
+    rows = cursor.fetchall()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if cursor.description:
+        print(' | '.join(col[0] for col in cursor.description))
+        print('-' * 60)
+    for row in rows:
+        print(' | '.join(str(v) for v in row))
+    print(f"\n{len(rows):,} row(s) in {elapsed_ms:.1f} ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Export Golden-VRU annotations to SQLite')
+    parser.add_argument('command', nargs='?', choices=['export', 'query'], default='export')
+    parser.add_argument('sql', nargs='?', help='SQL to run with the query command')
+    parser.add_argument('--db', type=Path, default=DB_PATH, help=f'Database path (default: {DB_PATH.name})')
+    parser.add_argument('--force', action='store_true', help='Reload every split')
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+
+    if args.command == 'query':
+        if not args.sql:
+            parser.error('query requires SQL')
+        # Reload stale splits first; progress goes to stderr to keep the rows clean
+        with contextlib.redirect_stdout(sys.stderr):
+            refresh(conn)
+        run_query(conn, args.sql)
+        return 0
+
+    print("=" * 60)
+    print("Golden-VRU SQLite Export")
+    print("=" * 60)
+    print(f"\nDatabase: {args.db}")
+
+    reloaded = refresh(conn, force=args.force)
+    if not reloaded:
+        print("  All splits up to date")
+
+    print(f"\n{'Split':<8} {'Images':>10} {'Annotations':>12} {'Pedestrian':>12} {'Cyclist':>10}")
+    print("-" * 56)
+    for split, images, annotations in conn.execute('SELECT split, images, annotations FROM splits'):
+        class_dist = get_class_distribution(conn, split)
+        print(f"{split.capitalize():<8} {images:>10,} {annotations:>12,} "
+              f"{class_dist.get('pedestrian', 0):>12,} {class_dist.get('cyclist', 0):>10,}")
+    print("-" * 56)
+
+    conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Export Golden-VRU annotations as per-image YOLO label files.
+
+For each split, writes yolo/<split>/labels/<image stem>.txt with one line per
+annotation:
+
+    <class index> <x_center> <y_center> <width> <height>
+
+with the bbox normalized by the image `width`/`height` (clipped to [0, 1]).
+Images without annotations get an empty label file (background images).
+Class indices follow the category order in the COCO file and are listed in
+yolo/classes.txt.
+
+Re-exports are incremental:
+- a split whose annotation fingerprint matches the last export is skipped
+- otherwise every label is rendered in memory and only files whose content
+  digest changed are written, in batches from a thread pool; labels of
+  images no longer in the split are deleted (also with --force)
+- two images that would share a label file (a.jpg and a.png) are an error,
+  as are annotations with an unknown category ID or on an image without a
+  positive width and height
+
+Usage:
+    python export_yolo.py [--output DIR] [--force] [--workers N]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fileops import bulk_delete, iter_batches
+from fingerprint import fingerprint
+from golden_vru import GoldenVRU, Split
+
+# Constants
+BASE_DIR = Path(__file__).parent
+SPLITS = ['train', 'valid', 'test']
+OUTPUT_DIR = BASE_DIR / 'yolo'
+MANIFEST_NAME = 'manifest.json'
+EXPORT_VERSION = 1  # Bump when the label format changes to force a full re-export
+WRITE_WORKERS = 16
+WRITE_BATCH = 256
+
+
+def yolo_line(class_index: int, bbox: List[float], width: int, height: int) -> str:
+    """One YOLO label line for a COCO [x, y, w, h] bbox."""
+    x, y, w, h = bbox[:4]
+    x_center = min(max((x + w / 2) / width, 0.0), 1.0)
+    y_center = min(max((y + h / 2) / height, 0.0), 1.0)
+    norm_w = min(max(w / width, 0.0), 1.0)
+    norm_h = min(max(h / height, 0.0), 1.0)
+    return f"{class_index} {x_center:.6f} {y_center:.6f} {norm_w:.6f} {norm_h:.6f}\n"
+
+
+def label_name(file_name: str) -> str:
+    """Label file name for an image file name."""
+    return os.path.splitext(file_name)[0] + '.txt'
+
+
+def render_labels(split: Split) -> Dict[str, str]:
+    """
+    Label file name -> label text for every image of a split.
+
+    Raises ValueError if two images map to the same label file (e.g. a.jpg
+    and a.png), since one label would silently overwrite the other, and for
+    annotations that cannot be normalized (unknown category ID, or an image
+    without a positive width and height).
+    """
+    class_index = {cat['id']: index for index, cat in enumerate(split.categories)}
+    by_image = split.annotations_by_image
+
+    labels = {}
+    image_of_label = {}
+    for img in split.images:
+        name = label_name(img['file_name'])
+        if name in image_of_label:
+            raise ValueError(f"{split.name}: {image_of_label[name]} and {img['file_name']} "
+                             f"would both be labeled by {name}")
+        image_of_label[name] = img['file_name']
+        anns = by_image.get(img['id'], ())
+        width, height = img.get('width'), img.get('height')
+        if anns and not (width and height and width > 0 and height > 0):
+            raise ValueError(f"{split.name}: {img['file_name']} has annotations but no valid "
+                             f"width/height ({width}x{height})")
+        lines = []
+        for ann in anns:
+            if ann['category_id'] not in class_index:
+                raise ValueError(f"{split.name}: annotation {ann['id']} of {img['file_name']} "
+                                 f"has unknown category ID {ann['category_id']}")
+            lines.append(yolo_line(class_index[ann['category_id']], ann['bbox'], width, height))
+        labels[name] = ''.join(lines)
+    return labels
+
+
+def label_digest(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def load_manifest(split_dir: Path) -> dict:
+    try:
+        with open(split_dir / MANIFEST_NAME, 'r') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return manifest if manifest.get('version') == EXPORT_VERSION else {}
+
+
+def save_manifest(split_dir: Path, manifest: dict):
+    path = split_dir / MANIFEST_NAME
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def write_classes(split: Split, output_dir: Path):
+    """Write classes.txt (one category name per class index)."""
+    with open(output_dir / 'classes.txt', 'w') as f:
+        f.write(''.join(f"{cat['name']}\n" for cat in split.categories))
+
+
+def _write_batch(label_dir: Path, batch: List[Tuple[str, str]]) -> int:
+    for name, text in batch:
+        with open(label_dir / name, 'w') as f:
+            f.write(text)
+    return len(batch)
+
+
+def write_labels(label_dir: Path, items: List[Tuple[str, str]], workers: int = WRITE_WORKERS) -> int:
+    """Write (name, text) label files in batches from a thread pool."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(lambda batch: _write_batch(label_dir, batch),
+                            iter_batches(items, WRITE_BATCH)))
+
+
+def export_split(split: Split, output_dir: Path, force: bool = False,
+                 workers: int = WRITE_WORKERS) -> Dict[str, int]:
+    """
+    Export one split's labels, writing only what changed since the last export.
+
+    Returns counts of written, unchanged and deleted label files, with
+    skipped=1 when the annotation fingerprint is unchanged. force re-renders
+    the split even then; the previous manifest is still used, so labels of
+    removed images are deleted either way.
+    """
+    split_dir = output_dir / split.name
+    label_dir = split_dir / 'labels'
+    stats = {'written': 0, 'unchanged': 0, 'deleted': 0, 'skipped': 0}
+
+    manifest = load_manifest(split_dir)
+    source_fingerprint = fingerprint(split.path)
+    if (not force and manifest.get('source_fingerprint') == source_fingerprint
+            and label_dir.is_dir()):
+        stats['skipped'] = 1
+        stats['unchanged'] = len(manifest['labels'])
+        return stats
+
+    labels = render_labels(split)
+    label_dir.mkdir(parents=True, exist_ok=True)
+    write_classes(split, output_dir)
+    previous = manifest.get('labels', {})
+    digests = {name: label_digest(text) for name, text in labels.items()}
+
+    changed = [(name, labels[name]) for name, digest in digests.items()
+               if previous.get(name) != digest]
+    stale = [name for name in previous if name not in digests]
+
+    stats['written'] = write_labels(label_dir, changed, workers) if changed else 0
+    stats['unchanged'] = len(labels) - len(changed)
+    if stale:
+        stats['deleted'] = bulk_delete(label_dir, stale)['deleted']
+
+    save_manifest(split_dir, {
+        'version': EXPORT_VERSION,
+        'source_fingerprint': source_fingerprint,
+        'labels': digests,
+    })
+    return stats
+
+
+def export_dataset(base_dir: Optional[Path] = None, output_dir: Optional[Path] = None,
+                   force: bool = False, workers: int = WRITE_WORKERS) -> Dict[str, Dict[str, int]]:
+    """Export every split; returns per-split stats."""
+    dataset = GoldenVRU(base_dir)
+    output_dir = Path(output_dir or dataset.base_dir / OUTPUT_DIR.name)
+
+    all_stats = {}
+    for split in dataset:
+        start = time.perf_counter()
+        stats = export_split(split, output_dir, force=force, workers=workers)
+        all_stats[split.name] = stats
+        state = 'unchanged, skipped' if stats['skipped'] else (
+            f"{stats['written']:,} written, {stats['unchanged']:,} unchanged, "
+            f"{stats['deleted']:,} deleted")
+        print(f"  {split.name}: {state} ({time.perf_counter() - start:.1f}s)")
+    return all_stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Export per-image YOLO label files')
+    parser.add_argument('--output', type=Path, default=OUTPUT_DIR,
+                        help=f'Output directory (default: {OUTPUT_DIR.name}/)')
+    parser.add_argument('--force', action='store_true', help='Re-render every split even if its annotations are unchanged')
+    parser.add_argument('--workers', type=int, default=WRITE_WORKERS,
+                        help=f'Writer threads (default: {WRITE_WORKERS})')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Golden-VRU YOLO Label Export")
+    print("=" * 60)
+    print(f"\nOutput: {args.output}\n")
+
+    start = time.perf_counter()
+    try:
+        all_stats = export_dataset(output_dir=args.output, force=args.force, workers=args.workers)
+    except ValueError as e:
+        print(f"\n[ERROR] {e}")
+        return 1
+
+    written = sum(s['written'] for s in all_stats.values())
+    print(f"\nExported {len(all_stats)} split(s) in {time.perf_counter() - start:.1f}s "
+          f"({written:,} label files written)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
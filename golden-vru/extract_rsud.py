@@ -4,40 +4,62 @@ Extract RSUD20K data from Golden-VRU dataset.
 
 Creates v9.0 by removing RSUD20K images and annotations and copying them
 to a separate directory at /mnt/data/rsud-vru/.
+
+A dry run writes the computed changes to plans/extract_rsud.plan.json
+(plan.py); `python extract_rsud.py apply <plan>` executes a reviewed plan
+without recomputing it, after checking the input fingerprints.
+
+With --apply, all file and annotation changes are planned in a write-ahead
+journal (journal.py) before any of them is made. Re-running --apply after an
+interruption resumes the journal; `python journal.py rollback extract_rsud`
+undoes the run.
+
+Splits are loaded through GoldenVRU (golden_vru.py); --compact loads them as
+compact records (records.py) to cut memory use.
 """
 
 import json
-import os
 import shutil
 from collections import defaultdict
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from fileops import count_existing
+from golden_vru import GoldenVRU
+from journal import Journal, print_delete_stats, print_next_steps, start_run
+from plan import PlanBuilder, apply_plan
+from records import json_default
 
 # Constants
 BASE_DIR = Path(__file__).parent
 RSUD_OUTPUT_DIR = Path('/mnt/data/rsud-vru')
 SPLITS = ['train', 'valid', 'test']
 SOURCE_TO_REMOVE = 'rsud20k'
+JOURNAL_NAME = 'extract_rsud'
 
 
-def load_coco_annotations(split: str) -> dict:
-    """Load COCO annotations for a split."""
-    ann_path = BASE_DIR / split / '_annotations.coco.json'
-    with open(ann_path, 'r') as f:
-        return json.load(f)
+def load_coco_annotations(split: str, compact: bool = False) -> dict:
+    """Load COCO annotations for a split (as compact records with compact=True)."""
+    return GoldenVRU(BASE_DIR, [split], compact=compact)[split].data
+
 
+def save_coco_annotations(data: dict, path: Path, journal: Optional[Journal] = None):
+    """Save COCO annotations to a file (or plan the write in a journal)."""
+    if journal is not None:
+        journal.plan_write_json(path, data)
+        return
 
-def save_coco_annotations(data: dict, path: Path):
-    """Save COCO annotations to a file."""
     with open(path, 'w') as f:
-        json.dump(data, f)
+        json.dump(data, f, default=json_default)
 
 
-def create_backup(split: str):
-    """Create a backup of the current annotations."""
+def create_backup(split: str, journal: Optional[Journal] = None):
+    """Create a backup of the current annotations (or plan it in a journal)."""
     ann_path = BASE_DIR / split / '_annotations.coco.json'
     backup_path = BASE_DIR / split / '_annotations.coco.v8.0.json'
-    if not backup_path.exists():
+    if journal is not None:
+        journal.plan_copy(ann_path, backup_path)
+    elif not backup_path.exists():
         shutil.copy(ann_path, backup_path)
         print(f"  Backup created: {backup_path.name}")
 
@@ -115,11 +137,17 @@ def separate_rsud_data(data: dict) -> Tuple[dict, dict, Dict[str, int]]:
     return remaining_data, rsud_data, stats
 
 
-def copy_rsud_images(split: str, file_names: List[str], dry_run: bool = True) -> int:
-    """Copy RSUD images to the rsud-vru directory."""
+def copy_rsud_images(split: str, file_names: List[str], dry_run: bool = True,
+                     journal: Optional[Journal] = None) -> int:
+    """Copy RSUD images to the rsud-vru directory (or plan the copies in a journal)."""
     src_dir = BASE_DIR / split
     dst_dir = RSUD_OUTPUT_DIR / split
 
+    if journal is not None:
+        for file_name in file_names:
+            journal.plan_copy(src_dir / file_name, dst_dir / file_name)
+        return len(file_names)
+
     if not dry_run:
         dst_dir.mkdir(parents=True, exist_ok=True)
 
@@ -135,19 +163,35 @@ def copy_rsud_images(split: str, file_names: List[str], dry_run: bool = True) ->
     return copied_count
 
 
-def delete_rsud_images(split: str, file_names: List[str], dry_run: bool = True) -> int:
-    """Delete RSUD images from golden-vru."""
+def delete_rsud_images(split: str, file_names: List[str], dry_run: bool = True,
+                       journal: Optional[Journal] = None) -> int:
+    """Plan deleting RSUD images from golden-vru in a journal, or count them (dry run)."""
     split_dir = BASE_DIR / split
-    deleted_count = 0
 
-    for file_name in file_names:
-        file_path = split_dir / file_name
-        if file_path.exists():
-            if not dry_run:
-                os.remove(file_path)
-            deleted_count += 1
+    if journal is not None:
+        for file_name in file_names:
+            journal.plan_delete(split_dir / file_name)
+        return len(file_names)
+
+    # Live deletes only go through the journal (renames into its trash)
+    if not dry_run:
+        raise ValueError("Image files are only deleted through a journal")
+
+    return count_existing(split_dir, file_names)
+
 
-    return deleted_count
+def add_to_plan(builder: PlanBuilder, split: str, data: dict, remaining_data: dict,
+                rsud_data: dict, stats: dict):
+    """Record a split's changes in a dry-run plan, in the same order as --apply."""
+    split_dir = BASE_DIR / split
+    ann_path = split_dir / '_annotations.coco.json'
+
+    builder.copy(ann_path, split_dir / '_annotations.coco.v8.0.json')
+    builder.copy_files(split_dir, RSUD_OUTPUT_DIR / split, stats['rsud_files'])
+    builder.write_selection(RSUD_OUTPUT_DIR / split / '_annotations.coco.json', ann_path, data, rsud_data)
+    builder.delete_files(split_dir, stats['rsud_files'])
+    builder.write_selection(ann_path, ann_path, data, remaining_data)
+    builder.set_summary(split, stats)
 
 
 def get_class_distribution(data: dict) -> Dict[str, int]:
@@ -162,18 +206,7 @@ def get_class_distribution(data: dict) -> Dict[str, int]:
     return dict(class_counts)
 
 
-def get_source_distribution(data: dict) -> Dict[str, int]:
-    """Get source distribution from images."""
-    source_counts = defaultdict(int)
-
-    for img in data['images']:
-        source = img.get('source', 'unknown')
-        source_counts[source] += 1
-
-    return dict(source_counts)
-
-
-def main(dry_run: bool = True):
+def main(dry_run: bool = True, compact: bool = False):
     """Main function to extract RSUD data from all splits."""
     print("=" * 60)
     print("Golden-VRU v9.0: Extract RSUD20K Data")
@@ -183,6 +216,13 @@ def main(dry_run: bool = True):
     print(f"Mode: {'DRY RUN' if dry_run else 'LIVE'}")
     print()
 
+    journal = None
+    builder = PlanBuilder(JOURNAL_NAME, base_dir=BASE_DIR) if dry_run else None
+    if not dry_run:
+        journal = start_run(JOURNAL_NAME)
+        if journal is None:
+            return
+
     all_stats = {}
     total_stats = {
         'original_images': 0,
@@ -193,16 +233,17 @@ def main(dry_run: bool = True):
         'remaining_annotations': 0,
     }
 
+    dataset = GoldenVRU(BASE_DIR, SPLITS, compact=compact)
     for split in SPLITS:
         print(f"\nProcessing {split}...")
         print("-" * 40)
 
         # Load annotations
-        data = load_coco_annotations(split)
+        data = dataset[split].data
         print(f"  Original: {len(data['images']):,} images, {len(data['annotations']):,} annotations")
 
         # Show source distribution before
-        source_dist = get_source_distribution(data)
+        source_dist = dataset[split].source_distribution
         print(f"  Sources: {source_dist}")
 
         # Separate RSUD data
@@ -225,26 +266,41 @@ def main(dry_run: bool = True):
                   f"cyclist {class_dist.get('cyclist', 0):,} "
                   f"({class_dist.get('cyclist', 0)/total_ann*100:.1f}%)")
 
-        if not dry_run:
-            # Create backup
-            create_backup(split)
+        if dry_run:
+            add_to_plan(builder, split, data, remaining_data, rsud_data, stats)
+        else:
+            # Plan backup
+            create_backup(split, journal=journal)
 
-            # Copy RSUD images to output directory
-            copied = copy_rsud_images(split, stats['rsud_files'], dry_run=False)
-            print(f"  Copied: {copied} RSUD images to {RSUD_OUTPUT_DIR / split}")
+            # Plan copying RSUD images to output directory
+            copied = copy_rsud_images(split, stats['rsud_files'], dry_run=False, journal=journal)
+            print(f"  Planned: copy {copied} RSUD images to {RSUD_OUTPUT_DIR / split}")
 
-            # Save RSUD annotations
+            # Plan saving RSUD annotations
             rsud_ann_path = RSUD_OUTPUT_DIR / split / '_annotations.coco.json'
-            save_coco_annotations(rsud_data, rsud_ann_path)
-            print(f"  Saved: RSUD annotations to {rsud_ann_path}")
-
-            # Delete RSUD images from golden-vru
-            deleted = delete_rsud_images(split, stats['rsud_files'], dry_run=False)
-            print(f"  Deleted: {deleted} RSUD images from golden-vru")
-
-            # Update golden-vru annotations
-            save_coco_annotations(remaining_data, BASE_DIR / split / '_annotations.coco.json')
-            print(f"  Saved: Updated golden-vru annotations")
+            save_coco_annotations(rsud_data, rsud_ann_path, journal=journal)
+            print(f"  Planned: RSUD annotations to {rsud_ann_path}")
+
+            # Plan deleting RSUD images from golden-vru
+            deleted = delete_rsud_images(split, stats['rsud_files'], dry_run=False, journal=journal)
+            print(f"  Planned: delete {deleted} RSUD images from golden-vru")
+
+            # Plan updating golden-vru annotations
+            save_coco_annotations(remaining_data, BASE_DIR / split / '_annotations.coco.json',
+                                  journal=journal)
+            print(f"  Planned: Updated golden-vru annotations")
+
+        # Only one split is held in memory: release this one before the next
+        del data, remaining_data, rsud_data
+        dataset[split].unload()
+
+    if journal is not None:
+        journal.finish_plan()
+        print(f"\nApplying {len(journal.ops):,} journaled operations...")
+        counts = journal.apply()
+        print(f"  Copied: {counts['copied']:,} RSUD images to {RSUD_OUTPUT_DIR}")
+        print_delete_stats(journal, 'RSUD images from golden-vru')
+        print(f"  Saved: {counts['written']:,} annotation files")
 
     # Print summary
     print("\n" + "=" * 60)
@@ -292,11 +348,16 @@ def main(dry_run: bool = True):
         print(f"[WARN] RSUD images: {actual_rsud:,} (expected {expected_rsud:,})")
 
     if dry_run:
+        plan_path = builder.save()
         print("\n*** DRY RUN - No changes were made ***")
-        print("Run with --apply to make changes")
+        print(f"Plan written: {plan_path}")
+        print(f"  Review: python plan.py show {plan_path}")
+        print(f"  Apply:  python extract_rsud.py apply {plan_path}")
+        print("Or run with --apply to recompute and make changes")
     else:
         print("\n*** Changes applied successfully ***")
         print(f"\nRSUD data extracted to: {RSUD_OUTPUT_DIR}")
+        print_next_steps(JOURNAL_NAME)
         print("\nNext steps:")
         print("  1. Run: python validate_dataset.py")
         print("  2. Update STATS.md and DATASET_REPORT.md")
@@ -310,9 +371,12 @@ def main(dry_run: bool = True):
 if __name__ == '__main__':
     import sys
 
+    if len(sys.argv) == 3 and sys.argv[1] == 'apply':
+        sys.exit(apply_plan(Path(sys.argv[2])))
+
     dry_run = '--apply' not in sys.argv
 
     if dry_run:
         print("Running in DRY RUN mode. Use --apply to make changes.\n")
 
-    main(dry_run=dry_run)
+    main(dry_run=dry_run, compact='--compact' in sys.argv)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Bulk file operations for Golden-VRU image directories.
+
+On network storage every stat/unlink is a round trip, so removing ~16k images
+one `exists()` + `os.remove()` at a time is dominated by latency. bulk_delete
+instead unlinks names relative to an open directory file descriptor
+(unlinkat) from a bounded thread pool, and treats ENOENT as already deleted
+rather than checking existence first.
+
+The dataset scripts delete images only through the journal (journal.py):
+applying a plan renames each image into the journal's trash, and bulk_delete
+purges that trash when the run is finished.
+
+Usage:
+    python fileops.py delete DIR FILE_LIST [--workers N]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
+
+# Constants
+DELETE_WORKERS = 16
+DELETE_BATCH = 256
+MAX_REPORTED_ERRORS = 5
+
+
+def iter_batches(items: Iterable, size: int) -> Iterator[list]:
+    """Yield lists of up to size items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _unlink_batch(dir_fd: int, names: List[str]) -> Dict[str, object]:
+    """Unlink names relative to dir_fd, counting outcomes."""
+    result = {'deleted': 0, 'missing': 0, 'failed': 0, 'errors': []}
+    for name in names:
+        try:
+            os.unlink(name, dir_fd=dir_fd)
+            result['deleted'] += 1
+        except FileNotFoundError:
+            result['missing'] += 1
+        except OSError as e:
+            result['failed'] += 1
+            if len(result['errors']) < MAX_REPORTED_ERRORS:
+                result['errors'].append(f"{name}: {e.strerror}")
+    return result
+
+
+def bulk_delete(directory: Path, file_names: Iterable[str],
+                workers: int = DELETE_WORKERS) -> Dict[str, object]:
+    """
+    Delete file_names (relative to directory) in parallel.
+
+    Returns counts of deleted, missing (ENOENT, treated as done) and failed
+    files, the first few error messages, elapsed seconds and files/s.
+    """
+    stats = {'deleted': 0, 'missing': 0, 'failed': 0, 'errors': []}
+    start = time.perf_counter()
+
+    dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Submit at most 2 * workers batches ahead so memory stays bounded
+            in_flight = []
+            for batch in iter_batches(file_names, DELETE_BATCH):
+                in_flight.append(pool.submit(_unlink_batch, dir_fd, batch))
+                if len(in_flight) >= 2 * workers:
+                    _merge_result(stats, in_flight.pop(0).result())
+            for future in in_flight:
+                _merge_result(stats, future.result())
+    finally:
+        os.close(dir_fd)
+
+    elapsed = time.perf_counter() - start
+    total = stats['deleted'] + stats['missing'] + stats['failed']
+    stats['seconds'] = elapsed
+    stats['files_per_second'] = total / elapsed if elapsed > 0 else 0.0
+    return stats
+
+
+def _merge_result(stats: Dict[str, object], result: Dict[str, object]):
+    for key in ('deleted', 'missing', 'failed'):
+        stats[key] += result[key]
+    room = MAX_REPORTED_ERRORS - len(stats['errors'])
+    stats['errors'].extend(result['errors'][:room])
+
+
+def count_existing(directory: Path, file_names: Iterable[str]) -> int:
+    """How many of file_names exist in directory (one scandir, no stat per file)."""
+    try:
+        with os.scandir(directory) as entries:
+            present = {entry.name for entry in entries}
+    except FileNotFoundError:
+        return 0
+    return sum(1 for name in file_names if name in present)
+
+
+def format_delete_stats(stats: Dict[str, object]) -> str:
+    """One-line summary of bulk_delete results."""
+    return (f"{stats['deleted']:,} deleted, {stats['missing']:,} missing, "
+            f"{stats['failed']:,} failed in {stats['seconds']:.1f}s "
+            f"({stats['files_per_second']:,.0f} files/s)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Bulk-delete files listed in a text file')
+    parser.add_argument('command', choices=['delete'])
+    parser.add_argument('directory', type=Path, help='Directory containing the files')
+    parser.add_argument('file_list', type=Path, help='Text file with one file name per line')
+    parser.add_argument('--workers', type=int, default=DELETE_WORKERS,
+                        help=f'Parallel unlink threads (default: {DELETE_WORKERS})')
+    args = parser.parse_args()
+
+    with open(args.file_list, 'r') as f:
+        names = [line.strip() for line in f if line.strip()]
+
+    print(f"Deleting {len(names):,} files from {args.directory}...")
+    stats = bulk_delete(args.directory, names, workers=args.workers)
+    print(f"  {format_delete_stats(stats)}")
+    for error in stats['errors']:
+        print(f"  [FAIL] {error}")
+
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,41 +4,64 @@ Filter small objects from Golden-VRU dataset.
 
 Creates v7.0 by removing annotations with area < 32² (1024 px²)
 and removing images that have no remaining annotations.
+
+A dry run writes the computed changes to plans/filter_small_objects.plan.json
+(plan.py); `python filter_small_objects.py apply <plan>` executes a reviewed
+plan without recomputing it, after checking the input fingerprints.
+
+With --apply, all file and annotation changes are planned in a write-ahead
+journal (journal.py) before any of them is made. Re-running --apply after an
+interruption resumes the journal; `python journal.py rollback
+filter_small_objects` undoes the run.
+
+Splits are loaded through GoldenVRU (golden_vru.py); --compact loads them as
+compact records (records.py) to cut memory use.
 """
 
 import json
-import os
 import shutil
 from collections import defaultdict
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from fileops import count_existing
+from golden_vru import GoldenVRU
+from journal import Journal, print_delete_stats, print_next_steps, start_run
+from plan import PlanBuilder, apply_plan
+from records import json_default
 
 # Constants
 BASE_DIR = Path(__file__).parent
 SPLITS = ['train', 'valid', 'test']
 SIZE_THRESHOLD = 32 * 32  # 1024 pixels - COCO small object threshold
+JOURNAL_NAME = 'filter_small_objects'
 
 
-def load_coco_annotations(split: str) -> dict:
-    """Load COCO annotations for a split."""
-    ann_path = BASE_DIR / split / '_annotations.coco.json'
-    with open(ann_path, 'r') as f:
-        return json.load(f)
+def load_coco_annotations(split: str, compact: bool = False) -> dict:
+    """Load COCO annotations for a split (as compact records with compact=True)."""
+    return GoldenVRU(BASE_DIR, [split], compact=compact)[split].data
 
 
-def save_coco_annotations(data: dict, split: str, backup: bool = True):
-    """Save COCO annotations for a split."""
+def save_coco_annotations(data: dict, split: str, backup: bool = True,
+                          journal: Optional[Journal] = None):
+    """Save COCO annotations for a split (or plan the write in a journal)."""
     ann_path = BASE_DIR / split / '_annotations.coco.json'
 
     # Create backup
     if backup:
         backup_path = BASE_DIR / split / '_annotations.coco.v6.0.json'
-        if not backup_path.exists():
+        if journal is not None:
+            journal.plan_copy(ann_path, backup_path)
+        elif not backup_path.exists():
             shutil.copy(ann_path, backup_path)
             print(f"  Backup created: {backup_path.name}")
 
+    if journal is not None:
+        journal.plan_write_json(ann_path, data)
+        return
+
     with open(ann_path, 'w') as f:
-        json.dump(data, f)
+        json.dump(data, f, default=json_default)
 
 
 def filter_small_objects(data: dict) -> Tuple[dict, Dict[str, int]]:
@@ -105,19 +128,33 @@ def filter_small_objects(data: dict) -> Tuple[dict, Dict[str, int]]:
     return filtered_data, stats
 
 
-def remove_image_files(split: str, file_names: List[str], dry_run: bool = False):
-    """Remove image files from the split directory."""
+def remove_image_files(split: str, file_names: List[str], dry_run: bool = True,
+                       journal: Optional[Journal] = None):
+    """Plan removing image files in a journal, or count the existing ones (dry run)."""
     split_dir = BASE_DIR / split
-    removed_count = 0
 
-    for file_name in file_names:
-        file_path = split_dir / file_name
-        if file_path.exists():
-            if not dry_run:
-                os.remove(file_path)
-            removed_count += 1
+    if journal is not None:
+        for file_name in file_names:
+            journal.plan_delete(split_dir / file_name)
+        return len(file_names)
+
+    # Live deletes only go through the journal (renames into its trash)
+    if not dry_run:
+        raise ValueError("Image files are only deleted through a journal")
 
-    return removed_count
+    return count_existing(split_dir, file_names)
+
+
+def add_to_plan(builder: PlanBuilder, split: str, data: dict, filtered_data: dict, stats: dict):
+    """Record a split's changes in a dry-run plan, in the same order as --apply."""
+    split_dir = BASE_DIR / split
+    ann_path = split_dir / '_annotations.coco.json'
+
+    builder.copy(ann_path, split_dir / '_annotations.coco.v6.0.json')
+    builder.write_selection(ann_path, ann_path, data, filtered_data)
+    if stats['removed_image_files']:
+        builder.delete_files(split_dir, stats['removed_image_files'])
+    builder.set_summary(split, stats)
 
 
 def get_class_distribution(data: dict) -> Dict[str, int]:
@@ -149,7 +186,7 @@ def get_size_distribution(data: dict) -> Dict[str, int]:
     return size_counts
 
 
-def main(dry_run: bool = False):
+def main(dry_run: bool = False, compact: bool = False):
     """Main function to filter small objects from all splits."""
     print("=" * 60)
     print("Golden-VRU v7.0: Filtering Small Objects")
@@ -158,6 +195,13 @@ def main(dry_run: bool = False):
     print(f"Mode: {'DRY RUN' if dry_run else 'LIVE'}")
     print()
 
+    journal = None
+    builder = PlanBuilder(JOURNAL_NAME, base_dir=BASE_DIR) if dry_run else None
+    if not dry_run:
+        journal = start_run(JOURNAL_NAME)
+        if journal is None:
+            return
+
     all_stats = {}
     total_stats = {
         'original_annotations': 0,
@@ -170,12 +214,13 @@ def main(dry_run: bool = False):
         'small_cyclist': 0,
     }
 
+    dataset = GoldenVRU(BASE_DIR, SPLITS, compact=compact)
     for split in SPLITS:
         print(f"\nProcessing {split}...")
         print("-" * 40)
 
         # Load annotations
-        data = load_coco_annotations(split)
+        data = dataset[split].data
         print(f"  Original: {len(data['images']):,} images, {len(data['annotations']):,} annotations")
 
         # Filter small objects
@@ -204,15 +249,28 @@ def main(dry_run: bool = False):
         print(f"  Size distribution: small {size_dist['small']:,}, "
               f"medium {size_dist['medium']:,}, large {size_dist['large']:,}")
 
-        if not dry_run:
-            # Save filtered annotations
-            save_coco_annotations(filtered_data, split)
-            print(f"  Saved: _annotations.coco.json")
+        if dry_run:
+            add_to_plan(builder, split, data, filtered_data, stats)
+        else:
+            # Plan saving filtered annotations
+            save_coco_annotations(filtered_data, split, journal=journal)
+            print(f"  Planned: _annotations.coco.json")
 
-            # Remove image files
+            # Plan removing image files
             if stats['removed_image_files']:
-                removed = remove_image_files(split, stats['removed_image_files'])
-                print(f"  Deleted: {removed} image files")
+                removed = remove_image_files(split, stats['removed_image_files'], journal=journal)
+                print(f"  Planned: delete {removed} image files")
+
+        # Only one split is held in memory: release this one before the next
+        del data, filtered_data
+        dataset[split].unload()
+
+    if journal is not None:
+        journal.finish_plan()
+        print(f"\nApplying {len(journal.ops):,} journaled operations...")
+        counts = journal.apply()
+        print(f"  Saved: {counts['written']:,} annotation files")
+        print_delete_stats(journal)
 
     # Print summary
     print("\n" + "=" * 60)
@@ -234,7 +292,6 @@ def main(dry_run: bool = False):
     print("-" * 60)
 
     for split in SPLITS:
-        data = load_coco_annotations(split) if not dry_run else None
         if dry_run:
             # Recalculate from stats
             imgs = all_stats[split]['final_images']
@@ -242,20 +299,27 @@ def main(dry_run: bool = False):
             # We'd need to track these separately for dry run
             print(f"{split.capitalize():<8} {imgs:>10,} {anns:>12,}")
         else:
-            class_dist = get_class_distribution(data)
+            # The split's file was rewritten, so its data and views are reloaded
+            class_dist = dataset[split].class_distribution
             total = sum(class_dist.values())
             ped = class_dist.get('pedestrian', 0)
             cyc = class_dist.get('cyclist', 0)
-            print(f"{split.capitalize():<8} {len(data['images']):>10,} {total:>12,} "
+            print(f"{split.capitalize():<8} {len(dataset[split].images):>10,} {total:>12,} "
                   f"{ped:>12,} ({ped/total*100:.1f}%) {cyc:>10,} ({cyc/total*100:.1f}%)")
+            dataset[split].unload()
 
     print("-" * 60)
 
     if dry_run:
+        plan_path = builder.save()
         print("\n*** DRY RUN - No changes were made ***")
-        print("Run with --apply to make changes")
+        print(f"Plan written: {plan_path}")
+        print(f"  Review: python plan.py show {plan_path}")
+        print(f"  Apply:  python filter_small_objects.py apply {plan_path}")
+        print("Or run with --apply to recompute and make changes")
     else:
         print("\n*** Changes applied successfully ***")
+        print_next_steps(JOURNAL_NAME)
         print("\nNext steps:")
         print("  1. Update STATS.md with new v7.0 statistics")
         print("  2. Run: git add -A && git commit -m 'v7.0: Remove small objects'")
@@ -267,9 +331,12 @@ def main(dry_run: bool = False):
 if __name__ == '__main__':
     import sys
 
+    if len(sys.argv) == 3 and sys.argv[1] == 'apply':
+        sys.exit(apply_plan(Path(sys.argv[2])))
+
     dry_run = '--apply' not in sys.argv
 
     if dry_run:
         print("Running in DRY RUN mode. Use --apply to make changes.\n")
 
-    main(dry_run=dry_run)
+    main(dry_run=dry_run, compact='--compact' in sys.argv)
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Find near-duplicate images within and across Golden-VRU splits.
+
+nuImages, BDD100K and Cityscapes are sequential driving datasets, so
+near-identical neighbouring frames can land in both train and test and inflate
+metrics. This tool:
+
+1. Computes a 64-bit difference hash (dHash) for every annotated image in a
+   process pool, using JPEG draft mode for a fast downscaled decode
+2. Caches hashes per split in .cache/phash/<split>.json, keyed by file size
+   and mtime, so re-runs only hash new or changed images
+3. Indexes the hashes with multi-index hashing: the 64 bits are cut into
+   threshold + 1 chunks, and by the pigeonhole principle any two hashes within
+   `threshold` bits share at least one identical chunk, so only hashes sharing
+   a chunk bucket are compared
+4. Reports near-duplicate pairs per split pair (within and across splits)
+
+Requires Pillow. Also available as `python validate_dataset.py --leakage`.
+
+Usage:
+    python find_duplicates.py [--threshold N] [--workers N] [--output FILE]
+"""
+
+import argparse
+import heapq
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from golden_vru import GoldenVRU
+
+# Constants
+BASE_DIR = Path(__file__).parent
+CACHE_DIR = Path('.cache') / 'phash'  # Relative to the dataset's base directory
+HASH_SIZE = 8  # 8x8 = 64-bit hash
+DEFAULT_THRESHOLD = 4  # Max differing bits for a near-duplicate
+MAX_THRESHOLD = HASH_SIZE * HASH_SIZE - 1  # threshold + 1 chunks must each keep a bit
+HASH_CHUNKSIZE = 64
+MAX_REPORTED_PAIRS = 1000
+
+
+def dhash(path: str) -> int:
+    """64-bit difference hash of an image (horizontal gradient signs)."""
+    with Image.open(path) as img:
+        img.draft('L', ((HASH_SIZE + 1) * 8, HASH_SIZE * 8))
+        small = img.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR)
+        pixels = small.tobytes()
+
+    bits = 0
+    width = HASH_SIZE + 1
+    for row in range(HASH_SIZE):
+        offset = row * width
+        for col in range(HASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def _hash_job(path: str) -> Optional[int]:
+    """Process-pool worker: hash one image, None if it can't be decoded."""
+    try:
+        return dhash(path)
+    except (OSError, ValueError):
+        return None
+
+
+def load_cache(cache_dir: Path, split: str) -> Dict[str, list]:
+    """file_name -> [size, mtime_ns, hash hex or None]."""
+    try:
+        with open(cache_dir / f"{split}.json", 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_cache(cache_dir: Path, split: str, cache: Dict[str, list]):
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_dir / f"{split}.json"
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, path)
+
+
+def compute_hashes(split: str, file_names: List[str], image_dir: Path, cache_dir: Path,
+                   workers: Optional[int] = None) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """
+    Hash every image of a split, reusing cached hashes of unchanged files.
+
+    Returns (file_name -> hash, stats).
+    """
+    cache = load_cache(cache_dir, split)
+    hashes = {}
+    todo = []
+    stats = {'cached': 0, 'hashed': 0, 'missing': 0, 'failed': 0}
+
+    for file_name in file_names:
+        try:
+            st = os.stat(image_dir / file_name)
+        except FileNotFoundError:
+            stats['missing'] += 1
+            continue
+        entry = cache.get(file_name)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            stats['cached'] += 1
+            if entry[2] is not None:
+                hashes[file_name] = int(entry[2], 16)
+            else:
+                stats['failed'] += 1
+        else:
+            todo.append((file_name, st.st_size, st.st_mtime_ns))
+
+    if todo:
+        paths = [str(image_dir / file_name) for file_name, _, _ in todo]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_hash_job, paths, chunksize=HASH_CHUNKSIZE)
+            for (file_name, size, mtime_ns), value in zip(todo, results):
+                cache[file_name] = [size, mtime_ns, None if value is None else f"{value:016x}"]
+                if value is None:
+                    stats['failed'] += 1
+                else:
+                    hashes[file_name] = value
+                    stats['hashed'] += 1
+
+    # Drop cache entries for images no longer in the split
+    wanted = set(file_names)
+    cache = {name: entry for name, entry in cache.items() if name in wanted}
+    save_cache(cache_dir, split, cache)
+    return hashes, stats
+
+
+def chunk_bounds(threshold: int) -> List[Tuple[int, int]]:
+    """Bit ranges of the threshold + 1 multi-index chunks."""
+    if not 0 <= threshold <= MAX_THRESHOLD:
+        raise ValueError(f"threshold must be between 0 and {MAX_THRESHOLD}, got {threshold}")
+    bits = HASH_SIZE * HASH_SIZE
+    chunks = threshold + 1
+    return [(k * bits // chunks, (k + 1) * bits // chunks) for k in range(chunks)]
+
+
+def similar_hash_pairs(unique_hashes: List[int], threshold: int) -> List[Tuple[int, int, int]]:
+    """Index pairs (i, j, distance) of distinct hashes within threshold bits."""
+    found = {}
+    for low, high in chunk_bounds(threshold):
+        mask = (1 << (high - low)) - 1
+        buckets = defaultdict(list)
+        for index, value in enumerate(unique_hashes):
+            buckets[(value >> low) & mask].append(index)
+
+        for bucket in buckets.values():
+            for i, j in combinations(bucket, 2):
+                if (i, j) not in found:
+                    distance = (unique_hashes[i] ^ unique_hashes[j]).bit_count()
+                    if distance <= threshold:
+                        found[(i, j)] = distance
+
+    return [(i, j, d) for (i, j), d in found.items()]
+
+
+def near_duplicate_pairs(entries: List[Tuple[str, str, int]], split_names: List[str],
+                         threshold: int) -> Tuple[Dict[str, int], List[dict]]:
+    """
+    Pair counts per split pair and the MAX_REPORTED_PAIRS best example pairs.
+
+    Images with identical hashes are grouped, so counts are computed from the
+    number of images per split in each group (or pair of groups) instead of
+    listing every pair. Example pairs (cross-split first, then by distance
+    and name) are generated lazily and kept in a bounded heap.
+    """
+    members = defaultdict(list)
+    for index, (_, _, value) in enumerate(entries):
+        members[value].append(index)
+    unique_hashes = list(members)
+    similar = similar_hash_pairs(unique_hashes, threshold)
+
+    rank = {name: index for index, name in enumerate(split_names)}
+    group_splits = {value: Counter(entries[i][0] for i in group) for value, group in members.items()}
+    counts = defaultdict(int)
+
+    def count(split_a: str, split_b: str, n: int):
+        if n:
+            split_a, split_b = sorted((split_a, split_b), key=rank.get)
+            counts[f"{split_a}/{split_b}"] += n
+
+    for splits in group_splits.values():
+        for (split_a, n_a), (split_b, n_b) in combinations(splits.items(), 2):
+            count(split_a, split_b, n_a * n_b)
+        for split, n in splits.items():
+            count(split, split, n * (n - 1) // 2)
+    for a, b, _ in similar:
+        for split_a, n_a in group_splits[unique_hashes[a]].items():
+            for split_b, n_b in group_splits[unique_hashes[b]].items():
+                count(split_a, split_b, n_a * n_b)
+
+    labels = [f"{split}/{name}" for split, name, _ in entries]
+
+    def candidates():
+        # (same split, distance, a, b) sorts cross-split pairs first
+        for group in members.values():
+            for i, j in combinations(group, 2):
+                yield entries[i][0] == entries[j][0], 0, labels[i], labels[j]
+        for a, b, distance in similar:
+            for i in members[unique_hashes[a]]:
+                for j in members[unique_hashes[b]]:
+                    yield entries[i][0] == entries[j][0], distance, labels[i], labels[j]
+
+    examples = [{'a': a, 'b': b, 'distance': distance, 'cross_split': not same}
+                for same, distance, a, b in heapq.nsmallest(MAX_REPORTED_PAIRS, candidates())]
+    return dict(counts), examples
+
+
+def find_near_duplicates(base_dir: Optional[Path] = None, splits: Optional[List[str]] = None,
+                         threshold: int = DEFAULT_THRESHOLD,
+                         workers: Optional[int] = None, verbose: bool = True) -> dict:
+    """
+    Hash every split and report near-duplicate pairs.
+
+    Returns a report with pair counts per split pair ('train/test' etc.),
+    up to MAX_REPORTED_PAIRS example pairs (cross-split pairs first) and
+    hashing statistics.
+    """
+    dataset = GoldenVRU(base_dir or BASE_DIR, splits)
+    cache_dir = dataset.base_dir / CACHE_DIR
+    entries = []  # (split, file_name, hash)
+    hash_stats = {}
+
+    for split in dataset:
+        start = time.perf_counter()
+        file_names = [img['file_name'] for img in split.images]
+        hashes, stats = compute_hashes(split.name, file_names, dataset.image_dir(split.name),
+                                       cache_dir, workers)
+        hash_stats[split.name] = stats
+        entries.extend((split.name, name, value) for name, value in hashes.items())
+        if verbose:
+            print(f"  {split.name}: {stats['hashed']:,} hashed, {stats['cached']:,} cached, "
+                  f"{stats['missing']:,} missing, {stats['failed']:,} failed "
+                  f"({time.perf_counter() - start:.1f}s)")
+
+    counts, examples = near_duplicate_pairs(entries, dataset.split_names, threshold)
+    return {
+        'threshold': threshold,
+        'images': len(entries),
+        'hashing': hash_stats,
+        'pair_counts': counts,
+        'cross_split_pairs': sum(n for key, n in counts.items() if len(set(key.split('/'))) == 2),
+        'pairs': examples,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Find near-duplicate images within and across splits')
+    parser.add_argument('--threshold', type=int, default=DEFAULT_THRESHOLD,
+                        help=f'Max differing hash bits (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--workers', type=int, help='Hashing processes (default: CPU count)')
+    parser.add_argument('--output', type=Path, help='Write the report as JSON')
+    args = parser.parse_args()
+    if not 0 <= args.threshold <= MAX_THRESHOLD:
+        parser.error(f"--threshold must be between 0 and {MAX_THRESHOLD}")
+
+    print("=" * 60)
+    print("Golden-VRU Near-Duplicate Detection")
+    print("=" * 60)
+    print(f"\nThreshold: <= {args.threshold} of {HASH_SIZE * HASH_SIZE} bits\n")
+
+    start = time.perf_counter()
+    report = find_near_duplicates(threshold=args.threshold, workers=args.workers)
+
+    print(f"\n{'Split pair':<14} {'Pairs':>10}")
+    print("-" * 26)
+    for key, count in sorted(report['pair_counts'].items()):
+        print(f"{key:<14} {count:>10,}")
+    print("-" * 26)
+
+    cross = [p for p in report['pairs'] if p['cross_split']]
+    if cross:
+        print("\nExample cross-split pairs:")
+        for pair in cross[:10]:
+            print(f"  [{pair['distance']}] {pair['a']} <-> {pair['b']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    print(f"\nChecked {report['images']:,} images in {time.perf_counter() - start:.1f}s")
+    if report['cross_split_pairs']:
+        print(f"[WARN] {report['cross_split_pairs']:,} near-duplicate pairs across splits")
+        return 1
+    print("[PASS] No near-duplicates across splits")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
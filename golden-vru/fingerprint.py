@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Content fingerprints for Golden-VRU annotation files.
+
+A fingerprint is a BLAKE2b digest of the file contents. Digests are memoized
+by (size, mtime_ns) in .cache/fingerprints.json, so checking whether a split's
+~100MB annotation file changed costs a stat() unless it actually did.
+
+Usage:
+    python fingerprint.py [PATH ...]   (default: every split's annotations)
+"""
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+# Constants
+BASE_DIR = Path(__file__).parent
+SPLITS = ['train', 'valid', 'test']
+CACHE_PATH = BASE_DIR / '.cache' / 'fingerprints.json'
+DIGEST_SIZE = 16
+CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path: Path) -> str:
+    """BLAKE2b digest of a file's contents."""
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def bytes_digest(data: bytes) -> str:
+    """BLAKE2b digest of contents already read (same digest as file_digest)."""
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).hexdigest()
+
+
+def stat_signature(path: Path) -> List[int]:
+    """(size, mtime_ns) of a file, used to detect changes without reading it."""
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _load_cache() -> Dict[str, dict]:
+    try:
+        with open(CACHE_PATH, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_cache(cache: Dict[str, dict]):
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = CACHE_PATH.with_name(CACHE_PATH.name + f'.{os.getpid()}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, CACHE_PATH)
+
+
+def fingerprint(path: Path, use_cache: bool = True) -> str:
+    """Content fingerprint of a file, memoized by its stat signature."""
+    path = Path(path).resolve()
+    if not use_cache:
+        return file_digest(path)
+
+    signature = stat_signature(path)
+    cache = _load_cache()
+    entry = cache.get(str(path))
+    if entry and entry['stat'] == signature:
+        return entry['digest']
+
+    digest = file_digest(path)
+    cache[str(path)] = {'stat': signature, 'digest': digest}
+    _save_cache(cache)
+    return digest
+
+
+def annotation_path(split: str, base_dir: Path = None) -> Path:
+    """Path of a split's annotation file."""
+    return (base_dir or BASE_DIR) / split / '_annotations.coco.json'
+
+
+def main() -> int:
+    paths = [Path(p) for p in sys.argv[1:]] or [annotation_path(split) for split in SPLITS]
+    for path in paths:
+        if path.exists():
+            print(f"{fingerprint(path)}  {path}")
+        else:
+            print(f"{'[missing]':<{DIGEST_SIZE * 2}}  {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
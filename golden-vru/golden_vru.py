@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Lazy Golden-VRU dataset object with cached derived views.
+
+Every helper script rebuilds the same structures from scratch (category maps,
+source counts, image ID maps). GoldenVRU loads each split on first access and
+computes derived views once, memoizing them until the split's annotation file
+changes on disk (detected by its size and mtime, checked at most once every
+STAT_TTL seconds). Every view remembers the file signature it was computed
+against, so views that don't read the data (such as `fingerprint`) are
+refreshed as well. Split.unload() releases a split's data and views, so a
+script processing one split at a time keeps only that split in memory.
+
+With compact=True, splits are loaded as compact records (records.py).
+
+Usage:
+    from golden_vru import GoldenVRU
+
+    dataset = GoldenVRU()
+    valid = dataset['valid']
+    valid.category_names        # {0: 'pedestrian', 1: 'cyclist'}
+    valid.source_distribution   # {'nuimages': 4568, ...}
+    valid.annotations_by_image[image_id]
+
+    GoldenVRU(compact=True)     (compact records instead of dicts)
+
+    python golden_vru.py        (prints a summary of every split)
+"""
+
+import functools
+import json
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from fingerprint import annotation_path, fingerprint, stat_signature
+from records import load_compact
+
+# Constants
+BASE_DIR = Path(__file__).parent
+SPLITS = ['train', 'valid', 'test']
+SIZE_SMALL = 32 * 32
+SIZE_MEDIUM = 96 * 96
+STAT_TTL = 1.0  # Seconds a split's file signature is reused before stat() is called again
+
+# Annotations per image (DATASET_REPORT.md density table)
+DENSITY_BUCKETS = [
+    ('sparse', 1, 3),
+    ('moderate', 4, 10),
+    ('dense', 11, 20),
+    ('very_dense', 21, None),
+]
+
+
+def size_bucket(area: float) -> str:
+    """COCO size bucket of an annotation area."""
+    if area < SIZE_SMALL:
+        return 'small'
+    if area < SIZE_MEDIUM:
+        return 'medium'
+    return 'large'
+
+
+def density_bucket(count: int) -> str:
+    """Density bucket of an image's annotation count."""
+    for name, low, high in DENSITY_BUCKETS:
+        if count >= low and (high is None or count <= high):
+            return name
+    return 'empty'
+
+
+def cached_view(method):
+    """Memoize a derived view on a Split until its annotation file changes."""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self):
+        signature = self._check()
+        entry = self._views.get(name)
+        if entry is None or entry[0] != signature:
+            with self._lock:
+                entry = self._views.get(name)
+                if entry is None or entry[0] != signature:
+                    entry = self._views[name] = (signature, method(self))
+        return entry[1]
+
+    return property(wrapper)
+
+
+class Split:
+    """One split's COCO annotations, loaded lazily with memoized views."""
+
+    def __init__(self, name: str, path: Path, compact: bool = False):
+        self.name = name
+        self.path = Path(path)
+        self.compact = compact
+        self._data: Optional[dict] = None
+        self._signature = None
+        self._views: Dict[str, tuple] = {}  # View name -> (file signature, value)
+        self._checked: Optional[tuple] = None  # (monotonic time, file signature)
+        self._lock = threading.RLock()
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._data is not None else 'not loaded'
+        return f"Split({self.name!r}, {self.path}, {state})"
+
+    def _stat(self) -> list:
+        """The file's signature, reused for STAT_TTL seconds after a stat()."""
+        now = time.monotonic()
+        checked = self._checked
+        if checked is not None and now - checked[0] < STAT_TTL:
+            return checked[1]
+        signature = stat_signature(self.path)
+        self._checked = (now, signature)
+        return signature
+
+    def _check(self) -> list:
+        """Drop the loaded data if the file changed since loading; return its signature."""
+        signature = self._stat()
+        if self._data is not None and signature != self._signature:
+            with self._lock:
+                self._data = None
+                self._signature = None
+        return signature
+
+    def invalidate(self):
+        """Forget the loaded data and every derived view."""
+        with self._lock:
+            self._data = None
+            self._signature = None
+            self._views = {}
+            self._checked = None
+
+    def unload(self):
+        """Release the split's memory; it is reloaded on the next access."""
+        self.invalidate()
+
+    @property
+    def loaded(self) -> bool:
+        return self._data is not None
+
+    @property
+    def data(self) -> dict:
+        """The raw COCO dict (loaded on first access)."""
+        self._check()
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    signature = stat_signature(self.path)
+                    self._checked = (time.monotonic(), signature)
+                    if self.compact:
+                        self._data = load_compact(self.path)
+                    else:
+                        with open(self.path, 'r') as f:
+                            self._data = json.load(f)
+                    self._signature = signature
+        return self._data
+
+    @property
+    def images(self) -> List[dict]:
+        return self.data['images']
+
+    @property
+    def annotations(self) -> List[dict]:
+        return self.data['annotations']
+
+    @property
+    def categories(self) -> List[dict]:
+        return self.data['categories']
+
+    @cached_view
+    def fingerprint(self) -> str:
+        """Content fingerprint of the annotation file."""
+        return fingerprint(self.path)
+
+    # ID maps
+
+    @cached_view
+    def category_names(self) -> Dict[int, str]:
+        """Category ID -> name."""
+        return {cat['id']: cat['name'] for cat in self.categories}
+
+    @cached_view
+    def images_by_id(self) -> Dict[int, dict]:
+        """Image ID -> image record."""
+        return {img['id']: img for img in self.images}
+
+    @cached_view
+    def images_by_file(self) -> Dict[str, dict]:
+        """File name -> image record."""
+        return {img['file_name']: img for img in self.images}
+
+    @cached_view
+    def source_by_image(self) -> Dict[int, str]:
+        """Image ID -> source."""
+        return {img['id']: img.get('source', 'unknown') for img in self.images}
+
+    @cached_view
+    def images_by_source(self) -> Dict[str, List[dict]]:
+        """Source -> image records."""
+        groups = defaultdict(list)
+        for img in self.images:
+            groups[img.get('source', 'unknown')].append(img)
+        return dict(groups)
+
+    @cached_view
+    def annotations_by_image(self) -> Dict[int, List[dict]]:
+        """Image ID -> annotations (images without annotations are absent)."""
+        groups = defaultdict(list)
+        for ann in self.annotations:
+            groups[ann['image_id']].append(ann)
+        return dict(groups)
+
+    @cached_view
+    def annotation_counts(self) -> Dict[int, int]:
+        """Image ID -> number of annotations (0 for images without any)."""
+        counts = Counter(ann['image_id'] for ann in self.annotations)
+        return {img['id']: counts.get(img['id'], 0) for img in self.images}
+
+    # Distributions
+
+    @cached_view
+    def class_distribution(self) -> Dict[str, int]:
+        """Category name -> annotation count."""
+        names = self.category_names
+        return dict(Counter(names.get(ann['category_id'], 'unknown') for ann in self.annotations))
+
+    @cached_view
+    def source_distribution(self) -> Dict[str, int]:
+        """Source -> image count."""
+        return dict(Counter(self.source_by_image.values()))
+
+    @cached_view
+    def size_distribution(self) -> Dict[str, int]:
+        """COCO size bucket -> annotation count."""
+        counts = {'small': 0, 'medium': 0, 'large': 0}
+        for ann in self.annotations:
+            counts[size_bucket(ann['area'])] += 1
+        return counts
+
+    @cached_view
+    def density_distribution(self) -> Dict[str, int]:
+        """Density bucket -> image count."""
+        counts = {name: 0 for name, _, _ in DENSITY_BUCKETS}
+        for count in self.annotation_counts.values():
+            bucket = density_bucket(count)
+            counts[bucket] = counts.get(bucket, 0) + 1
+        return counts
+
+    @cached_view
+    def resolution_distribution(self) -> Dict[str, int]:
+        """'WxH' -> image count."""
+        return dict(Counter(f"{img.get('width')}x{img.get('height')}" for img in self.images))
+
+
+class GoldenVRU:
+    """The Golden-VRU dataset: lazily loaded splits sharing cached views."""
+
+    def __init__(self, base_dir: Optional[Path] = None, splits: Optional[List[str]] = None,
+                 compact: bool = False):
+        self.base_dir = Path(base_dir or BASE_DIR)
+        self.split_names = list(splits or SPLITS)
+        self._splits = {name: Split(name, annotation_path(name, self.base_dir), compact)
+                        for name in self.split_names}
+
+    def __getitem__(self, name: str) -> Split:
+        return self._splits[name]
+
+    def __iter__(self) -> Iterator[Split]:
+        return iter(self._splits.values())
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._splits
+
+    def __repr__(self) -> str:
+        return f"GoldenVRU({self.base_dir}, splits={self.split_names})"
+
+    def image_dir(self, split: str) -> Path:
+        """Directory holding a split's image files."""
+        return self.base_dir / split
+
+    def invalidate(self):
+        """Forget every split's loaded data and views."""
+        for split in self:
+            split.invalidate()
+
+
+def main() -> int:
+    dataset = GoldenVRU()
+
+    print("=" * 60)
+    print("Golden-VRU Dataset Summary")
+    print("=" * 60)
+    print(f"\n{'Split':<8} {'Images':>10} {'Annotations':>12} {'Pedestrian':>12} {'Cyclist':>10}")
+    print("-" * 56)
+    for split in dataset:
+        if not split.path.exists():
+            print(f"{split.name.capitalize():<8} {'(missing)':>10}")
+            continue
+        class_dist = split.class_distribution
+        print(f"{split.name.capitalize():<8} {len(split.images):>10,} {len(split.annotations):>12,} "
+              f"{class_dist.get('pedestrian', 0):>12,} {class_dist.get('cyclist', 0):>10,}")
+    print("-" * 56)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
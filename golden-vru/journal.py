@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Write-ahead journal for destructive Golden-VRU runs.
+
+A run first records every planned operation (image copies, image deletions,
+annotation writes) in an append-only journal, then applies them in order and
+appends a `done` record after each one. Every operation is idempotent, so an
+interrupted run can be:
+
+- resumed: completed operations are skipped from the journal alone, without
+  touching the filesystem for them (O(remaining))
+- rolled back: copies are removed, deleted images are restored from the
+  journal trash and overwritten annotation files are restored
+
+Image copies may also come from a tar/zip merge source (archives.py); runs of
+such extractions read each archive sequentially and write in parallel.
+
+Deleted images and overwritten annotation files are kept (in a `.trash`
+directory next to the images, or as `.journal-<seq>.orig` files) until the
+journal is finished. Consecutive deletions are applied from a thread pool,
+and finishing purges the trash with fileops.bulk_delete. A deletion that
+fails (other than for a missing file) leaves the file in place and is counted
+as failed; Journal.delete_stats holds the deleted/missing/failed counts and
+throughput of the last apply, in the fileops.bulk_delete format.
+
+Used by extract_rsud.py, filter_small_objects.py, merge_nuimages.py and
+merge_sources.py.
+
+Usage:
+    python journal.py status NAME
+    python journal.py resume NAME
+    python journal.py rollback NAME
+    python journal.py finish NAME
+"""
+
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from archives import extract_members, open_archive
+from fileops import DELETE_WORKERS, MAX_REPORTED_ERRORS, bulk_delete, format_delete_stats
+from records import json_default
+
+# Constants
+BASE_DIR = Path(__file__).parent
+JOURNAL_DIR = BASE_DIR / '.journal'
+JOURNAL_FILE = 'journal.jsonl'
+TRASH_DIR = '.trash'
+
+# Done records are fsynced in groups; a lost done record only means the
+# (idempotent) operation is repeated on resume
+SYNC_EVERY = 1000
+PROGRESS_EVERY = 5000
+
+
+class Journal:
+    """Append-only journal of planned file operations for one script run."""
+
+    def __init__(self, name: str, journal_dir: Optional[Path] = None):
+        self.name = name
+        self.dir = (journal_dir or JOURNAL_DIR) / name
+        self.path = self.dir / JOURNAL_FILE
+        self.ops: List[dict] = []
+        self.done: Dict[int, dict] = {}
+        self.state = 'empty'
+        self._fh = None
+        self._unsynced = 0
+        self._made_dirs = set()
+        self.delete_stats: Dict[str, object] = {}  # Of the last apply(), as fileops.bulk_delete
+
+        if self.path.exists():
+            self._load()
+
+    # Journal file
+
+    def _load(self):
+        """Read ops and progress back from the journal file."""
+        with open(self.path, 'r') as f:
+            lines = f.read().splitlines()
+
+        for i, line in enumerate(lines):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                if i == len(lines) - 1:
+                    break  # Torn final write from an interrupted run
+                raise
+
+            event = record.get('event')
+            if event is None:
+                self.ops.append(record)
+                self.state = 'planning'
+            elif event == 'done':
+                self.done[record['seq']] = record
+            else:
+                self.state = event
+
+    def _append(self, record: dict, sync: bool = False):
+        """Append a record, fsyncing when asked or every SYNC_EVERY records."""
+        if self._fh is None:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.path, 'a')
+
+        self._fh.write(json.dumps(record) + '\n')
+        self._unsynced += 1
+        if sync or self._unsynced >= SYNC_EVERY:
+            self._sync()
+
+    def _sync(self):
+        if self._fh is not None and self._unsynced:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        """Flush and close the journal file."""
+        self._sync()
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    @property
+    def pending(self) -> List[dict]:
+        """Planned operations that have not completed yet."""
+        return [op for op in self.ops if op['seq'] not in self.done]
+
+    @property
+    def unfinished(self) -> bool:
+        """True if a planned run has not been applied to completion."""
+        return self.state in ('planned', 'applying')
+
+    # Planning
+
+    def _plan(self, record: dict) -> dict:
+        if self.state not in ('empty', 'planning'):
+            raise RuntimeError(f"Journal '{self.name}' is {self.state}; cannot add operations")
+        record['seq'] = len(self.ops)
+        self.ops.append(record)
+        self.state = 'planning'
+        self._append(record)
+        return record
+
+    def plan_copy(self, src: Path, dst: Path):
+        """Plan copying src to dst (skipped if dst already exists at plan time)."""
+        self._plan({'op': 'copy', 'src': str(src), 'dst': str(dst),
+                    'dst_existed': os.path.lexists(dst)})
+
+    def plan_extract(self, archive: Path, member: str, dst: Path):
+        """Plan extracting an archive member to dst (skipped if dst already exists at plan time)."""
+        self._plan({'op': 'extract', 'archive': str(archive), 'member': member, 'dst': str(dst),
+                    'dst_existed': os.path.lexists(dst)})
+
+    def plan_delete(self, path: Path):
+        """Plan deleting path (moved to the journal trash until finish)."""
+        self._plan({'op': 'delete', 'path': str(path)})
+
+    def plan_write(self, path: Path, write_fn: Callable[[Path], None]):
+        """
+        Plan replacing path with new content.
+
+        write_fn(staged_path) is called immediately to write the new content to
+        a staging file next to path; applying the op swaps it into place.
+        """
+        record = self._plan({'op': 'write', 'path': str(path),
+                             'existed': os.path.lexists(path)})
+        staged = self._staged_path(record)
+        staged.parent.mkdir(parents=True, exist_ok=True)
+        write_fn(staged)
+
+    def plan_write_json(self, path: Path, data: dict):
+        """Plan replacing path with JSON-serialized data."""
+        def write(staged: Path):
+            with open(staged, 'w') as f:
+                json.dump(data, f, default=json_default)
+        self.plan_write(path, write)
+
+    def finish_plan(self):
+        """Mark planning complete; nothing is applied before this is durable."""
+        self._append({'event': 'planned', 'ops': len(self.ops)}, sync=True)
+        self.state = 'planned'
+
+    # Applying
+
+    @staticmethod
+    def _staged_path(op: dict) -> Path:
+        return Path(op['path'] + f".journal-{op['seq']}.staged")
+
+    @staticmethod
+    def _stash_path(op: dict) -> Path:
+        return Path(op['path'] + f".journal-{op['seq']}.orig")
+
+    def _trash_path(self, op: dict) -> Path:
+        path = Path(op['path'])
+        return path.parent / TRASH_DIR / self.name / f"{op['seq']}{path.suffix}"
+
+    def _makedirs(self, directory: Path):
+        if directory not in self._made_dirs:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._made_dirs.add(directory)
+
+    def _apply_op(self, op: dict) -> str:
+        """Apply one operation idempotently, returning its outcome."""
+        kind = op['op']
+
+        if kind == 'copy':
+            if op['dst_existed']:
+                return 'skipped'
+            src, dst = Path(op['src']), Path(op['dst'])
+            self._makedirs(dst.parent)
+            tmp = dst.with_name(dst.name + '.journal-tmp')
+            try:
+                shutil.copy2(src, tmp)
+            except FileNotFoundError:
+                return 'missing'
+            os.replace(tmp, dst)
+            return 'copied'
+
+        if kind == 'delete':
+            trash = self._trash_path(op)
+            self._makedirs(trash.parent)
+            try:
+                os.replace(op['path'], trash)
+            except FileNotFoundError:
+                return 'deleted' if trash.exists() else 'missing'
+            except OSError as e:
+                errors = self.delete_stats['errors']
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append(f"{op['path']}: {e.strerror}")
+                return 'failed'
+            return 'deleted'
+
+        if kind == 'write':
+            staged = self._staged_path(op)
+            if not staged.exists():
+                return 'written'  # Already swapped in
+            path = Path(op['path'])
+            if op['existed']:
+                stash = self._stash_path(op)
+                if not stash.exists():
+                    os.replace(path, stash)
+            os.replace(staged, path)
+            return 'written'
+
+        raise ValueError(f"Unknown journal operation: {kind}")
+
+    def _apply_extracts(self, ops: List[dict]) -> Iterator[Tuple[dict, str]]:
+        """Apply a run of extract ops, one sequential pass per archive."""
+        for archive_path, group in groupby(ops, key=lambda op: op['archive']):
+            group = list(group)
+            for op in group:
+                if op['dst_existed']:
+                    yield op, 'skipped'
+            todo = [op for op in group if not op['dst_existed']]
+            if not todo:
+                continue
+
+            for op in todo:
+                self._makedirs(Path(op['dst']).parent)
+            archive = open_archive(Path(archive_path))
+            jobs = [(op['member'], Path(op['dst'])) for op in todo]
+            # Destinations are overwritten: a partial earlier attempt may have left them
+            for index, outcome in extract_members(archive, jobs, skip_existing=False,
+                                                  tmp_suffix='.journal-tmp'):
+                yield todo[index], outcome
+
+    def apply(self) -> Dict[str, int]:
+        """Apply all pending operations, returning outcome counts."""
+        if not self.unfinished:
+            raise RuntimeError(f"Journal '{self.name}' is {self.state}; nothing to apply")
+
+        pending = self.pending
+        total = len(self.ops)
+        if self.done:
+            print(f"  Resuming journal '{self.name}': {len(self.done):,}/{total:,} operations done")
+        self.state = 'applying'
+        self._append({'event': 'applying'}, sync=True)
+
+        counts = {'copied': 0, 'deleted': 0, 'written': 0, 'skipped': 0, 'missing': 0, 'failed': 0}
+        deletes = self.delete_stats = {'deleted': 0, 'missing': 0, 'failed': 0, 'errors': [],
+                                       'seconds': 0.0}
+        applied = 0
+        with ThreadPoolExecutor(max_workers=DELETE_WORKERS) as pool:
+            # Runs of deletions are independent renames, so apply them in parallel
+            for kind, group in groupby(pending, key=lambda op: op['op']):
+                group = list(group)
+                start = time.perf_counter()
+                if kind == 'extract':
+                    results = self._apply_extracts(group)
+                else:
+                    run = pool.map if kind == 'delete' else map
+                    results = zip(group, run(self._apply_op, group))
+                for op, outcome in results:
+                    counts[outcome] += 1
+                    if kind == 'delete':
+                        deletes[outcome] += 1
+                    self.done[op['seq']] = {'event': 'done', 'seq': op['seq'], 'outcome': outcome}
+                    self._append(self.done[op['seq']])
+
+                    applied += 1
+                    if applied % PROGRESS_EVERY == 0:
+                        print(f"  Progress: {len(self.done):,}/{total:,}")
+                if kind == 'delete':
+                    deletes['seconds'] += time.perf_counter() - start
+
+        done = deletes['deleted'] + deletes['missing'] + deletes['failed']
+        deletes['files_per_second'] = done / deletes['seconds'] if deletes['seconds'] > 0 else 0.0
+
+        self._append({'event': 'applied'}, sync=True)
+        self.state = 'applied'
+        self.close()
+        return counts
+
+    # Rollback and cleanup
+
+    def _undo_op(self, op: dict):
+        """Undo one operation idempotently (safe if it was never applied)."""
+        kind = op['op']
+
+        if kind in ('copy', 'extract'):
+            if not op['dst_existed']:
+                for path in (op['dst'], op['dst'] + '.journal-tmp'):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+        elif kind == 'delete':
+            trash = self._trash_path(op)
+            if trash.exists() and not os.path.lexists(op['path']):
+                os.replace(trash, op['path'])
+
+        elif kind == 'write':
+            staged = self._staged_path(op)
+            stash = self._stash_path(op)
+            if staged.exists():
+                staged.unlink()
+                if stash.exists():
+                    os.replace(stash, op['path'])
+            elif stash.exists():
+                os.replace(stash, op['path'])
+            elif not op['existed'] and os.path.lexists(op['path']):
+                os.remove(op['path'])
+
+    def _trash_dirs(self) -> List[Path]:
+        dirs = {Path(op['path']).parent / TRASH_DIR / self.name
+                for op in self.ops if op['op'] == 'delete'}
+        return sorted(dirs)
+
+    def _remove_dir(self):
+        self.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+        for trash_dir in self._trash_dirs():
+            if not trash_dir.is_dir():
+                continue
+            stats = bulk_delete(trash_dir, os.listdir(trash_dir))
+            if stats['deleted']:
+                print(f"  Purged {trash_dir}: {format_delete_stats(stats)}")
+            try:
+                trash_dir.rmdir()
+                trash_dir.parent.rmdir()
+            except OSError:
+                pass
+
+    def discard(self):
+        """Drop an incomplete plan (nothing was applied) and its staged files."""
+        if self.state != 'planning':
+            raise RuntimeError(f"Journal '{self.name}' is {self.state}; only incomplete plans can be discarded")
+        for op in self.ops:
+            if op['op'] == 'write':
+                self._staged_path(op).unlink(missing_ok=True)
+        self._remove_dir()
+        self.ops = []
+        self.done = {}
+        self.state = 'empty'
+
+    def rollback(self):
+        """Undo every operation in reverse order and remove the journal."""
+        print(f"  Rolling back {len(self.ops):,} operations ({len(self.done):,} applied)...")
+        for op in reversed(self.ops):
+            self._undo_op(op)
+        self._remove_dir()
+        self.state = 'rolled_back'
+
+    def finish(self):
+        """Purge trashed images and stashed annotations, then remove the journal."""
+        if self.unfinished:
+            raise RuntimeError(f"Journal '{self.name}' has {len(self.pending):,} pending operations")
+        for op in self.ops:
+            if op['op'] == 'write':
+                self._stash_path(op).unlink(missing_ok=True)
+                self._staged_path(op).unlink(missing_ok=True)
+        self._remove_dir()
+        self.state = 'finished'
+
+    def summary(self) -> str:
+        """One-line description of the journal state."""
+        kinds = {}
+        for op in self.ops:
+            kinds[op['op']] = kinds.get(op['op'], 0) + 1
+        ops = ', '.join(f"{count:,} {kind}" for kind, count in sorted(kinds.items()))
+        return (f"Journal '{self.name}': {self.state}, "
+                f"{len(self.done):,}/{len(self.ops):,} done ({ops or 'no operations'})")
+
+
+def start_run(name: str) -> Optional[Journal]:
+    """
+    Open the journal for an --apply run.
+
+    Returns an empty journal to plan into, or None when the caller should stop:
+    an interrupted run is resumed instead of re-planned, and a new run is
+    refused while a previous one awaits finish or rollback. An incomplete plan
+    (interrupted before anything was applied) is discarded.
+    """
+    journal = Journal(name)
+
+    if journal.state == 'planning':
+        print(f"Discarding incomplete plan in journal '{name}'")
+        journal.discard()
+
+    if journal.unfinished:
+        print(journal.summary())
+        counts = journal.apply()
+        print(f"  Applied: {counts}")
+        print_next_steps(name)
+        return None
+
+    if journal.state == 'applied':
+        print(journal.summary())
+        print("A previous run was applied but not finished.")
+        print_next_steps(name)
+        return None
+
+    return journal
+
+
+def print_delete_stats(journal: Journal, what: str = 'image files'):
+    """Print deleted/missing/failed counts and throughput of the last apply's deletions."""
+    stats = journal.delete_stats
+    if not stats or not (stats['deleted'] or stats['missing'] or stats['failed']):
+        return
+    print(f"  Deleted {what}: {format_delete_stats(stats)}")
+    for error in stats['errors']:
+        print(f"    [FAIL] {error}")
+
+
+def print_next_steps(name: str):
+    """Print how to finish or roll back an applied journal."""
+    print(f"\nJournal '{name}' kept for rollback:")
+    print(f"  Undo:     python journal.py rollback {name}")
+    print(f"  Finalize: python journal.py finish {name}  (purges deleted images)")
+
+
+def main() -> int:
+    commands = ['status', 'resume', 'rollback', 'finish']
+    if len(sys.argv) != 3 or sys.argv[1] not in commands:
+        print(f"Usage: python journal.py {{{'|'.join(commands)}}} NAME")
+        return 2
+
+    command, name = sys.argv[1], sys.argv[2]
+    journal = Journal(name)
+    if journal.state == 'empty':
+        print(f"No journal named '{name}' in {JOURNAL_DIR}")
+        return 1
+
+    print(journal.summary())
+
+    if command == 'resume':
+        if not journal.unfinished:
+            print("Nothing to resume")
+            return 1
+        counts = journal.apply()
+        print(f"  Applied: {counts}")
+        print_next_steps(name)
+    elif command == 'rollback':
+        journal.rollback()
+        print("  Rolled back")
+    elif command == 'finish':
+        if journal.unfinished:
+            print("Journal has pending operations; resume or roll back first")
+            return 1
+        journal.finish()
+        print("  Finished")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Build a small, deterministic dev subset of Golden-VRU.
+
+Trying a tooling change or a training config on the full 13GB train split is
+slow. This picks a stratified sample of every split and materializes it as a
+regular golden-vru layout:
+
+    subsets/golden-vru-1pct/<split>/_annotations.coco.json
+    subsets/golden-vru-1pct/<split>/<image links>
+
+Sampling:
+- images are stratified by (source, class mix, density bucket), where the
+  class mix is the set of categories present in the image
+- each stratum gets its proportional share of the split's target size
+  (largest remainder), so the subset keeps the split's source and class mix
+- within a stratum, images are ranked by a seeded BLAKE2b hash of their
+  file_name, so the same seed picks the same images in every run and across
+  dataset versions (an image stays selected as long as its stratum's quota
+  still reaches it)
+
+Images are hardlinked (symlinked when hardlinks are not possible, or with
+--symlink). Rebuilding an existing subset only links new picks and removes
+links that are no longer selected.
+
+Every split directory gets a subset.json marker. Stale links are only pruned
+from directories holding that marker, a non-empty directory without one is
+refused, and --output may not be the dataset directory or any directory
+above it (or inside a split), so a mistyped --output cannot touch the real
+splits.
+
+Usage:
+    python make_subset.py [--percent 1] [--seed 0] [--output DIR] [--symlink]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fileops import bulk_delete, iter_batches
+from fingerprint import fingerprint
+from golden_vru import GoldenVRU, Split, density_bucket
+
+# Constants
+BASE_DIR = Path(__file__).parent
+SPLITS = ['train', 'valid', 'test']
+SUBSETS_DIR = Path('subsets')  # Relative to the dataset's base directory
+ANNOTATIONS_FILE = '_annotations.coco.json'
+MANIFEST_NAME = 'subset.json'
+TOOL_NAME = 'make_subset'
+MIN_PERCENT = 0.1
+MAX_PERCENT = 10.0
+LINK_WORKERS = 16
+LINK_BATCH = 256
+
+
+def subset_name(percent: float, seed: int) -> str:
+    """Default directory name, e.g. golden-vru-1pct or golden-vru-0.5pct-seed3."""
+    name = f"golden-vru-{percent:g}pct"
+    return name if seed == 0 else f"{name}-seed{seed}"
+
+
+def image_scores(file_names: List[str], seed: int) -> np.ndarray:
+    """Seeded, order-independent pseudo-random rank of every file name."""
+    prefix = f"{seed}:".encode()
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(prefix + name.encode(), digest_size=8).digest(), 'little')
+         for name in file_names),
+        dtype=np.uint64, count=len(file_names))
+
+
+def image_strata(split: Split) -> List[str]:
+    """Stratum of every image: 'source|class mix|density bucket'."""
+    category_order = {cat['id']: index for index, cat in enumerate(split.categories)}
+    names = [cat['name'] for cat in split.categories]
+    by_image = split.annotations_by_image
+
+    strata = []
+    for img in split.images:
+        anns = by_image.get(img['id'], ())
+        present = sorted({category_order.get(ann['category_id'], -1) for ann in anns})
+        mix = '+'.join(names[i] if i >= 0 else 'unknown' for i in present) or 'background'
+        strata.append(f"{img.get('source', 'unknown')}|{mix}|{density_bucket(len(anns))}")
+    return strata
+
+
+def allocate(sizes: np.ndarray, total: int) -> np.ndarray:
+    """Split total across strata proportionally to sizes (largest remainder)."""
+    exact = sizes * (total / sizes.sum())
+    quotas = np.floor(exact).astype(np.int64)
+    remainder = total - quotas.sum()
+    if remainder > 0:
+        # Ties resolve by stratum order, which is sorted by name
+        order = np.argsort(-(exact - quotas), kind='stable')
+        quotas[order[:remainder]] += 1
+    return np.minimum(quotas, sizes)
+
+
+def select_images(split: Split, fraction: float, seed: int) -> Tuple[np.ndarray, Dict[str, int]]:
+    """Indices (into split.images) of the sampled images, and per-stratum counts."""
+    images = split.images
+    if not images:
+        return np.array([], dtype=np.int64), {}
+
+    strata_names, codes = np.unique(image_strata(split), return_inverse=True)
+    sizes = np.bincount(codes, minlength=len(strata_names))
+    target = max(1, int(round(fraction * len(images))))
+    quotas = allocate(sizes, target)
+
+    # Sort by (stratum, score); the first quota images of each stratum are kept
+    scores = image_scores([img['file_name'] for img in images], seed)
+    order = np.lexsort((scores, codes))
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    rank = np.arange(len(images)) - starts[codes[order]]
+    selected = np.sort(order[rank < quotas[codes[order]]])
+
+    counts = {name: int(quota) for name, quota in zip(strata_names.tolist(), quotas.tolist()) if quota}
+    return selected, counts
+
+
+def subset_annotations(split: Split, selected: np.ndarray) -> dict:
+    """COCO data restricted to the selected images (IDs unchanged)."""
+    images = [split.images[i] for i in selected.tolist()]
+    image_ids = {img['id'] for img in images}
+    data = {key: value for key, value in split.data.items() if key not in ('images', 'annotations')}
+    data['images'] = images
+    data['annotations'] = [ann for ann in split.annotations if ann['image_id'] in image_ids]
+    return data
+
+
+def check_output_dir(output_dir: Path, base_dir: Path):
+    """Refuse an output directory that is the dataset directory, above it or in a split."""
+    output_dir, base_dir = Path(output_dir).resolve(), Path(base_dir).resolve()
+    if output_dir == base_dir or output_dir in base_dir.parents:
+        raise ValueError(f"Output {output_dir} would overwrite the dataset in {base_dir}")
+    for split in SPLITS:
+        split_dir = base_dir / split
+        if output_dir == split_dir or split_dir in output_dir.parents:
+            raise ValueError(f"Output {output_dir} is inside the {split} split")
+
+
+def is_subset_dir(split_dir: Path) -> bool:
+    """True if split_dir holds a subset.json written by this tool."""
+    try:
+        with open(split_dir / MANIFEST_NAME, 'r') as f:
+            return json.load(f).get('tool') == TOOL_NAME
+    except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+        return False
+
+
+def write_json(path: Path, payload: dict, indent: Optional[int] = None):
+    """Write JSON atomically (tmp file + rename)."""
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f, indent=indent)
+    os.replace(tmp_path, path)
+
+
+def _link_batch(src_dir: Path, dst_dir: Path, names: List[str], symlink: bool) -> Dict[str, int]:
+    stats = {'linked': 0, 'unchanged': 0, 'missing': 0, 'symlinked': 0}
+    for name in names:
+        src, dst = src_dir / name, dst_dir / name
+        if not src.exists():
+            stats['missing'] += 1
+            continue
+        if os.path.lexists(dst):
+            if os.path.exists(dst) and os.path.samefile(src, dst):
+                stats['unchanged'] += 1
+                continue
+            os.unlink(dst)
+        if not symlink:
+            try:
+                os.link(src, dst)
+                stats['linked'] += 1
+                continue
+            except OSError:
+                pass  # Cross-device or unsupported: fall back to a symlink
+        os.symlink(src.resolve(), dst)
+        stats['symlinked'] += 1
+    return stats
+
+
+def link_images(src_dir: Path, dst_dir: Path, names: List[str], symlink: bool = False,
+                workers: int = LINK_WORKERS) -> Dict[str, int]:
+    """Hardlink (or symlink) names from src_dir into dst_dir from a thread pool."""
+    totals = {'linked': 0, 'unchanged': 0, 'missing': 0, 'symlinked': 0}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for stats in pool.map(lambda batch: _link_batch(src_dir, dst_dir, batch, symlink),
+                              iter_batches(names, LINK_BATCH)):
+            for key, value in stats.items():
+                totals[key] += value
+    return totals
+
+
+def build_split(dataset: GoldenVRU, split: Split, output_dir: Path, fraction: float, seed: int,
+                symlink: bool = False) -> Dict[str, object]:
+    """Sample one split and materialize it under output_dir/<split>."""
+    selected, strata = select_images(split, fraction, seed)
+    data = subset_annotations(split, selected)
+    file_names = [img['file_name'] for img in data['images']]
+
+    split_dir = output_dir / split.name
+    split_dir.mkdir(parents=True, exist_ok=True)
+
+    # Remove links of images no longer selected, but only from our own subsets
+    deleted = 0
+    if is_subset_dir(split_dir):
+        keep = set(file_names) | {ANNOTATIONS_FILE, MANIFEST_NAME}
+        stale = [entry.name for entry in os.scandir(split_dir) if entry.name not in keep]
+        deleted = bulk_delete(split_dir, stale)['deleted'] if stale else 0
+    elif any(os.scandir(split_dir)):
+        raise ValueError(f"{split_dir} is not empty and has no {MANIFEST_NAME} from {TOOL_NAME}")
+
+    stats = link_images(dataset.image_dir(split.name), split_dir, file_names, symlink)
+    write_json(split_dir / ANNOTATIONS_FILE, data)
+    write_json(split_dir / MANIFEST_NAME, {
+        'tool': TOOL_NAME,
+        'fraction': fraction,
+        'seed': seed,
+        'source_fingerprint': fingerprint(split.path),
+        'images': len(data['images']),
+        'annotations': len(data['annotations']),
+        'strata': strata,
+    }, indent=2)
+
+    return {
+        'images': len(data['images']),
+        'annotations': len(data['annotations']),
+        'of_images': len(split.images),
+        'strata': strata,
+        'deleted': deleted,
+        **stats,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Build a deterministic stratified dev subset')
+    parser.add_argument('--percent', type=float, default=1.0,
+                        help=f'Sample size per split in percent ({MIN_PERCENT:g}-{MAX_PERCENT:g}, default: 1)')
+    parser.add_argument('--seed', type=int, default=0, help='Sampling seed (default: 0)')
+    parser.add_argument('--output', type=Path, help=f'Output directory (default: {SUBSETS_DIR}/<name>)')
+    parser.add_argument('--symlink', action='store_true', help='Symlink images instead of hardlinking')
+    args = parser.parse_args()
+
+    if not MIN_PERCENT <= args.percent <= MAX_PERCENT:
+        parser.error(f"--percent must be between {MIN_PERCENT:g} and {MAX_PERCENT:g}")
+
+    output_dir = args.output or BASE_DIR / SUBSETS_DIR / subset_name(args.percent, args.seed)
+    try:
+        check_output_dir(output_dir, BASE_DIR)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print("=" * 60)
+    print("Golden-VRU Dev Subset")
+    print("=" * 60)
+    print(f"\n{args.percent:g}% per split, seed {args.seed} -> {output_dir}\n")
+
+    start = time.perf_counter()
+    dataset = GoldenVRU(BASE_DIR)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {'tool': TOOL_NAME, 'percent': args.percent, 'seed': args.seed, 'splits': {}}
+    for split in dataset:
+        split_start = time.perf_counter()
+        try:
+            stats = build_split(dataset, split, output_dir, args.percent / 100, args.seed, args.symlink)
+        except ValueError as e:
+            print(f"\n[ERROR] {e}")
+            return 1
+        manifest['splits'][split.name] = {
+            'source_fingerprint': fingerprint(split.path),
+            'images': stats['images'],
+            'annotations': stats['annotations'],
+            'strata': stats['strata'],
+        }
+        links = stats['linked'] + stats['symlinked']
+        missing = f", {stats['missing']:,} missing" if stats['missing'] else ''
+        print(f"  {split.name}: {stats['images']:,} of {stats['of_images']:,} images, "
+              f"{stats['annotations']:,} annotations, {len(stats['strata'])} strata "
+              f"({links:,} linked, {stats['unchanged']:,} unchanged, {stats['deleted']:,} removed"
+              f"{missing}) "
+              f"({time.perf_counter() - split_start:.1f}s)")
+
+    write_json(output_dir / MANIFEST_NAME, manifest, indent=2)
+
+    print(f"\nSubset written to {output_dir} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,556 @@
+#!/usr/bin/env python3
+"""
+Merge any number of COCO sources into the Golden-VRU dataset.
+
+Generalizes merge_nuimages.py to N sources in a single run:
+1. Loads golden-vru annotations, then each source's COCO annotations in turn
+   (only one source is in memory at a time)
+2. Shifts each source's image/annotation IDs past the running maximum IDs of
+   golden-vru and the sources before it (array arithmetic)
+3. Maps source category IDs onto golden-vru categories (explicit map or by name)
+4. Streams the merged annotations to disk without building merged lists
+   (source annotations are spooled to a temporary file until the images are
+   written)
+5. Copies source images with a per-source filename prefix
+
+Annotations whose image_id is not one of the source's images are dropped
+(shifted, they would dangle or attach to another source's image), counted and
+reported with a warning. Category IDs that are not in the source's lookup are
+an error, like unmapped ones.
+
+A source PATH may also be a tar or zip archive with the same <split>/ layout
+(archives.py). Its member index is read once, and images are streamed straight
+from the archive into the split (sequential reads, parallel writes) without
+extracting it first.
+
+Without --dry-run, all changes are planned in a write-ahead journal
+(journal.py) before any of them is made. Re-running after an interruption
+resumes the journal; `python journal.py rollback merge_sources` undoes the run.
+
+Usage:
+    python merge_sources.py --source NAME=PATH [--source NAME=PATH ...] [--dry-run]
+    python merge_sources.py --config sources.json [--dry-run]
+    python merge_sources.py --source nuimages=/mnt/data/nuimages-vru-coco.tar [--dry-run]
+
+A config file is a JSON list of sources:
+    [{"name": "nuimages", "path": "/mnt/data/nuimages/nuimages-vru-coco",
+      "prefix": "nuimages_", "category_map": {"0": 0, "1": 1}}]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from collections import Counter
+from itertools import compress
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from archives import extract_members, is_archive, open_archive
+from fileops import iter_batches
+from journal import Journal, print_next_steps, start_run
+
+
+# Paths
+BASE_DIR = Path(__file__).parent
+SPLITS = ['train', 'valid', 'test']
+ANNOTATIONS_FILE = '_annotations.coco.json'
+JOURNAL_NAME = 'merge_sources'
+
+# Records are joined and written in batches of this size
+WRITE_BATCH = 10000
+MISSING_EXAMPLES = 5  # Missing source images listed by name
+
+
+def load_annotations(path: Path) -> dict:
+    """Load COCO annotations from JSON file."""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def make_source(name: str, path: Path, prefix: Optional[str] = None,
+                category_map: Optional[Dict[int, int]] = None,
+                keep_category_ids: bool = False) -> dict:
+    """
+    Describe a merge source.
+
+    Images are renamed to `prefix + file_name` (default '<name>_') and tagged
+    with `source: name`. `category_map` maps source category IDs to golden-vru
+    category IDs; when omitted, categories are matched by name. With
+    keep_category_ids, category IDs are copied unchanged (merge_nuimages.py).
+    """
+    return {
+        'name': name,
+        'path': Path(path),
+        'prefix': f"{name}_" if prefix is None else prefix,
+        'category_map': {int(k): int(v) for k, v in (category_map or {}).items()},
+        'keep_category_ids': keep_category_ids,
+    }
+
+
+def load_source_annotations(source: dict, split: str) -> dict:
+    """Load a source split's COCO annotations (from a directory or an archive)."""
+    if is_archive(source['path']):
+        return open_archive(source['path']).load_annotations(split)
+    return load_annotations(source['path'] / split / ANNOTATIONS_FILE)
+
+
+def load_sources_config(path: Path) -> List[dict]:
+    """Load merge sources from a JSON config file."""
+    with open(path, 'r') as f:
+        entries = json.load(f)
+    return [make_source(e['name'], e['path'], e.get('prefix'), e.get('category_map'))
+            for e in entries]
+
+
+def id_array(records: List[dict], key: str) -> np.ndarray:
+    """Extract an integer field from COCO records as an array."""
+    return np.fromiter((r[key] for r in records), dtype=np.int64, count=len(records))
+
+
+def category_lookup(source: dict, source_categories: List[dict],
+                    golden_categories: List[dict]) -> np.ndarray:
+    """Build a source->golden category ID lookup table (-1 for unmapped)."""
+    mapping = dict(source['category_map'])
+    if not mapping:
+        golden_by_name = {cat['name']: cat['id'] for cat in golden_categories}
+        for cat in source_categories:
+            if cat['name'] in golden_by_name:
+                mapping[cat['id']] = golden_by_name[cat['name']]
+
+    size = max([cat['id'] for cat in source_categories] + list(mapping) + [0]) + 1
+    lookup = np.full(size, -1, dtype=np.int64)
+    for src_id, dst_id in mapping.items():
+        lookup[src_id] = dst_id
+    return lookup
+
+
+def remap_source(data: dict, source: dict, golden_categories: List[dict],
+                 img_offset: int, ann_offset: int) -> Dict[str, np.ndarray]:
+    """
+    Remap a source's IDs and categories into golden-vru ID space.
+
+    Orphan annotations (image_id not among the source's images) are dropped:
+    shifted by the offset they would dangle, or land on a later source's image.
+    """
+    image_ids = id_array(data['images'], 'id')
+    ann_image_ids = id_array(data['annotations'], 'image_id')
+    kept = np.isin(ann_image_ids, image_ids)
+
+    cat_ids = id_array(data['annotations'], 'category_id')
+    if source['keep_category_ids']:
+        mapped = cat_ids
+    else:
+        lookup = category_lookup(source, data['categories'], golden_categories)
+        in_range = (cat_ids >= 0) & (cat_ids < len(lookup))
+        mapped = np.full(len(cat_ids), -1, dtype=np.int64)
+        mapped[in_range] = lookup[cat_ids[in_range]]
+        if (mapped < 0).any():
+            unmapped = sorted(set(cat_ids[mapped < 0].tolist()))
+            raise ValueError(f"Source '{source['name']}' has unmapped category IDs: {unmapped}")
+
+    return {
+        'image_ids': image_ids + img_offset,
+        'ann_ids': id_array(data['annotations'], 'id')[kept] + ann_offset,
+        'ann_image_ids': ann_image_ids[kept] + img_offset,
+        'ann_category_ids': mapped[kept],
+        'ann_kept': kept,
+        'orphans': int(len(kept) - kept.sum()),
+    }
+
+
+def iter_source_images(data: dict, source: dict, remapped: Dict[str, np.ndarray]) -> Iterator[str]:
+    """Yield serialized, remapped source images."""
+    tag = json.dumps(source['name'])
+    for new_id, img in zip(remapped['image_ids'].tolist(), data['images']):
+        yield ('{"id": %d, "file_name": %s, "width": %s, "height": %s, "source": %s}'
+               % (new_id, json.dumps(source['prefix'] + img['file_name']),
+                  json.dumps(img['width']), json.dumps(img['height']), tag))
+
+
+def iter_source_annotations(data: dict, remapped: Dict[str, np.ndarray]) -> Iterator[str]:
+    """Yield serialized, remapped source annotations (orphans dropped)."""
+    rows = zip(remapped['ann_ids'].tolist(), remapped['ann_image_ids'].tolist(),
+               remapped['ann_category_ids'].tolist(),
+               compress(data['annotations'], remapped['ann_kept'].tolist()))
+    for new_id, image_id, category_id, ann in rows:
+        yield ('{"id": %d, "image_id": %d, "category_id": %d, "bbox": %s, "area": %s, "iscrowd": %s}'
+               % (new_id, image_id, category_id, json.dumps(ann['bbox']),
+                  json.dumps(ann['area']), json.dumps(ann.get('iscrowd', 0))))
+
+
+def write_json_array(out, key: str, parts: Iterable[Iterable[str]], first_key: bool = False):
+    """Stream `"key": [...]` to out from several iterables of serialized records."""
+    out.write(('' if first_key else ', ') + json.dumps(key) + ': [')
+    written = 0
+    batch = []
+    for part in parts:
+        for record in part:
+            batch.append(record)
+            if len(batch) >= WRITE_BATCH:
+                out.write((', ' if written else '') + ', '.join(batch))
+                written += len(batch)
+                batch = []
+    if batch:
+        out.write((', ' if written else '') + ', '.join(batch))
+    out.write(']')
+
+
+def count_categories(counts: Counter, category_ids: np.ndarray):
+    """Add per-category annotation counts of an ID array to counts."""
+    if len(category_ids):
+        for cat_id, count in enumerate(np.bincount(category_ids).tolist()):
+            if count:
+                counts[cat_id] += count
+
+
+def iter_sources(split: str, sources: List[dict], golden_data: dict, stats: Dict[str, int],
+                 category_counts: Counter) -> Iterator[Tuple[dict, dict, Dict[str, np.ndarray]]]:
+    """
+    Load, remap and yield (source, data, remapped) one source at a time.
+
+    Each source is shifted past the running maximum image/annotation IDs of
+    golden-vru and the sources before it. Its data is released once the
+    caller moves on to the next source.
+    """
+    max_img_id = max((img['id'] for img in golden_data['images']), default=0)
+    max_ann_id = max((ann['id'] for ann in golden_data['annotations']), default=0)
+    print(f"\nGolden-VRU max IDs - Image: {max_img_id}, Annotation: {max_ann_id}")
+
+    for source in sources:
+        print(f"Loading {source['name']} {split} annotations...")
+        data = load_source_annotations(source, split)
+        print(f"  Images: {len(data['images']):,}")
+        print(f"  Annotations: {len(data['annotations']):,}")
+
+        img_offset, ann_offset = max_img_id + 1, max_ann_id + 1
+        remapped = remap_source(data, source, golden_data['categories'], img_offset, ann_offset)
+        print(f"  {source['name']}: image offset {img_offset:,}, annotation offset {ann_offset:,}")
+        if remapped['orphans']:
+            print(f"  [WARN] {source['name']}: dropped {remapped['orphans']:,} annotations "
+                  f"referencing image IDs not in the source")
+
+        max_img_id = img_offset + max((img['id'] for img in data['images']), default=0)
+        max_ann_id = ann_offset + max((ann['id'] for ann in data['annotations']), default=0)
+        stats[f"{source['name']}_images"] = len(data['images'])
+        stats[f"{source['name']}_annotations"] = len(remapped['ann_ids'])
+        stats[f"{source['name']}_orphan_annotations"] = remapped['orphans']
+        count_categories(category_counts, remapped['ann_category_ids'])
+
+        yield source, data, remapped
+
+
+def write_merged(path: Optional[Path], split: str, golden_data: dict, sources: List[dict],
+                 on_source: Callable[[dict, dict], None]) -> Dict[str, int]:
+    """
+    Stream merged annotations to path (atomically replaced on completion).
+
+    Sources are loaded one at a time: their images are written as they come
+    and their annotations spooled to a temporary file, which is appended
+    after the images. on_source(source, data) is called for every source
+    while its data is loaded (to copy or plan its images). With path None,
+    nothing is written (dry run). Returns statistics.
+    """
+    stats = {
+        'golden_images': len(golden_data['images']),
+        'golden_annotations': len(golden_data['annotations']),
+    }
+    category_counts = Counter()
+    count_categories(category_counts, id_array(golden_data['annotations'], 'category_id'))
+
+    tmp_path = path.with_name(path.name + '.tmp') if path else None
+    with open(tmp_path or os.devnull, 'w') as out, tempfile.TemporaryFile('w+') as spool:
+        def image_parts():
+            yield map(json.dumps, golden_data['images'])
+            for source, data, remapped in iter_sources(split, sources, golden_data, stats,
+                                                       category_counts):
+                on_source(source, data)
+                if path:
+                    for batch in iter_batches(iter_source_annotations(data, remapped), WRITE_BATCH):
+                        spool.write('\n'.join(batch) + '\n')
+                yield iter_source_images(data, source, remapped)
+
+        def spooled_annotations():
+            spool.seek(0)
+            for line in spool:
+                yield line.rstrip('\n')
+
+        out.write('{')
+        out.write('"categories": ' + json.dumps(golden_data['categories']))
+        write_json_array(out, 'images', image_parts())
+        write_json_array(out, 'annotations', [map(json.dumps, golden_data['annotations']),
+                                              spooled_annotations()])
+
+        # Copy over any additional keys (like 'info', 'licenses')
+        for key, value in golden_data.items():
+            if key not in ('categories', 'images', 'annotations'):
+                out.write(', ' + json.dumps(key) + ': ' + json.dumps(value))
+        out.write('}')
+
+    if tmp_path:
+        os.replace(tmp_path, path)
+
+    stats['merged_images'] = stats['golden_images'] + sum(
+        stats[f"{source['name']}_images"] for source in sources)
+    stats['merged_annotations'] = stats['golden_annotations'] + sum(
+        stats[f"{source['name']}_annotations"] for source in sources)
+    cat_names = {cat['id']: cat['name'] for cat in golden_data['categories']}
+    for cat_id, count in sorted(category_counts.items()):
+        stats[cat_names.get(cat_id, str(cat_id))] = count
+    return stats
+
+
+def iter_copy_jobs(split: str, source: dict, data: dict, base_dir: Path) -> Iterator[Tuple[Path, Path]]:
+    """Yield (src, dst) image copy jobs of a directory source."""
+    src_dir, dst_dir = source['path'] / split, base_dir / split
+    for img in data['images']:
+        yield src_dir / img['file_name'], dst_dir / (source['prefix'] + img['file_name'])
+
+
+def extract_jobs(split: str, source: dict, data: dict, base_dir: Path) -> List[Tuple[str, Path]]:
+    """(member, dst) image jobs of an archive source."""
+    archive = open_archive(source['path'])
+    dst_dir = base_dir / split
+    return [(archive.member_name(split, img['file_name']), dst_dir / (source['prefix'] + img['file_name']))
+            for img in data['images']]
+
+
+def extract_images(source: dict, jobs: List[Tuple[str, Path]]) -> Tuple[Dict[str, int], List[str]]:
+    """
+    Stream images from an archive source, skipping destinations that already exist.
+
+    Returns outcome counts (copied/skipped/missing) and the missing member names;
+    missing members are skipped, as in journaled runs.
+    """
+    counts = {'copied': 0, 'skipped': 0, 'missing': 0}
+    missing = []
+    for index, outcome in extract_members(open_archive(source['path']), jobs):
+        counts[outcome] += 1
+        if outcome == 'missing':
+            missing.append(jobs[index][0])
+        done = sum(counts.values())
+        if done % 5000 == 0:
+            print(f"  Progress: {done:,}/{len(jobs):,}")
+    return counts, missing
+
+
+def copy_images(jobs: Iterable[Tuple[Path, Path]], total: int) -> Tuple[Dict[str, int], List[str]]:
+    """
+    Copy images, skipping destinations that already exist.
+
+    Returns outcome counts (copied/skipped/missing) and the missing source paths;
+    missing sources are skipped, as in journaled runs.
+    """
+    counts = {'copied': 0, 'skipped': 0, 'missing': 0}
+    missing = []
+    for src, dst in jobs:
+        if dst.exists():
+            counts['skipped'] += 1
+        else:
+            try:
+                shutil.copy2(src, dst)
+                counts['copied'] += 1
+            except FileNotFoundError:
+                counts['missing'] += 1
+                missing.append(str(src))
+
+        done = sum(counts.values())
+        if done % 5000 == 0:
+            print(f"  Progress: {done:,}/{total:,}")
+
+    return counts, missing
+
+
+def report_missing(count: int, examples: List[str]):
+    """Warn about source images that could not be copied."""
+    if count:
+        print(f"  [WARN] {count:,} source images missing (not copied)")
+        for name in examples[:MISSING_EXAMPLES]:
+            print(f"    {name}")
+        if count > MISSING_EXAMPLES:
+            print(f"    ... and {count - MISSING_EXAMPLES:,} more")
+
+
+def merge_split(split: str, sources: List[dict], dry_run: bool = False,
+                base_dir: Optional[Path] = None, backup_name: Optional[str] = None,
+                journal: Optional[Journal] = None) -> Dict[str, int]:
+    """
+    Merge every source into a single split (train/valid/test).
+
+    Sources are loaded and merged one at a time. With a journal, the backup,
+    image copies and annotation write are planned in it instead of being made
+    directly.
+
+    Returns statistics dict.
+    """
+    base_dir = base_dir or BASE_DIR
+    golden_ann_path = base_dir / split / ANNOTATIONS_FILE
+    golden_backup_path = base_dir / split / backup_name if backup_name else None
+
+    print(f"\n{'='*60}")
+    print(f"Processing {split.upper()} split")
+    print(f"{'='*60}")
+
+    # Load annotations
+    print(f"Loading golden-vru {split} annotations...")
+    golden_data = load_annotations(golden_ann_path)
+    print(f"  Images: {len(golden_data['images']):,}")
+    print(f"  Annotations: {len(golden_data['annotations']):,}")
+
+    if dry_run:
+        stats = write_merged(None, split, golden_data, sources, lambda source, data: None)
+        num_copies = stats['merged_images'] - stats['golden_images']
+        print(f"\n  Merged images: {stats['merged_images']:,}")
+        print(f"  Merged annotations: {stats['merged_annotations']:,}")
+        print(f"\n[DRY RUN] Would perform the following:")
+        if golden_backup_path:
+            print(f"  - Backup {golden_ann_path} to {golden_backup_path}")
+        print(f"  - Copy {num_copies:,} images to {base_dir / split}")
+        print(f"  - Save merged annotations to {golden_ann_path}")
+        return stats
+
+    if journal is not None:
+        if golden_backup_path:
+            journal.plan_copy(golden_ann_path, golden_backup_path)
+
+        def plan_images(source: dict, data: dict):
+            if is_archive(source['path']):
+                for member, dst in extract_jobs(split, source, data, base_dir):
+                    journal.plan_extract(source['path'], member, dst)
+            else:
+                for src, dst in iter_copy_jobs(split, source, data, base_dir):
+                    journal.plan_copy(src, dst)
+
+        # Written next to the annotations first, so image copies are planned before the write
+        merged_path = golden_ann_path.with_name(golden_ann_path.name + '.merged')
+        stats = write_merged(merged_path, split, golden_data, sources, plan_images)
+        num_copies = stats['merged_images'] - stats['golden_images']
+        print(f"\n  Merged images: {stats['merged_images']:,}")
+        print(f"  Merged annotations: {stats['merged_annotations']:,}")
+        print(f"\nPlanned: copy {num_copies:,} images to {base_dir / split}")
+
+        journal.plan_write(golden_ann_path, lambda staged: os.replace(merged_path, staged))
+        print(f"Planned: merged annotations to {golden_ann_path}")
+        return stats
+
+    if golden_backup_path:
+        print(f"\nBacking up annotations...")
+        if golden_backup_path.exists():
+            print(f"  Backup already exists: {golden_backup_path}")
+        else:
+            shutil.copy2(golden_ann_path, golden_backup_path)
+            print(f"  Saved: {golden_backup_path}")
+
+    counts = {'copied': 0, 'skipped': 0, 'missing': 0}
+    missing = []
+
+    def copy_source_images(source: dict, data: dict):
+        print(f"Copying {len(data['images']):,} {source['name']} images...")
+        if is_archive(source['path']):
+            source_counts, source_missing = extract_images(
+                source, extract_jobs(split, source, data, base_dir))
+        else:
+            source_counts, source_missing = copy_images(
+                iter_copy_jobs(split, source, data, base_dir), len(data['images']))
+        for key, value in source_counts.items():
+            counts[key] += value
+        missing.extend(source_missing[:MISSING_EXAMPLES])
+
+    stats = write_merged(golden_ann_path, split, golden_data, sources, copy_source_images)
+    print(f"  Copied: {counts['copied']:,}, Skipped (already exist): {counts['skipped']:,}")
+    report_missing(counts['missing'], missing)
+    stats['missing_images'] = counts['missing']
+    print(f"\n  Merged images: {stats['merged_images']:,}")
+    print(f"  Merged annotations: {stats['merged_annotations']:,}")
+    print(f"  Saved: {golden_ann_path}")
+    return stats
+
+
+def parse_source_arg(value: str) -> dict:
+    """Parse a NAME=PATH command-line source."""
+    name, sep, path = value.partition('=')
+    if not sep or not name or not path:
+        raise argparse.ArgumentTypeError(f"Expected NAME=PATH, got '{value}'")
+    return make_source(name, Path(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Merge COCO sources into Golden-VRU')
+    parser.add_argument('--source', type=parse_source_arg, action='append', default=[],
+                        help='Source as NAME=PATH (prefix NAME_, categories matched by name)')
+    parser.add_argument('--config', type=Path,
+                        help='JSON list of sources with name, path, prefix, category_map')
+    parser.add_argument('--backup-name',
+                        help='Back up each split annotation file to this name before merging')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Show what would be done without making changes')
+    args = parser.parse_args()
+
+    sources = list(args.source)
+    if args.config:
+        sources.extend(load_sources_config(args.config))
+    if not sources:
+        parser.error('at least one --source or --config is required')
+
+    names = [s['name'] for s in sources]
+    if len(set(names)) != len(names):
+        parser.error(f"duplicate source names: {names}")
+
+    print("=" * 60)
+    print(f"Golden-VRU Merge: Adding {len(sources)} source(s)")
+    print("=" * 60)
+
+    if args.dry_run:
+        print("\n[DRY RUN MODE - No changes will be made]")
+
+    for source in sources:
+        print(f"\nSource: {source['name']} ({source['path']}, prefix '{source['prefix']}')")
+    print(f"Target: {BASE_DIR}")
+
+    journal = None
+    if not args.dry_run:
+        journal = start_run(JOURNAL_NAME)
+        if journal is None:
+            return
+
+    all_stats = {}
+    for split in SPLITS:
+        all_stats[split] = merge_split(split, sources, dry_run=args.dry_run,
+                                       backup_name=args.backup_name, journal=journal)
+
+    if journal is not None:
+        journal.finish_plan()
+        print(f"\nApplying {len(journal.ops):,} journaled operations...")
+        counts = journal.apply()
+        print(f"  Copied: {counts['copied']:,}, Skipped (already exist): {counts['skipped']:,}")
+        if counts['missing']:
+            print(f"  [WARN] {counts['missing']:,} source images missing (not copied)")
+
+    # Print summary
+    print("\n" + "=" * 60)
+    print("MERGE SUMMARY")
+    print("=" * 60)
+
+    print(f"\n{'Split':<8} {'Images':>10} {'Annotations':>12} {'Pedestrian':>12} {'Cyclist':>10}")
+    print("-" * 56)
+    for split in SPLITS:
+        stats = all_stats[split]
+        print(f"{split.capitalize():<8} {stats['merged_images']:>10,} {stats['merged_annotations']:>12,} "
+              f"{stats.get('pedestrian', 0):>12,} {stats.get('cyclist', 0):>10,}")
+    print("-" * 56)
+
+    if args.dry_run:
+        print("\n[DRY RUN] No changes were made. Run without --dry-run to merge.")
+    else:
+        print("\n[DONE] Merge complete!")
+        print_next_steps(JOURNAL_NAME)
+        print("Next steps:")
+        print("  1. Run: python validate_dataset.py")
+        print("  2. Update STATS.md and DATASET_REPORT.md")
+
+
+if __name__ == '__main__':
+    main()
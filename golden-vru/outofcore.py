@@ -0,0 +1,714 @@
+#!/usr/bin/env python3
+"""
+Out-of-core processing for annotation files larger than memory.
+
+Every other script loads a whole split with json.load. This mode never holds
+more than a configurable memory budget of records:
+
+1. The COCO file is parsed incrementally, one image/annotation at a time
+2. Images (by id) and annotations (by image_id, id) are sorted with an
+   external merge sort: records are buffered up to the budget, spilled to
+   disk as sorted runs and merged back with heapq.merge
+3. The two sorted streams are merge-joined into per-image groups
+4. In a single streaming pass, batches of complete groups go through the
+   same functions as the in-memory scripts (filter_small_objects and
+   extract_rsud.separate_rsud_data), are validated with the
+   validate_dataset.py checks and are streamed to the output files
+
+Outputs hold the same records as the in-memory scripts, ordered by image ID
+(annotations grouped by image) rather than in the original file order.
+
+With --apply, the new annotation files are staged and every file change is
+planned in a write-ahead journal (journal.py) before it is made;
+`python journal.py rollback outofcore` undoes the run.
+
+Usage:
+    python outofcore.py [--filter] [--extract-rsud] [--apply] [--memory-mb N]
+                        [--split SPLIT ...] [--backup-name NAME] [--tmp-dir DIR]
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import extract_rsud
+import filter_small_objects
+import validate_dataset
+from journal import Journal, print_delete_stats, print_next_steps, start_run
+
+# Constants
+BASE_DIR = Path(__file__).parent
+SPLITS = ['train', 'valid', 'test']
+ANNOTATIONS_FILE = '_annotations.coco.json'
+JOURNAL_NAME = 'outofcore'
+DEFAULT_MEMORY_MB = 512
+STREAMED_KEYS = ('images', 'annotations')
+
+READ_CHUNK = 1 << 20
+RUN_BUFFER = 1 << 16
+MERGE_FAN_IN = 128  # Max runs merged at once (open files)
+ENTRY_OVERHEAD = 160  # Estimated bytes per buffered record beyond its JSON text
+RECORD_BYTES = 600  # Estimated bytes per decoded record dict in a processing batch
+MAX_ORPHAN_GROUP = 10000
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+
+
+# Incremental COCO parsing
+
+class _StreamReader:
+    """Buffered reader that decodes one JSON value at a time."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        chunk = self.f.read(READ_CHUNK)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character (not consumed)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON")
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}, got '{self.buf[self.pos]}'")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+                # A value ending at the buffer end (e.g. a number) may continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+
+def iter_coco(path: Path) -> Iterator[Tuple[str, object]]:
+    """
+    Stream a COCO file as (key, value) pairs.
+
+    'images' and 'annotations' are yielded once per record; every other
+    top-level key (categories, info, ...) is yielded once with its value.
+    """
+    with open(path, 'r') as f:
+        reader = _StreamReader(f)
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+
+        while True:
+            key = reader.value()
+            reader.expect(':')
+            if key in STREAMED_KEYS and reader.peek() == '[':
+                reader.pos += 1
+                if reader.peek() == ']':
+                    reader.pos += 1
+                else:
+                    while True:
+                        yield key, reader.value()
+                        char = reader.peek()
+                        reader.pos += 1
+                        if char == ']':
+                            break
+                        if char != ',':
+                            raise ValueError(f"Malformed '{key}' array in {path}")
+            else:
+                yield key, reader.value()
+
+            char = reader.peek()
+            reader.pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError(f"Malformed top-level object in {path}")
+
+
+# External merge sort
+
+def _iter_run(path: Path) -> Iterator[Tuple[Tuple[int, int], str]]:
+    with open(path, 'r', buffering=RUN_BUFFER) as f:
+        for line in f:
+            major, minor, record = line.rstrip('\n').split('\t', 2)
+            yield (int(major), int(minor)), record
+
+
+class ExternalSorter:
+    """Sorts records by an integer key pair within a memory budget."""
+
+    def __init__(self, spill_dir: Path, name: str, budget_bytes: int):
+        self.spill_dir = Path(spill_dir)
+        self.name = name
+        self.budget_bytes = budget_bytes
+        self.buffer: List[Tuple[Tuple[int, int], str]] = []
+        self.buffered_bytes = 0
+        self.runs: List[Path] = []
+        self.run_count = 0
+        self.count = 0
+
+    def add(self, key: Tuple[int, int], record: dict):
+        line = json.dumps(record)
+        self.buffer.append((key, line))
+        self.buffered_bytes += len(line) + ENTRY_OVERHEAD
+        self.count += 1
+        if self.buffered_bytes >= self.budget_bytes:
+            self._spill()
+
+    def _new_run(self) -> Path:
+        self.run_count += 1
+        return self.spill_dir / f"{self.name}-{self.run_count:05d}.run"
+
+    def _write_run(self, items: Iterable[Tuple[Tuple[int, int], str]]) -> Path:
+        path = self._new_run()
+        with open(path, 'w', buffering=RUN_BUFFER) as f:
+            for (major, minor), line in items:
+                f.write(f"{major}\t{minor}\t{line}\n")
+        return path
+
+    def _spill(self):
+        if self.buffer:
+            self.buffer.sort(key=lambda item: item[0])
+            self.runs.append(self._write_run(self.buffer))
+            self.buffer = []
+            self.buffered_bytes = 0
+
+    def __iter__(self) -> Iterator[dict]:
+        """Yield the records in key order (consumes the sorter)."""
+        if not self.runs:
+            self.buffer.sort(key=lambda item: item[0])
+            for _, line in self.buffer:
+                yield json.loads(line)
+            self.buffer = []
+            return
+
+        self._spill()
+        # Merge in levels so no more than MERGE_FAN_IN runs are open at once
+        while len(self.runs) > MERGE_FAN_IN:
+            group, self.runs = self.runs[:MERGE_FAN_IN], self.runs[MERGE_FAN_IN:]
+            merged = heapq.merge(*(_iter_run(p) for p in group), key=lambda item: item[0])
+            self.runs.append(self._write_run(merged))
+            for path in group:
+                path.unlink()
+
+        merged = heapq.merge(*(_iter_run(p) for p in self.runs), key=lambda item: item[0])
+        for _, line in merged:
+            yield json.loads(line)
+        for path in self.runs:
+            path.unlink()
+        self.runs = []
+
+
+def iter_image_groups(images: Iterable[dict],
+                      annotations: Iterable[dict]) -> Iterator[Tuple[Optional[dict], List[dict]]]:
+    """
+    Merge-join images sorted by id with annotations sorted by image_id.
+
+    Yields (image, annotations) for every image, and (None, annotations) for
+    annotations whose image_id matches no image, in groups of at most
+    MAX_ORPHAN_GROUP.
+    """
+    anns = iter(annotations)
+    pending = next(anns, None)
+
+    for img in images:
+        orphans = []
+        while pending is not None and pending['image_id'] < img['id']:
+            orphans.append(pending)
+            if len(orphans) >= MAX_ORPHAN_GROUP:
+                yield None, orphans
+                orphans = []
+            pending = next(anns, None)
+        if orphans:
+            yield None, orphans
+
+        group = []
+        while pending is not None and pending['image_id'] == img['id']:
+            group.append(pending)
+            pending = next(anns, None)
+        yield img, group
+
+    orphans = []
+    while pending is not None:
+        orphans.append(pending)
+        if len(orphans) >= MAX_ORPHAN_GROUP:
+            yield None, orphans
+            orphans = []
+        pending = next(anns, None)
+    if orphans:
+        yield None, orphans
+
+
+# Streaming output and validation
+
+class CocoWriter:
+    """Streams images and annotations to a COCO file without holding them."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._parts = {key: open(self.path.with_name(f"{self.path.name}.{key}.part"), 'w')
+                       for key in STREAMED_KEYS}
+        self.counts = {key: 0 for key in STREAMED_KEYS}
+
+    def add(self, data: dict):
+        for key in STREAMED_KEYS:
+            if data[key]:
+                out = self._parts[key]
+                out.write((', ' if self.counts[key] else '') + ', '.join(map(json.dumps, data[key])))
+                self.counts[key] += len(data[key])
+
+    def finish(self, categories: list, extras: Dict[str, object]):
+        """Assemble the final file: categories, images, annotations, then other keys."""
+        with open(self.path, 'w') as out:
+            out.write('{"categories": ' + json.dumps(categories))
+            for key, part in self._parts.items():
+                part.close()
+                out.write(', ' + json.dumps(key) + ': [')
+                with open(part.name, 'r') as f:
+                    shutil.copyfileobj(f, out, READ_CHUNK)
+                out.write(']')
+                os.remove(part.name)
+            for key, value in extras.items():
+                out.write(', ' + json.dumps(key) + ': ' + json.dumps(value))
+            out.write('}')
+
+    def discard(self):
+        for part in self._parts.values():
+            part.close()
+            Path(part.name).unlink(missing_ok=True)
+        self.path.unlink(missing_ok=True)
+
+
+class StreamValidator:
+    """validate_dataset.validate_split checks, accumulated batch by batch."""
+
+    def __init__(self, split_dir: Path, categories: List[dict]):
+        self.split_dir = split_dir
+        self.valid_cat_ids = {cat['id'] for cat in categories}
+        self.categories = {cat['id']: cat['name'] for cat in categories}
+        self.images = 0
+        self.annotations = 0
+        self.missing_files: List[str] = []
+        self.missing_count = 0
+        self.invalid_image_refs = 0
+        self.invalid_cat_ids = 0
+        self.small_objects = 0
+        self.missing_fields = defaultdict(int)
+        self.class_counts = defaultdict(int)
+        self.size_counts = {'medium': 0, 'large': 0}
+
+    def update(self, data: dict):
+        """Check one batch of complete image groups."""
+        image_ids = set()
+        for img in data['images']:
+            image_ids.add(img['id'])
+            if not os.path.lexists(self.split_dir / img['file_name']):
+                self.missing_count += 1
+                if len(self.missing_files) < 5:
+                    self.missing_files.append(img['file_name'])
+
+        for ann in data['annotations']:
+            if ann['image_id'] not in image_ids:
+                self.invalid_image_refs += 1
+            if ann['category_id'] not in self.valid_cat_ids:
+                self.invalid_cat_ids += 1
+            if ann['area'] < validate_dataset.SIZE_THRESHOLD:
+                self.small_objects += 1
+            for field in ('id', 'image_id', 'category_id', 'bbox', 'area'):
+                if field not in ann:
+                    self.missing_fields[field] += 1
+            self.class_counts[self.categories.get(ann['category_id'], 'unknown')] += 1
+            self.size_counts['medium' if ann['area'] < 96 * 96 else 'large'] += 1
+
+        self.images += len(data['images'])
+        self.annotations += len(data['annotations'])
+
+    def report(self, deleted_files: List[str]) -> Tuple[bool, List[str], List[str]]:
+        """Print the results; deleted_files are images the run removes from the split."""
+        errors = []
+        warnings = []
+
+        for file_name in self.missing_files:
+            errors.append(f"Missing image file: {file_name}")
+        if self.missing_count > 5:
+            errors.append(f"... and {self.missing_count - 5} more missing files")
+        if self.missing_count == 0:
+            print(f"  [PASS] All {self.images:,} image files exist")
+        else:
+            print(f"  [FAIL] {self.missing_count:,} image files missing")
+
+        # Image files left in the directory once the run's deletions are made
+        on_disk = sum(1 for entry in os.scandir(self.split_dir)
+                      if entry.name.endswith(('.jpg', '.png')))
+        deleting = sum(1 for name in deleted_files if os.path.lexists(self.split_dir / name))
+        actual_count = on_disk - deleting
+        if actual_count == self.images:
+            print(f"  [PASS] Image count matches: {actual_count:,}")
+        elif actual_count > self.images:
+            warnings.append(f"Extra image files: {actual_count - self.images} files not in annotations")
+            print(f"  [WARN] {actual_count - self.images:,} extra image files not in annotations")
+        else:
+            errors.append(f"Missing image files: {self.images - actual_count} files referenced but not found")
+            print(f"  [FAIL] {self.images - actual_count:,} image files missing")
+
+        checks = [
+            (self.invalid_image_refs, "All annotations reference valid images",
+             "Invalid image references", "annotations reference invalid images"),
+            (self.invalid_cat_ids, "All annotations have valid category IDs",
+             "Invalid category IDs", "annotations have invalid category IDs"),
+            (self.small_objects, "No small objects found",
+             "Small objects found", "small objects still in dataset"),
+        ]
+        for count, passed, error, failed in checks:
+            if count == 0:
+                print(f"  [PASS] {passed}")
+            else:
+                errors.append(f"{error}: {count}")
+                print(f"  [FAIL] {count:,} {failed}")
+
+        if not self.missing_fields:
+            print(f"  [PASS] All required fields present")
+        else:
+            for field, count in self.missing_fields.items():
+                errors.append(f"Missing field '{field}': {count} annotations")
+            print(f"  [FAIL] Missing required fields")
+
+        print(f"\n  Summary:")
+        print(f"    Images: {self.images:,}")
+        print(f"    Annotations: {self.annotations:,}")
+        total = sum(self.class_counts.values())
+        for cat_name, count in sorted(self.class_counts.items()):
+            pct = count / total * 100 if total > 0 else 0
+            print(f"    {cat_name}: {count:,} ({pct:.1f}%)")
+        print(f"    Size: medium {self.size_counts['medium']:,}, large {self.size_counts['large']:,}")
+
+        return len(errors) == 0, errors, warnings
+
+
+# Streaming pass
+
+class NameSpill:
+    """File names spilled to an unnamed temporary file, one per line."""
+
+    def __init__(self, spill_dir: Optional[Path] = None):
+        self._file = tempfile.TemporaryFile('w+', dir=spill_dir)
+        self._count = 0
+
+    def extend(self, names: Iterable[str]):
+        for name in names:
+            self._file.write(name + '\n')
+            self._count += 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[str]:
+        self._file.flush()
+        self._file.seek(0)
+        for line in self._file:
+            yield line[:-1]
+        self._file.seek(0, os.SEEK_END)
+
+    def close(self):
+        self._file.close()
+
+
+def merge_stats(total: Dict[str, object], stats: Dict[str, object],
+                spill_dir: Optional[Path] = None):
+    """Add a batch's stats (ints are summed, file name lists spilled to disk)."""
+    for key, value in stats.items():
+        if isinstance(value, list):
+            if key not in total:
+                total[key] = NameSpill(spill_dir)
+            total[key].extend(value)
+        else:
+            total[key] = total.get(key, 0) + value
+
+
+def close_result(result: dict):
+    """Release a process_split result's spilled file name lists."""
+    for stats in (result['filter'], result['separate']):
+        for value in stats.values():
+            if isinstance(value, NameSpill):
+                value.close()
+
+
+def process_split(split: str, memory_mb: int = DEFAULT_MEMORY_MB, filter_small: bool = False,
+                  extract: bool = False, spill_dir: Optional[Path] = None,
+                  output_path: Optional[Path] = None,
+                  rsud_output_path: Optional[Path] = None) -> dict:
+    """
+    Run grouping, filtering, separation and validation over one split in a
+    single streaming pass.
+
+    Annotation files are only written when output paths are given. Returns
+    the filter/separation stats, the validation result and record counts;
+    the removed and RSUD file name lists in the stats are spilled to disk
+    (NameSpill) and released with close_result().
+    """
+    split_dir = BASE_DIR / split
+    budget = memory_mb << 20
+
+    with tempfile.TemporaryDirectory(prefix=f'outofcore-{split}-', dir=spill_dir) as tmp:
+        # Pass 1: parse and spill sorted runs (images and annotations share the budget)
+        start = time.perf_counter()
+        images = ExternalSorter(Path(tmp), 'images', budget // 4)
+        annotations = ExternalSorter(Path(tmp), 'annotations', budget // 2)
+        categories, extras = [], {}
+        for key, value in iter_coco(split_dir / ANNOTATIONS_FILE):
+            if key == 'annotations':
+                annotations.add((value['image_id'], value['id']), value)
+            elif key == 'images':
+                images.add((value['id'], 0), value)
+            elif key == 'categories':
+                categories = value
+            else:
+                extras[key] = value
+        print(f"  Read {images.count:,} images, {annotations.count:,} annotations "
+              f"({len(images.runs) + len(annotations.runs)} spilled runs, "
+              f"{time.perf_counter() - start:.1f}s)")
+
+        # Pass 2: merge, group and process batches of complete image groups
+        start = time.perf_counter()
+        validator = StreamValidator(split_dir, categories)
+        writer = CocoWriter(output_path) if output_path else None
+        rsud_writer = CocoWriter(rsud_output_path) if rsud_output_path and extract else None
+        filter_stats: Dict[str, object] = {}
+        separate_stats: Dict[str, object] = {}
+
+        def process_batch(batch_images: List[dict], batch_annotations: List[dict]):
+            data = {'categories': categories, 'images': batch_images, 'annotations': batch_annotations}
+            if filter_small:
+                data, stats = filter_small_objects.filter_small_objects(data)
+                merge_stats(filter_stats, stats, spill_dir)
+            if extract:
+                data, rsud_data, stats = extract_rsud.separate_rsud_data(data)
+                merge_stats(separate_stats, stats, spill_dir)
+                if rsud_writer:
+                    rsud_writer.add(rsud_data)
+            validator.update(data)
+            if writer:
+                writer.add(data)
+
+        batch_images, batch_annotations, batch_bytes = [], [], 0
+        try:
+            for img, group in iter_image_groups(images, annotations):
+                if img is not None:
+                    batch_images.append(img)
+                batch_annotations.extend(group)
+                batch_bytes += RECORD_BYTES * (len(group) + 1)
+                if batch_bytes >= budget // 4:
+                    process_batch(batch_images, batch_annotations)
+                    batch_images, batch_annotations, batch_bytes = [], [], 0
+            if batch_images or batch_annotations:
+                process_batch(batch_images, batch_annotations)
+
+            for out in (writer, rsud_writer):
+                if out:
+                    out.finish(categories, extras)
+        except BaseException:
+            for out in (writer, rsud_writer):
+                if out:
+                    out.discard()
+            raise
+
+        print(f"  Processed in one streaming pass ({time.perf_counter() - start:.1f}s)")
+
+    deleted = itertools.chain(filter_stats.get('removed_image_files', ()),
+                              separate_stats.get('rsud_files', ()))
+    print(f"\n  Validating result...")
+    is_valid, errors, warnings = validator.report(deleted)
+
+    return {
+        'filter': filter_stats,
+        'separate': separate_stats,
+        'valid': is_valid,
+        'errors': errors,
+        'warnings': warnings,
+        'images': validator.images,
+        'annotations': validator.annotations,
+    }
+
+
+def staged_paths(split: str) -> Tuple[Path, Path]:
+    """Where a split's output and RSUD annotation files are staged before planning."""
+    name = f"{ANNOTATIONS_FILE}.{JOURNAL_NAME}.tmp"
+    return BASE_DIR / split / name, extract_rsud.RSUD_OUTPUT_DIR / split / name
+
+
+def remove_staged(split: str):
+    for path in staged_paths(split):
+        path.unlink(missing_ok=True)
+
+
+def plan_split(journal: Journal, split: str, result: dict, staged_output: Optional[Path],
+               staged_rsud: Optional[Path], backup_name: Optional[str]):
+    """Plan a split's file changes in the journal, in the same order as the scripts."""
+    split_dir = BASE_DIR / split
+    ann_path = split_dir / ANNOTATIONS_FILE
+
+    if backup_name:
+        journal.plan_copy(ann_path, split_dir / backup_name)
+
+    rsud_files = result['separate'].get('rsud_files', ())
+    if staged_rsud:
+        extract_rsud.copy_rsud_images(split, rsud_files, dry_run=False, journal=journal)
+        journal.plan_write(extract_rsud.RSUD_OUTPUT_DIR / split / ANNOTATIONS_FILE,
+                           lambda staged: os.replace(staged_rsud, staged))
+
+    for removed in (result['filter'].get('removed_image_files', ()), rsud_files):
+        if removed:
+            filter_small_objects.remove_image_files(split, removed, journal=journal)
+
+    if staged_output:
+        journal.plan_write(ann_path, lambda staged: os.replace(staged_output, staged))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Out-of-core filtering, RSUD separation and validation')
+    parser.add_argument('--filter', action='store_true',
+                        help=f'Remove annotations with area < {filter_small_objects.SIZE_THRESHOLD}')
+    parser.add_argument('--extract-rsud', action='store_true',
+                        help=f'Separate {extract_rsud.SOURCE_TO_REMOVE} data to {extract_rsud.RSUD_OUTPUT_DIR}')
+    parser.add_argument('--apply', action='store_true', help='Write the results (default: report only)')
+    parser.add_argument('--memory-mb', type=int, default=DEFAULT_MEMORY_MB,
+                        help=f'Memory budget for buffered records (default: {DEFAULT_MEMORY_MB})')
+    parser.add_argument('--split', action='append', choices=SPLITS, help='Split(s) to process (default: all)')
+    parser.add_argument('--backup-name', help='Back up each split annotation file to this name')
+    parser.add_argument('--tmp-dir', type=Path, help='Directory for spilled sort runs')
+    args = parser.parse_args()
+
+    splits = args.split or SPLITS
+    writes = args.apply and (args.filter or args.extract_rsud)
+
+    print("=" * 60)
+    print("Golden-VRU Out-of-Core Processing")
+    print("=" * 60)
+    steps = (['filter'] if args.filter else []) + (['extract-rsud'] if args.extract_rsud else []) + ['validate']
+    print(f"\nSteps: {' -> '.join(steps)}")
+    print(f"Memory budget: {args.memory_mb} MB")
+    print(f"Mode: {'LIVE' if writes else 'REPORT ONLY'}")
+
+    journal = None
+    if writes:
+        journal = start_run(JOURNAL_NAME)
+        if journal is None:
+            return 0
+        # Staged files left by an interrupted plan that start_run discarded
+        for split in SPLITS:
+            remove_staged(split)
+
+    all_valid = True
+    all_errors, all_warnings = [], []
+    results = {}
+    try:
+        for split in splits:
+            print(f"\nProcessing {split}...")
+            print("-" * 40)
+
+            staged_output = staged_rsud = None
+            if writes:
+                staged_output, staged_rsud = staged_paths(split)
+                if not args.extract_rsud:
+                    staged_rsud = None
+
+            result = process_split(split, args.memory_mb, args.filter, args.extract_rsud,
+                                   args.tmp_dir, staged_output, staged_rsud)
+            results[split] = result
+            try:
+                if not result['valid']:
+                    all_valid = False
+                    all_errors.extend(f"[{split}] {e}" for e in result['errors'])
+                all_warnings.extend(f"[{split}] {w}" for w in result['warnings'])
+
+                if result['filter']:
+                    stats = result['filter']
+                    print(f"\n  Filter: removed {stats['removed_annotations']:,} annotations "
+                          f"({stats['small_pedestrian']:,} pedestrian, {stats['small_cyclist']:,} cyclist), "
+                          f"{stats['removed_images']:,} images")
+                if result['separate']:
+                    stats = result['separate']
+                    print(f"  RSUD: {stats['rsud_images']:,} images, {stats['rsud_annotations']:,} annotations")
+
+                if journal is not None:
+                    plan_split(journal, split, result, staged_output, staged_rsud, args.backup_name)
+            finally:
+                close_result(result)
+    except BaseException:
+        # The plan is incomplete and will be discarded; so are its staged files
+        if writes:
+            for split in splits:
+                remove_staged(split)
+        raise
+
+    if journal is not None:
+        journal.finish_plan()
+        print(f"\nApplying {len(journal.ops):,} journaled operations...")
+        counts = journal.apply()
+        print(f"  Copied: {counts['copied']:,}, Saved: {counts['written']:,} annotation files")
+        print_delete_stats(journal)
+
+    print("\n" + "=" * 60)
+    print("RESULT")
+    print("=" * 60)
+    print(f"\n{'Split':<8} {'Images':>10} {'Annotations':>12}")
+    print("-" * 32)
+    for split, result in results.items():
+        print(f"{split.capitalize():<8} {result['images']:>10,} {result['annotations']:>12,}")
+    print("-" * 32)
+
+    if all_warnings:
+        print("\nWarnings:")
+        for w in all_warnings:
+            print(f"  - {w}")
+    if all_errors:
+        print("\nErrors:")
+        for e in all_errors:
+            print(f"  - {e}")
+
+    if journal is not None:
+        print("\n*** Changes applied successfully ***")
+        print_next_steps(JOURNAL_NAME)
+    elif args.filter or args.extract_rsud:
+        print("\n*** REPORT ONLY - No changes were made (use --apply) ***")
+
+    if all_valid:
+        print("\n[PASSED] Validation of the result successful!")
+        return 0
+    print(f"\n[FAILED] Validation of the result failed with {len(all_errors)} error(s)")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
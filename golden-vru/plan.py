@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Serializable dry-run plans for destructive Golden-VRU scripts.
+
+A dry run of extract_rsud.py or filter_small_objects.py writes a plan file to
+plans/<script>.plan.json containing:
+
+- the input annotation files and their content fingerprints
+- the ordered file operations (backup copies, image copies, image deletions)
+- for each annotation file to write, the image/annotation IDs to keep, stored
+  as ID ranges (or as the drop set, whichever is smaller)
+
+`apply <plan>` checks that every input still has the fingerprint it had when
+the plan was reviewed, then executes the plan through the write-ahead journal
+(journal.py) without recomputing it.
+
+Usage:
+    python plan.py show PLAN
+    python plan.py apply PLAN
+"""
+
+import json
+import os
+import sys
+from bisect import bisect_right
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from fingerprint import fingerprint
+from journal import print_delete_stats, print_next_steps, start_run
+
+# Constants
+BASE_DIR = Path(__file__).parent
+PLANS_DIR = 'plans'
+PLAN_VERSION = 1
+
+
+def id_ranges(ids: Iterable[int]) -> List[List[int]]:
+    """Compress IDs into sorted inclusive [start, end] ranges."""
+    ranges = []
+    for i in sorted(set(ids)):
+        if ranges and i == ranges[-1][1] + 1:
+            ranges[-1][1] = i
+        else:
+            ranges.append([i, i])
+    return ranges
+
+
+def encode_selection(selected: Iterable[int], all_ids: Iterable[int]) -> dict:
+    """Encode selected IDs as a keep or drop range set, whichever is smaller."""
+    selected = set(selected)
+    keep = id_ranges(selected)
+    drop = id_ranges(i for i in all_ids if i not in selected)
+    return {'keep': keep} if len(keep) <= len(drop) else {'drop': drop}
+
+
+def selection_predicate(selection: dict) -> Callable[[int], bool]:
+    """Build an ID membership test from an encoded selection."""
+    keep = 'keep' in selection
+    ranges = selection['keep'] if keep else selection['drop']
+    starts = [r[0] for r in ranges]
+    ends = [r[1] for r in ranges]
+
+    def contains(i: int) -> bool:
+        k = bisect_right(starts, i) - 1
+        in_ranges = k >= 0 and i <= ends[k]
+        return in_ranges if keep else not in_ranges
+
+    return contains
+
+
+class PlanBuilder:
+    """Accumulates the inputs and operations of a plan."""
+
+    def __init__(self, script: str, base_dir: Optional[Path] = None):
+        self.base_dir = Path(base_dir or BASE_DIR).resolve()
+        self.plan = {
+            'version': PLAN_VERSION,
+            'script': script,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'base_dir': str(self.base_dir),
+            'inputs': {},
+            'summary': {},
+            'ops': [],
+        }
+
+    def rel(self, path: Path) -> str:
+        """Store paths under base_dir relative to it."""
+        path = Path(path).resolve()
+        try:
+            return str(path.relative_to(self.base_dir))
+        except ValueError:
+            return str(path)
+
+    def add_input(self, path: Path):
+        """Record an annotation file the plan depends on."""
+        self.plan['inputs'][self.rel(path)] = fingerprint(path)
+
+    def copy(self, src: Path, dst: Path):
+        self.plan['ops'].append({'op': 'copy', 'src': self.rel(src), 'dst': self.rel(dst)})
+
+    def copy_files(self, src_dir: Path, dst_dir: Path, file_names: List[str]):
+        self.plan['ops'].append({'op': 'copy_files', 'src_dir': self.rel(src_dir),
+                                 'dst_dir': self.rel(dst_dir), 'files': list(file_names)})
+
+    def delete_files(self, directory: Path, file_names: List[str]):
+        self.plan['ops'].append({'op': 'delete_files', 'dir': self.rel(directory),
+                                 'files': list(file_names)})
+
+    def write_selection(self, path: Path, source: Path, data: dict, selected: dict):
+        """Plan writing the subset `selected` of the COCO file `source` (already loaded as data)."""
+        self.add_input(source)
+        self.plan['ops'].append({
+            'op': 'write',
+            'path': self.rel(path),
+            'from': self.rel(source),
+            'images': encode_selection((img['id'] for img in selected['images']),
+                                       (img['id'] for img in data['images'])),
+            'annotations': encode_selection((ann['id'] for ann in selected['annotations']),
+                                            (ann['id'] for ann in data['annotations'])),
+            'counts': {'images': len(selected['images']),
+                       'annotations': len(selected['annotations'])},
+        })
+
+    def set_summary(self, split: str, stats: Dict[str, int]):
+        self.plan['summary'][split] = {k: v for k, v in stats.items() if isinstance(v, int)}
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        """Write the plan (default: <base_dir>/plans/<script>.plan.json)."""
+        path = Path(path or self.base_dir / PLANS_DIR / f"{self.plan['script']}.plan.json")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.plan, f)
+        os.replace(tmp_path, path)
+        return path
+
+
+def load_plan(path: Path) -> dict:
+    """Load a plan file."""
+    with open(path, 'r') as f:
+        plan = json.load(f)
+    if plan.get('version') != PLAN_VERSION:
+        raise ValueError(f"Unsupported plan version: {plan.get('version')}")
+    return plan
+
+
+def resolve(plan: dict, path: str) -> Path:
+    """Resolve a plan path against the plan's base_dir."""
+    return Path(path) if os.path.isabs(path) else Path(plan['base_dir']) / path
+
+
+def check_inputs(plan: dict) -> List[str]:
+    """Return inputs whose fingerprint no longer matches the plan."""
+    mismatched = []
+    for path, expected in plan['inputs'].items():
+        full_path = resolve(plan, path)
+        if not full_path.exists():
+            mismatched.append(f"{path}: missing")
+        elif fingerprint(full_path) != expected:
+            mismatched.append(f"{path}: changed since the plan was made")
+    return mismatched
+
+
+def select_data(data: dict, op: dict) -> dict:
+    """Build the COCO subset described by a write operation."""
+    keep_image = selection_predicate(op['images'])
+    keep_ann = selection_predicate(op['annotations'])
+
+    selected = {
+        'categories': data['categories'],
+        'images': [img for img in data['images'] if keep_image(img['id'])],
+        'annotations': [ann for ann in data['annotations'] if keep_ann(ann['id'])],
+    }
+
+    # Copy over any additional keys (like 'info', 'licenses')
+    for key in data:
+        if key not in selected:
+            selected[key] = data[key]
+
+    return selected
+
+
+def print_plan(plan: dict):
+    """Print a human-readable plan summary."""
+    print(f"Plan: {plan['script']} (created {plan['created']})")
+    print(f"Base directory: {plan['base_dir']}")
+
+    print("\nInputs:")
+    for path, digest in plan['inputs'].items():
+        print(f"  {path}  {digest}")
+
+    if plan['summary']:
+        print("\nSummary:")
+        for split, stats in plan['summary'].items():
+            print(f"  {split}: " + ", ".join(f"{k} {v:,}" for k, v in stats.items()))
+
+    print("\nOperations:")
+    for op in plan['ops']:
+        if op['op'] == 'copy':
+            print(f"  copy        {op['src']} -> {op['dst']}")
+        elif op['op'] == 'copy_files':
+            print(f"  copy files  {len(op['files']):,} from {op['src_dir']} to {op['dst_dir']}")
+        elif op['op'] == 'delete_files':
+            print(f"  delete      {len(op['files']):,} files from {op['dir']}")
+        elif op['op'] == 'write':
+            print(f"  write       {op['path']} ({op['counts']['images']:,} images, "
+                  f"{op['counts']['annotations']:,} annotations from {op['from']})")
+
+
+def apply_plan(path: Path) -> int:
+    """Verify input fingerprints and execute a plan through the journal."""
+    plan = load_plan(path)
+    print("=" * 60)
+    print(f"Applying plan: {path}")
+    print("=" * 60)
+    print_plan(plan)
+
+    print("\nChecking input fingerprints...")
+    mismatched = check_inputs(plan)
+    if mismatched:
+        for problem in mismatched:
+            print(f"  [FAIL] {problem}")
+        print("\nPlan is stale; re-run the dry run to make a new plan.")
+        return 1
+    print(f"  [PASS] {len(plan['inputs'])} input(s) unchanged")
+
+    journal = start_run(plan['script'])
+    if journal is None:
+        return 0
+
+    # Ops are grouped by split, so only the current input needs to stay loaded
+    loaded_path, loaded = None, None
+    for op in plan['ops']:
+        kind = op['op']
+        if kind == 'copy':
+            journal.plan_copy(resolve(plan, op['src']), resolve(plan, op['dst']))
+        elif kind == 'copy_files':
+            src_dir, dst_dir = resolve(plan, op['src_dir']), resolve(plan, op['dst_dir'])
+            for file_name in op['files']:
+                journal.plan_copy(src_dir / file_name, dst_dir / file_name)
+        elif kind == 'delete_files':
+            directory = resolve(plan, op['dir'])
+            for file_name in op['files']:
+                journal.plan_delete(directory / file_name)
+        elif kind == 'write':
+            if op['from'] != loaded_path:
+                with open(resolve(plan, op['from']), 'r') as f:
+                    loaded_path, loaded = op['from'], json.load(f)
+            journal.plan_write_json(resolve(plan, op['path']), select_data(loaded, op))
+        else:
+            raise ValueError(f"Unknown plan operation: {kind}")
+
+    journal.finish_plan()
+    print(f"\nApplying {len(journal.ops):,} journaled operations...")
+    counts = journal.apply()
+    print(f"  Copied: {counts['copied']:,}, Saved: {counts['written']:,} annotation files")
+    print_delete_stats(journal)
+
+    print("\n*** Plan applied successfully ***")
+    print_next_steps(plan['script'])
+    return 0
+
+
+def main() -> int:
+    if len(sys.argv) != 3 or sys.argv[1] not in ('show', 'apply'):
+        print("Usage: python plan.py {show|apply} PLAN")
+        return 2
+
+    command, path = sys.argv[1], Path(sys.argv[2])
+    if command == 'show':
+        print_plan(load_plan(path))
+        return 0
+    return apply_plan(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Render the analysis/ figures from cached per-split aggregates.
+
+Re-plotting used to mean re-reading every ~100MB annotation file. Instead,
+each split is reduced once to a small aggregate file,
+.cache/aggregates/<split>.json, holding per-source histograms:
+
+- class counts, COCO size buckets and a log-spaced area histogram per class
+- density buckets (annotations per image)
+- image resolutions
+- lighting buckets, when quality_scores.py has cached the split's brightness
+
+An aggregate is recomputed only when its split's annotation fingerprint (or
+its quality cache) changes. Figures are rendered in parallel, one process
+per figure, and a figure is re-rendered only when its inputs changed:
+
+    analysis/1_class_distribution.png
+    analysis/2_size_distribution.png
+    analysis/3_density_distribution.png
+    analysis/4_lighting_distribution.png   (with brightness only)
+    analysis/5_source_distribution.png
+    analysis/6_resolution_distribution.png
+    analysis/combined_analysis.png
+
+Usage:
+    python plot_analysis.py [--force] [--workers N]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from fingerprint import annotation_path, fingerprint, stat_signature
+from golden_vru import DENSITY_BUCKETS, density_bucket, size_bucket
+
+# Constants
+BASE_DIR = Path(__file__).parent
+SPLITS = ['train', 'valid', 'test']
+ANALYSIS_DIR = Path('analysis')  # Relative to the dataset's base directory
+CACHE_DIR = Path('.cache') / 'aggregates'  # Relative to the dataset's base directory
+QUALITY_CACHE_DIR = Path('.cache') / 'quality'
+AGGREGATE_VERSION = 1  # Bump when the aggregate layout changes
+AREA_BINS = np.geomspace(1, 1 << 20, 41)  # 1 px² .. 1024x1024 px²
+TOP_RESOLUTIONS = 8
+
+SIZE_BUCKETS = ['small', 'medium', 'large']
+DENSITY_NAMES = ['empty'] + [name for name, _, _ in DENSITY_BUCKETS]
+# Mean luminance (0-255) upper bounds
+LIGHTING_BUCKETS = [('dark', 60), ('dim', 100), ('normal', 200), ('bright', 256)]
+
+COLORS = {
+    'pedestrian': '#3498db', 'cyclist': '#e74c3c',
+    'small': '#e74c3c', 'medium': '#2ecc71', 'large': '#f39c12',
+    'empty': '#ecf0f1', 'sparse': '#95a5a6', 'moderate': '#3498db', 'dense': '#2ecc71',
+    'very_dense': '#f39c12',
+    'dark': '#2c3e50', 'dim': '#7f8c8d', 'normal': '#f1c40f', 'bright': '#f39c12',
+    'nuimages': '#9b59b6', 'bdd100k': '#1abc9c', 'cityscapes': '#e67e22', 'rsud20k': '#34495e',
+}
+
+# name -> (file, title, aggregate field, bucket order or None)
+FIGURES = {
+    'class': ('1_class_distribution.png', 'Class Distribution', 'classes', None),
+    'size': ('2_size_distribution.png', 'Annotation Size Distribution', 'sizes', SIZE_BUCKETS),
+    'density': ('3_density_distribution.png', 'Density Distribution', 'density', DENSITY_NAMES),
+    'lighting': ('4_lighting_distribution.png', 'Lighting Distribution', 'lighting',
+                 [name for name, _ in LIGHTING_BUCKETS]),
+    'source': ('5_source_distribution.png', 'Source Distribution', 'images', None),
+    'resolution': ('6_resolution_distribution.png', 'Resolution Distribution', 'resolutions', None),
+}
+COMBINED_NAME = 'combined_analysis.png'
+
+
+# Aggregates
+
+def lighting_bucket(brightness: float) -> str:
+    for name, upper in LIGHTING_BUCKETS:
+        if brightness < upper:
+            return name
+    return LIGHTING_BUCKETS[-1][0]
+
+
+def load_brightness(quality_path: Path) -> Dict[str, float]:
+    """file_name -> mean brightness from a quality_scores.py cache file."""
+    with np.load(quality_path, allow_pickle=False) as columns:
+        decoded = columns['width'] > 0
+        return dict(zip(columns['file_name'][decoded].tolist(),
+                        columns['brightness'][decoded].tolist()))
+
+
+def compute_aggregate(split: str, base_dir: str) -> dict:
+    """Reduce one split's annotations to per-source histograms."""
+    base_dir = Path(base_dir)
+    with open(annotation_path(split, base_dir), 'r') as f:
+        data = json.load(f)
+
+    quality_path = base_dir / QUALITY_CACHE_DIR / f"{split}.npz"
+    brightness = load_brightness(quality_path) if quality_path.exists() else {}
+
+    category_names = {cat['id']: cat['name'] for cat in data['categories']}
+    image_source = {img['id']: img.get('source', 'unknown') for img in data['images']}
+
+    sources = defaultdict(lambda: {
+        'images': 0, 'classes': Counter(), 'sizes': Counter(), 'areas': defaultdict(list),
+        'density': Counter(), 'resolutions': Counter(), 'lighting': Counter()})
+
+    counts = Counter()
+    for ann in data['annotations']:
+        entry = sources[image_source.get(ann['image_id'], 'orphaned')]
+        name = category_names.get(ann['category_id'], 'unknown')
+        entry['classes'][name] += 1
+        entry['sizes'][size_bucket(ann['area'])] += 1
+        entry['areas'][name].append(ann['area'])
+        counts[ann['image_id']] += 1
+
+    for img in data['images']:
+        entry = sources[img.get('source', 'unknown')]
+        entry['images'] += 1
+        entry['density'][density_bucket(counts[img['id']])] += 1
+        entry['resolutions'][f"{img.get('width')}x{img.get('height')}"] += 1
+        if img['file_name'] in brightness:
+            entry['lighting'][lighting_bucket(brightness[img['file_name']])] += 1
+
+    result = {}
+    for source, entry in sources.items():
+        area_hist = {name: np.histogram(np.clip(areas, AREA_BINS[0], AREA_BINS[-1]), AREA_BINS)[0].tolist()
+                     for name, areas in entry.pop('areas').items()}
+        result[source] = {key: dict(value) if isinstance(value, Counter) else value
+                          for key, value in entry.items()}
+        result[source]['area_hist'] = area_hist
+    return {'categories': [cat['name'] for cat in data['categories']], 'sources': result}
+
+
+def aggregate_key(split: str, base_dir: Path) -> dict:
+    """What an aggregate depends on: the annotation fingerprint and quality cache."""
+    quality_path = base_dir / QUALITY_CACHE_DIR / f"{split}.npz"
+    return {
+        'version': AGGREGATE_VERSION,
+        'fingerprint': fingerprint(annotation_path(split, base_dir)),
+        'quality': stat_signature(quality_path) if quality_path.exists() else None,
+    }
+
+
+def load_aggregates(base_dir: Path, splits: List[str], force: bool = False,
+                    workers: Optional[int] = None) -> Dict[str, dict]:
+    """Per-split aggregates, recomputing (in parallel) only the stale ones."""
+    cache_dir = base_dir / CACHE_DIR
+    aggregates, stale = {}, {}
+    for split in splits:
+        key = aggregate_key(split, base_dir)
+        path = cache_dir / f"{split}.json"
+        try:
+            with open(path, 'r') as f:
+                cached = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            cached = {}
+        if not force and cached.get('key') == key:
+            aggregates[split] = cached['aggregate']
+        else:
+            stale[split] = key
+
+    if stale:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(compute_aggregate, stale, [str(base_dir)] * len(stale))
+            for (split, key), aggregate in zip(stale.items(), results):
+                aggregates[split] = aggregate
+                path = cache_dir / f"{split}.json"
+                tmp_path = path.with_name(path.name + '.tmp')
+                with open(tmp_path, 'w') as f:
+                    json.dump({'key': key, 'aggregate': aggregate}, f)
+                os.replace(tmp_path, path)
+        print(f"  Recomputed aggregates: {', '.join(stale)}")
+
+    return {split: aggregates[split] for split in splits}
+
+
+def split_totals(aggregate: dict, field: str) -> Dict[str, int]:
+    """Sum one histogram over a split's sources ('images' counts per source)."""
+    totals = Counter()
+    for source, entry in aggregate['sources'].items():
+        if field == 'images':
+            if entry['images']:
+                totals[source] += entry['images']
+        else:
+            totals.update(entry[field])
+    return dict(totals)
+
+
+def figure_inputs(aggregates: Dict[str, dict]) -> Dict[str, dict]:
+    """The (small) data each figure is drawn from, per split."""
+    inputs = {}
+    for name, (_, _, field, order) in FIGURES.items():
+        per_split = {}
+        for split, aggregate in aggregates.items():
+            counts = split_totals(aggregate, field)
+            if order is None and field == 'classes':
+                order = aggregate['categories']
+            if order:
+                counts = {key: counts[key] for key in order if counts.get(key)}
+            elif field == 'resolutions':
+                counts = dict(Counter(counts).most_common(TOP_RESOLUTIONS))
+            else:
+                counts = dict(sorted(counts.items(), key=lambda item: -item[1]))
+            per_split[split] = counts
+        if any(per_split.values()):
+            inputs[name] = per_split
+
+    if 'size' in inputs:
+        area_hist = {}
+        for split, aggregate in aggregates.items():
+            totals = defaultdict(lambda: np.zeros(len(AREA_BINS) - 1, dtype=np.int64))
+            for entry in aggregate['sources'].values():
+                for cls, hist in entry['area_hist'].items():
+                    totals[cls] += np.array(hist)
+            area_hist[split] = {cls: hist.tolist() for cls, hist in totals.items()}
+        inputs['area_hist'] = area_hist
+    return inputs
+
+
+# Rendering (runs in worker processes)
+
+def _pie(ax, title: str, counts: Dict[str, int]):
+    total = sum(counts.values())
+    labels = list(counts)
+    colors = [COLORS.get(label) for label in labels]
+    if None in colors:
+        colors = None
+    wedges, _, _ = ax.pie(list(counts.values()), colors=colors, startangle=90,
+                          autopct=lambda pct: f"{pct:.1f}%" if pct >= 3 else '')
+    ax.legend(wedges, [f"{label}: {count:,} ({count / total * 100:.1f}%)" for label, count in counts.items()],
+              loc='center left', bbox_to_anchor=(1.0, 0.5), fontsize=8)
+    ax.set_title(title, fontweight='bold', fontsize=10)
+
+
+def _bars(ax, title: str, counts: Dict[str, int]):
+    labels = list(counts)[::-1]
+    ax.barh(labels, [counts[label] for label in labels], color='#3498db')
+    ax.set_xlabel('Images')
+    ax.set_title(title, fontweight='bold', fontsize=10)
+
+
+def _area_hist(ax, title: str, hists: Dict[str, List[int]]):
+    centers = np.sqrt(AREA_BINS[:-1] * AREA_BINS[1:])
+    for cls, hist in hists.items():
+        ax.plot(centers, hist, label=cls, color=COLORS.get(cls))
+    for threshold in (32 * 32, 96 * 96):
+        ax.axvline(threshold, color='#7f8c8d', linestyle='--', linewidth=0.8)
+    ax.set_xscale('log')
+    ax.set_xlabel('Area (px²)')
+    ax.set_ylabel('Annotations')
+    ax.legend(fontsize=8)
+    ax.set_title(title, fontweight='bold', fontsize=10)
+
+
+def _draw_row(axes, name: str, per_split: Dict[str, dict]):
+    title = FIGURES[name][1]
+    for ax, (split, counts) in zip(axes, per_split.items()):
+        if not counts:
+            ax.axis('off')
+        elif name == 'resolution':
+            _bars(ax, f"{split.capitalize()} - {title}", counts)
+        else:
+            _pie(ax, f"{split.capitalize()} - {title}", counts)
+
+
+def render_figure(name: str, inputs: dict, path: str):
+    """Render one figure to path (nothing is drawn without any inputs)."""
+    rows = [row for row in FIGURES if row in inputs]
+    if not rows:
+        return
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    if name == 'combined':
+        columns = len(inputs[rows[0]])
+        fig, axes = plt.subplots(len(rows), columns, figsize=(7 * columns, 5 * len(rows)), squeeze=False)
+        for axes_row, row in zip(axes, rows):
+            _draw_row(axes_row, row, inputs[row])
+        fig.suptitle('Golden-VRU Dataset Distribution Analysis', fontsize=16, fontweight='bold')
+    else:
+        per_split = inputs[name]
+        extra = 1 if name == 'size' else 0
+        fig, axes = plt.subplots(1 + extra, len(per_split), figsize=(7 * len(per_split), 5 * (1 + extra)),
+                                 squeeze=False)
+        _draw_row(axes[0], name, per_split)
+        if extra:
+            for ax, (split, hists) in zip(axes[1], inputs['area_hist'].items()):
+                _area_hist(ax, f"{split.capitalize()} - Area Histogram", hists)
+        fig.suptitle(f"Golden-VRU {FIGURES[name][1]}", fontsize=14, fontweight='bold')
+
+    fig.tight_layout(rect=(0, 0, 1, 0.97))
+    fig.savefig(path, dpi=100, bbox_inches='tight')
+    plt.close(fig)
+
+
+def inputs_digest(inputs: dict) -> str:
+    return hashlib.blake2b(json.dumps(inputs, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+def render_all(inputs: Dict[str, dict], output_dir: Path, manifest_path: Path,
+               force: bool = False, workers: Optional[int] = None) -> Dict[str, str]:
+    """Render every figure whose inputs changed; returns figure -> 'rendered' | 'unchanged'."""
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        manifest = {}
+
+    jobs = {}
+    for name in FIGURES:
+        if name in inputs:
+            figure_data = {name: inputs[name]}
+            if name == 'size':
+                figure_data['area_hist'] = inputs['area_hist']
+            jobs[name] = (figure_data, output_dir / FIGURES[name][0])
+    if jobs:
+        jobs['combined'] = ({name: inputs[name] for name in FIGURES if name in inputs},
+                            output_dir / COMBINED_NAME)
+
+    status = {}
+    pending = {}
+    for name, (figure_data, path) in jobs.items():
+        digest = inputs_digest(figure_data)
+        if not force and manifest.get(name) == digest and path.exists():
+            status[name] = 'unchanged'
+        else:
+            pending[name] = digest
+
+    if pending:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {name: pool.submit(render_figure, name, jobs[name][0], str(jobs[name][1]))
+                       for name in pending}
+            for name, future in futures.items():
+                future.result()
+                manifest[name] = pending[name]
+                status[name] = 'rendered'
+
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = manifest_path.with_name(manifest_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+    return {name: status[name] for name in jobs}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Render analysis figures from cached aggregates')
+    parser.add_argument('--force', action='store_true', help='Recompute every aggregate and figure')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Golden-VRU Analysis Plots")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    splits = [split for split in SPLITS if annotation_path(split, BASE_DIR).exists()]
+    aggregates = load_aggregates(BASE_DIR, splits, force=args.force, workers=args.workers)
+    print(f"  Aggregates ready in {time.perf_counter() - start:.1f}s")
+
+    inputs = figure_inputs(aggregates)
+    status = render_all(inputs, BASE_DIR / ANALYSIS_DIR, BASE_DIR / CACHE_DIR / 'figures.json',
+                        force=args.force, workers=args.workers)
+
+    print()
+    for name, state in status.items():
+        file_name = COMBINED_NAME if name == 'combined' else FIGURES[name][0]
+        print(f"  {file_name:<34} {state}")
+    print(f"\nDone in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Per-image quality scoring for source-quality audits.
+
+RSUD20K was removed in v9.0 over annotation quality concerns found by hand.
+This tool computes cheap quality signals for every image and summarizes them
+per source, so a new source can be audited before it is merged:
+
+Image signals (decoded in a process pool from a <= 256 px downscaled decode):
+- brightness and contrast (mean / std of luminance)
+- blur (variance of the Laplacian)
+- actual resolution, compared with the annotated width/height
+
+Annotation signals (vectorized, recomputed every run):
+- box-density outliers: robust z-score of boxes per image within its source
+- box anomalies: outside the image, degenerate (< 1 px), oversized
+  (> half the image) or `area` inconsistent with the bbox
+
+Image signals are cached per split in .cache/quality/<split>.npz (one array
+per column), keyed by each file's BLAKE2b content hash; unchanged files
+(same size and mtime) are not even re-hashed, and identical content seen in
+any cached split or source is never decoded twice.
+
+Usage:
+    python quality_scores.py [--split SPLIT ...] [--workers N] [--output FLAGGED.csv]
+    python quality_scores.py --source NAME=PATH [...]   (audit a merge source)
+"""
+
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from archives import is_archive, open_archive
+from fingerprint import bytes_digest, file_digest
+from golden_vru import GoldenVRU
+from merge_sources import load_source_annotations, parse_source_arg
+
+# Constants
+BASE_DIR = Path(__file__).parent
+SPLITS = ['train', 'valid', 'test']
+CACHE_DIR = Path('.cache') / 'quality'  # Relative to the dataset's base directory
+THUMB_SIZE = 256
+SCORE_CHUNKSIZE = 32
+HASH_WORKERS = 16
+
+SIGNALS = ('width', 'height', 'brightness', 'contrast', 'blur')
+FAILED = (0, 0, float('nan'), float('nan'), float('nan'))
+
+# Flag thresholds
+DARK_BRIGHTNESS = 40
+BRIGHT_BRIGHTNESS = 220
+BLUR_THRESHOLD = 100  # Laplacian variance on the downscaled image
+DENSITY_Z = 3.5
+OVERSIZED_FRACTION = 0.5
+AREA_TOLERANCE = 0.1
+
+
+# Image signals
+
+def image_signals(data: bytes) -> Tuple[float, ...]:
+    """(width, height, brightness, contrast, blur) of an encoded image."""
+    with Image.open(io.BytesIO(data)) as img:
+        width, height = img.size
+        img.draft('L', (THUMB_SIZE, THUMB_SIZE))
+        small = img.convert('L')
+        small.thumbnail((THUMB_SIZE, THUMB_SIZE))
+        pixels = np.asarray(small, dtype=np.float32)
+
+    laplacian = (pixels[:-2, 1:-1] + pixels[2:, 1:-1] + pixels[1:-1, :-2] + pixels[1:-1, 2:]
+                 - 4 * pixels[1:-1, 1:-1])
+    blur = float(laplacian.var()) if laplacian.size else 0.0
+    return width, height, float(pixels.mean()), float(pixels.std()), blur
+
+
+def _score_bytes(data: bytes) -> Tuple[float, ...]:
+    """Process-pool worker: signals of image bytes (FAILED if undecodable)."""
+    try:
+        return image_signals(data)
+    except (OSError, ValueError, SyntaxError):
+        return FAILED
+
+
+def _score_path(path: str) -> Tuple[float, ...]:
+    """Process-pool worker: signals of an image file."""
+    try:
+        with open(path, 'rb') as f:
+            return _score_bytes(f.read())
+    except OSError:
+        return FAILED
+
+
+# Columnar cache
+
+class QualityCache:
+    """Per-split .npz files of image signals keyed by content digest."""
+
+    def __init__(self, cache_dir: Path):
+        self.dir = Path(cache_dir)
+        self._by_digest: Optional[Dict[str, tuple]] = None
+
+    def path(self, key: str) -> Path:
+        return self.dir / f"{key}.npz"
+
+    def load(self, key: str) -> Dict[str, tuple]:
+        """file_name -> (size, mtime_ns, digest, *signals)."""
+        try:
+            with np.load(self.path(key), allow_pickle=False) as columns:
+                names = columns['file_name'].tolist()
+                rows = zip(columns['size'].tolist(), columns['mtime_ns'].tolist(),
+                           columns['digest'].tolist(), *(columns[s].tolist() for s in SIGNALS))
+                return dict(zip(names, rows))
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            return {}
+
+    def save(self, key: str, rows: Dict[str, tuple]):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        names = list(rows)
+        values = list(zip(*rows.values())) if rows else [[]] * (3 + len(SIGNALS))
+        columns = {
+            'file_name': np.array(names, dtype=str),
+            'size': np.array(values[0], dtype=np.int64),
+            'mtime_ns': np.array(values[1], dtype=np.int64),
+            'digest': np.array(values[2], dtype=str),
+        }
+        for i, signal in enumerate(SIGNALS):
+            columns[signal] = np.array(values[3 + i], dtype=np.float32)
+
+        tmp_path = self.dir / f"{key}.tmp.npz"
+        np.savez(tmp_path, **columns)
+        os.replace(tmp_path, self.path(key))
+        self._by_digest = None
+
+    def by_digest(self) -> Dict[str, tuple]:
+        """Signals of every cached image, by content digest (across all keys)."""
+        if self._by_digest is None:
+            self._by_digest = {}
+            for path in sorted(self.dir.glob('*.npz')):
+                for row in self.load(path.stem).values():
+                    if row[3] > 0:  # Decoded successfully
+                        self._by_digest[row[2]] = row[3:]
+        return self._by_digest
+
+
+def score_directory(cache: QualityCache, key: str, image_dir: Path, file_names: List[str],
+                    workers: Optional[int] = None) -> Tuple[Dict[str, tuple], Dict[str, int]]:
+    """Signals for every file of an image directory, reusing cached rows."""
+    cached = cache.load(key)
+    rows = {}
+    stats = {'cached': 0, 'reused': 0, 'scored': 0, 'missing': 0}
+
+    changed = []
+    for name in file_names:
+        try:
+            st = os.stat(image_dir / name)
+        except FileNotFoundError:
+            stats['missing'] += 1
+            continue
+        row = cached.get(name)
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            rows[name] = row
+            stats['cached'] += 1
+        else:
+            changed.append((name, st.st_size, st.st_mtime_ns))
+
+    # Hash changed files, then decode only content not seen before
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+        digests = list(pool.map(lambda item: file_digest(image_dir / item[0]), changed))
+
+    known = cache.by_digest() if changed else {}
+    to_score = []
+    for (name, size, mtime_ns), digest in zip(changed, digests):
+        if digest in known:
+            rows[name] = (size, mtime_ns, digest, *known[digest])
+            stats['reused'] += 1
+        else:
+            to_score.append((name, size, mtime_ns, digest))
+
+    if to_score:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            paths = [str(image_dir / name) for name, _, _, _ in to_score]
+            for (name, size, mtime_ns, digest), signals in zip(
+                    to_score, pool.map(_score_path, paths, chunksize=SCORE_CHUNKSIZE)):
+                rows[name] = (size, mtime_ns, digest, *signals)
+        stats['scored'] = len(to_score)
+
+    cache.save(key, rows)
+    return rows, stats
+
+
+def score_archive(cache: QualityCache, key: str, archive_path: Path, split: str,
+                  file_names: List[str], workers: Optional[int] = None) -> Tuple[Dict[str, tuple], Dict[str, int]]:
+    """Signals for every image of an archive source split (sequential reads)."""
+    archive = open_archive(archive_path)
+    cached = cache.load(key)
+    rows = {}
+    stats = {'cached': 0, 'reused': 0, 'scored': 0, 'missing': 0}
+
+    changed = []
+    for name in file_names:
+        member = archive.member_name(split, name)
+        if member not in archive.members:
+            stats['missing'] += 1
+            continue
+        info = archive.members[member]
+        size, mtime_ns = info.file_size if archive.is_zip else info.size, int(archive.mtime(member) * 1e9)
+        row = cached.get(name)
+        if row and row[0] == size and row[1] == mtime_ns:
+            rows[name] = row
+            stats['cached'] += 1
+        else:
+            changed.append((archive.offset(member), member, name, size, mtime_ns))
+
+    # Members are read in archive order; at most 2 * workers images are in flight
+    known = cache.by_digest() if changed else {}
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for _, member, name, size, mtime_ns in sorted(changed):
+            data = archive.read(member)
+            digest = bytes_digest(data)
+            if digest in known:
+                rows[name] = (size, mtime_ns, digest, *known[digest])
+                stats['reused'] += 1
+                continue
+            in_flight.append(((name, size, mtime_ns, digest), pool.submit(_score_bytes, data)))
+            del data
+            if len(in_flight) >= 2 * workers:
+                (name, size, mtime_ns, digest), future = in_flight.popleft()
+                rows[name] = (size, mtime_ns, digest, *future.result())
+                stats['scored'] += 1
+        while in_flight:
+            (name, size, mtime_ns, digest), future = in_flight.popleft()
+            rows[name] = (size, mtime_ns, digest, *future.result())
+            stats['scored'] += 1
+
+    cache.save(key, rows)
+    return rows, stats
+
+
+# Annotation signals and flags
+
+def score_annotations(images: List[dict], annotations: List[dict],
+                      signals: Dict[str, tuple]) -> Dict[str, np.ndarray]:
+    """
+    Per-image quality columns (aligned with images) from the image signals
+    and the annotations.
+    """
+    n = len(images)
+    index = {img['id']: i for i, img in enumerate(images)}
+    sources = np.array([img.get('source', 'unknown') for img in images], dtype=str)
+    widths = np.array([img.get('width') or 0 for img in images], dtype=np.float64)
+    heights = np.array([img.get('height') or 0 for img in images], dtype=np.float64)
+
+    image_signals = np.array([signals.get(img['file_name'], FAILED) for img in images],
+                             dtype=np.float64).reshape(n, len(SIGNALS))
+    columns = {name: image_signals[:, i] for i, name in enumerate(SIGNALS)}
+
+    ann_rows = np.array([index.get(ann['image_id'], -1) for ann in annotations], dtype=np.int64)
+    valid = ann_rows >= 0
+    ann_rows = ann_rows[valid]
+    boxes = np.array([ann['bbox'][:4] for ann in annotations], dtype=np.float64).reshape(-1, 4)[valid]
+    areas = np.array([ann['area'] for ann in annotations], dtype=np.float64)[valid]
+
+    x, y, w, h = boxes.T
+    img_w, img_h = widths[ann_rows], heights[ann_rows]
+    box_flags = {
+        'out_of_bounds': (x < -1) | (y < -1) | (x + w > img_w + 1) | (y + h > img_h + 1),
+        'degenerate': (w < 1) | (h < 1),
+        'oversized': w * h > OVERSIZED_FRACTION * img_w * img_h,
+        'area_mismatch': np.abs(areas - w * h) > AREA_TOLERANCE * np.maximum(w * h, 1),
+    }
+    for name, flags in box_flags.items():
+        columns[name] = np.bincount(ann_rows[flags], minlength=n)
+
+    # Robust z-score of boxes per image within each source
+    counts = np.bincount(ann_rows, minlength=n).astype(np.float64)
+    density_z = np.zeros(n)
+    for source in np.unique(sources):
+        mask = sources == source
+        median = np.median(counts[mask])
+        mad = np.median(np.abs(counts[mask] - median)) * 1.4826
+        density_z[mask] = (counts[mask] - median) / mad if mad > 0 else 0.0
+
+    columns.update({
+        'source': sources,
+        'boxes': counts,
+        'density_z': density_z,
+        'decoded': columns['width'] > 0,
+        'resolution_mismatch': (columns['width'] > 0) & ((columns['width'] != widths)
+                                                        | (columns['height'] != heights)),
+    })
+    columns['dark'] = columns['brightness'] < DARK_BRIGHTNESS
+    columns['overexposed'] = columns['brightness'] > BRIGHT_BRIGHTNESS
+    columns['blurry'] = columns['blur'] < BLUR_THRESHOLD
+    columns['density_outlier'] = np.abs(density_z) > DENSITY_Z
+    return columns
+
+
+IMAGE_FLAGS = ('dark', 'overexposed', 'blurry', 'resolution_mismatch', 'density_outlier')
+BOX_FLAGS = ('out_of_bounds', 'degenerate', 'oversized', 'area_mismatch')
+
+
+def source_report(columns: Dict[str, np.ndarray]) -> Dict[str, Dict[str, float]]:
+    """Per-source flag rates (% of images, or per 1k boxes for box flags)."""
+    report = {}
+    for source in np.unique(columns['source']):
+        mask = columns['source'] == source
+        decoded = mask & columns['decoded']
+        boxes = columns['boxes'][mask].sum()
+        row = {
+            'images': int(mask.sum()),
+            'boxes': int(boxes),
+            'undecoded': int((mask & ~columns['decoded']).sum()),
+            'brightness': float(np.nanmedian(columns['brightness'][decoded])) if decoded.any() else 0.0,
+            'blur': float(np.nanmedian(columns['blur'][decoded])) if decoded.any() else 0.0,
+        }
+        for flag in IMAGE_FLAGS:
+            base = decoded if flag in ('dark', 'overexposed', 'blurry', 'resolution_mismatch') else mask
+            row[flag] = float(columns[flag][base].mean() * 100) if base.any() else 0.0
+        for flag in BOX_FLAGS:
+            row[flag] = float(columns[flag][mask].sum() / boxes * 1000) if boxes else 0.0
+        report[str(source)] = row
+    return report
+
+
+def print_report(title: str, report: Dict[str, Dict[str, float]]):
+    print(f"\n{title}")
+    print(f"{'Source':<12} {'Images':>8} {'Bright':>7} {'Blur':>7} {'Dark%':>6} {'Over%':>6} "
+          f"{'Blurry%':>8} {'ResMis%':>8} {'Dense%':>7} {'OOB/1k':>7} {'Degen/1k':>9} "
+          f"{'Big/1k':>7} {'Area/1k':>8}")
+    print("-" * 112)
+    for source, row in sorted(report.items()):
+        print(f"{source:<12} {row['images']:>8,} {row['brightness']:>7.1f} {row['blur']:>7.0f} "
+              f"{row['dark']:>6.1f} {row['overexposed']:>6.1f} {row['blurry']:>8.1f} "
+              f"{row['resolution_mismatch']:>8.1f} {row['density_outlier']:>7.1f} "
+              f"{row['out_of_bounds']:>7.1f} {row['degenerate']:>9.1f} {row['oversized']:>7.1f} "
+              f"{row['area_mismatch']:>8.1f}")
+    print("-" * 112)
+
+
+def flagged_rows(split: str, images: List[dict], columns: Dict[str, np.ndarray]) -> List[dict]:
+    """One CSV row per image with at least one flag."""
+    flags = IMAGE_FLAGS + BOX_FLAGS
+    any_flag = np.zeros(len(images), dtype=bool)
+    for flag in flags:
+        any_flag |= columns[flag].astype(bool)
+
+    rows = []
+    for i in np.flatnonzero(any_flag).tolist():
+        row = {'split': split, 'file_name': images[i]['file_name'], 'source': columns['source'][i]}
+        for name in ('brightness', 'blur', 'boxes', 'density_z'):
+            row[name] = round(float(columns[name][i]), 2)
+        row.update({flag: int(columns[flag][i]) for flag in flags})
+        rows.append(row)
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Per-image quality scoring and per-source reports')
+    parser.add_argument('--split', action='append', choices=SPLITS, help='Split(s) to score (default: all)')
+    parser.add_argument('--source', type=parse_source_arg, action='append', default=[],
+                        help='Audit a merge source (NAME=PATH, directory or archive) instead of golden-vru')
+    parser.add_argument('--workers', type=int, help='Decoding processes (default: CPU count)')
+    parser.add_argument('--output', type=Path, help='Write flagged images as CSV')
+    args = parser.parse_args()
+
+    splits = args.split or SPLITS
+    cache = QualityCache(BASE_DIR / CACHE_DIR)
+
+    print("=" * 60)
+    print("Golden-VRU Quality Scores")
+    print("=" * 60)
+
+    # (title, cache key, images, annotations, scorer)
+    targets = []
+    if args.source:
+        for source in args.source:
+            for split in splits:
+                data = load_source_annotations(source, split)
+                file_names = [img['file_name'] for img in data['images']]
+                if is_archive(source['path']):
+                    scorer = (lambda key, names, p=source['path'], s=split:
+                              score_archive(cache, key, p, s, names, args.workers))
+                else:
+                    scorer = (lambda key, names, d=source['path'] / split:
+                              score_directory(cache, key, d, names, args.workers))
+                images = [dict(img, source=source['name']) for img in data['images']]
+                targets.append((f"{source['name']} {split}", f"{source['name']}-{split}",
+                                images, data['annotations'], scorer))
+    else:
+        dataset = GoldenVRU(BASE_DIR, splits)
+        for split in dataset:
+            scorer = (lambda key, names, d=dataset.image_dir(split.name):
+                      score_directory(cache, key, d, names, args.workers))
+            targets.append((split.name.capitalize(), split.name, split.images, split.annotations, scorer))
+
+    start = time.perf_counter()
+    all_columns = defaultdict(list)
+    flagged = []
+    for title, key, images, annotations, scorer in targets:
+        split_start = time.perf_counter()
+        signals, stats = scorer(key, [img['file_name'] for img in images])
+        print(f"\n{title}: {stats['scored']:,} scored, {stats['cached']:,} cached, "
+              f"{stats['reused']:,} reused by content, {stats['missing']:,} missing "
+              f"({time.perf_counter() - split_start:.1f}s)")
+
+        signals = {name: row[3:] for name, row in signals.items()}
+        columns = score_annotations(images, annotations, signals)
+        print_report(f"{title} by source", source_report(columns))
+        for name, values in columns.items():
+            all_columns[name].append(values)
+        flagged.extend(flagged_rows(key, images, columns))
+
+    if len(targets) > 1:
+        combined = {name: np.concatenate(values) for name, values in all_columns.items()}
+        print_report("All by source", source_report(combined))
+
+    if args.output and flagged:
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(flagged[0]))
+            writer.writeheader()
+            writer.writerows(flagged)
+        print(f"\n{len(flagged):,} flagged images written to {args.output}")
+
+    print(f"\nScored in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Compact in-memory records for Golden-VRU images and annotations.
+
+Loading train as plain JSON produces ~234k dicts that each repeat their keys
+and strings such as `source`. In compact mode, images and annotations are
+stored column-wise in typed arrays instead:
+
+- image IDs, sizes and annotation IDs/image IDs/categories/areas are arrays
+- `source` values and file-name prefixes (e.g. 'nuimages_CAM_FRONT_') are
+  interned into small tables and stored as codes
+- bboxes are one float32 block (4 values per annotation)
+- each record's key order is interned as a layout, so optional keys
+  (`source`, `iscrowd`) and extra keys come back where they were
+
+Records whose values would not survive the columns unchanged (bbox values
+that are not float32-exact, bools, out-of-range integers, missing fields) are
+kept as plain dicts, so dumping compact data writes the same JSON as dumping
+the dicts would.
+
+Records are read through slotted, read-only Mapping views, so the existing
+dict-based functions (`img.get('source')`, `ann['area']`, `'bbox' in ann`)
+work unchanged. Use json_default when serializing compact data.
+
+Usage:
+    from records import load_compact, json_default
+
+    data = load_compact(path)
+    json.dump(data, f, default=json_default)
+
+    python records.py [SPLIT]   (compares dict vs compact memory use)
+"""
+
+import json
+import re
+import sys
+import time
+import tracemalloc
+from array import array
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# Constants
+BASE_DIR = Path(__file__).parent
+IMAGE_FIELDS = ('id', 'file_name', 'width', 'height', 'source')
+ANNOTATION_FIELDS = ('id', 'image_id', 'category_id', 'bbox', 'area', 'iscrowd')
+
+# File-name prefix: everything up to the last '_' or '-' (video/camera/city part)
+PREFIX_PATTERN = re.compile(r'^(.*[_-])')
+
+
+class Interner:
+    """Maps repeated strings (or key layouts) to small integer codes."""
+
+    __slots__ = ('values', 'codes')
+
+    def __init__(self):
+        self.values: List[Optional[str]] = [None]  # Code 0: absent
+        self.codes: Dict[object, int] = {}
+
+    def code(self, value) -> int:
+        if value is None:
+            return 0
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(sys.intern(value) if isinstance(value, str) else value)
+        return code
+
+
+def _float32_value(value: float) -> float:
+    """Shortest decimal for a float32 bbox value."""
+    return float(f"{value:.7g}")
+
+
+def _is_int(value, bits: int = 64) -> bool:
+    """True for a non-bool int that fits a signed `bits`-bit array."""
+    limit = 1 << (bits - 1)
+    return type(value) is int and -limit <= value < limit
+
+
+def _is_float32_bbox(bbox) -> bool:
+    """True if bbox is 4 numbers that come back unchanged from float32 storage."""
+    if not (type(bbox) is list and len(bbox) == 4
+            and all(type(v) is int or type(v) is float for v in bbox)):
+        return False
+    try:
+        packed = array('f', bbox)
+    except OverflowError:
+        return False
+    return all((int(stored) if type(v) is int else _float32_value(stored)) == v
+               for stored, v in zip(packed, bbox))
+
+
+def _int_mask(values) -> int:
+    """Bit i set where values[i] is an int (so 96 and 96.0 stay distinct)."""
+    return sum(1 << i for i, v in enumerate(values) if type(v) is int)
+
+
+class RecordTable(Sequence):
+    """Base class for column-stored records with Mapping views."""
+
+    view_class = None
+
+    def __init__(self):
+        self._fallback: Dict[int, dict] = {}  # Records that don't fit the columns
+        self._extras: Dict[int, dict] = {}    # Non-standard keys of fitting records
+        self.layout_codes = array('L')        # Key order of every record
+        self.layouts = Interner()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.view_class(self, row) for row in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.view_class(self, index)
+
+    def __iter__(self) -> Iterator[Mapping]:
+        view_class = self.view_class
+        for row in range(len(self)):
+            yield view_class(self, row)
+
+    def keys(self, row: int) -> List[str]:
+        if self._fallback and row in self._fallback:
+            return list(self._fallback[row])
+        return list(self.layouts.values[self.layout_codes[row]])
+
+    def to_dict(self, row: int) -> dict:
+        return {key: self.field(row, key) for key in self.keys(row)}
+
+    def to_dicts(self) -> List[dict]:
+        return [self.to_dict(row) for row in range(len(self))]
+
+
+class ImageTable(RecordTable):
+    """Column storage for COCO image records."""
+
+    def __init__(self):
+        super().__init__()
+        self.ids = array('q')
+        self.widths = array('l')
+        self.heights = array('l')
+        self.source_codes = array('H')
+        self.prefix_codes = array('L')
+        self.stems: List[str] = []
+        self.sources = Interner()
+        self.prefixes = Interner()
+
+    def append(self, record: dict):
+        row = len(self.ids)
+        fits = (type(record) is dict and _is_int(record.get('id'))
+                and type(record.get('file_name')) is str
+                and _is_int(record.get('width'), 32) and _is_int(record.get('height'), 32)
+                and type(record.get('source', '')) is str)
+
+        if not fits:
+            self._fallback[row] = record
+            record = {'id': 0, 'file_name': '', 'width': 0, 'height': 0}
+
+        file_name = record['file_name']
+        match = PREFIX_PATTERN.match(file_name)
+        prefix = match.group(1) if match else ''
+
+        self.ids.append(record['id'])
+        self.widths.append(record['width'])
+        self.heights.append(record['height'])
+        self.source_codes.append(self.sources.code(record.get('source')))
+        self.prefix_codes.append(self.prefixes.code(prefix))
+        self.stems.append(file_name[len(prefix):])
+        self.layout_codes.append(self.layouts.code(tuple(record) if fits else None))
+
+        extras = {k: v for k, v in record.items() if k not in IMAGE_FIELDS}
+        if fits and extras:
+            self._extras[row] = extras
+
+    def field(self, row: int, key: str):
+        if self._fallback and row in self._fallback:
+            return self._fallback[row][key]
+        if key == 'id':
+            return self.ids[row]
+        if key == 'file_name':
+            return self.prefixes.values[self.prefix_codes[row]] + self.stems[row]
+        if key == 'source':
+            source = self.sources.values[self.source_codes[row]]
+            if source is None:
+                raise KeyError(key)
+            return source
+        if key == 'width':
+            return self.widths[row]
+        if key == 'height':
+            return self.heights[row]
+        return self._extras.get(row, {})[key]
+
+
+class AnnotationTable(RecordTable):
+    """Column storage for COCO annotation records (bbox as a float32 block)."""
+
+    def __init__(self):
+        super().__init__()
+        self.ids = array('q')
+        self.image_ids = array('q')
+        self.category_ids = array('l')
+        self.areas = array('d')
+        self.int_areas = array('b')  # 1 where area was an int (12, not 12.0)
+        self.iscrowd = array('b')
+        self.bboxes = array('f')
+        self.bbox_int_masks = array('B')  # Bit i: bbox[i] was an int
+
+    def append(self, record: dict):
+        row = len(self.ids)
+        fits = (type(record) is dict and _is_int(record.get('id'))
+                and _is_int(record.get('image_id')) and _is_int(record.get('category_id'), 32)
+                and (type(record.get('area')) is float or _is_int(record.get('area'), 54))
+                and type(record.get('iscrowd', 0)) is int and record.get('iscrowd', 0) in (0, 1)
+                and _is_float32_bbox(record.get('bbox')))
+
+        if not fits:
+            self._fallback[row] = record
+            record = {'id': 0, 'image_id': 0, 'category_id': 0, 'area': 0.0, 'bbox': [0, 0, 0, 0]}
+
+        self.ids.append(record['id'])
+        self.image_ids.append(record['image_id'])
+        self.category_ids.append(record['category_id'])
+        self.areas.append(record['area'])
+        self.int_areas.append(type(record['area']) is int)
+        self.iscrowd.append(record.get('iscrowd', 0))
+        self.bboxes.extend(record['bbox'])
+        self.bbox_int_masks.append(_int_mask(record['bbox']))
+        self.layout_codes.append(self.layouts.code(tuple(record) if fits else None))
+
+        extras = {k: v for k, v in record.items() if k not in ANNOTATION_FIELDS}
+        if fits and extras:
+            self._extras[row] = extras
+
+    def field(self, row: int, key: str):
+        if self._fallback and row in self._fallback:
+            return self._fallback[row][key]
+        if key == 'id':
+            return self.ids[row]
+        if key == 'image_id':
+            return self.image_ids[row]
+        if key == 'category_id':
+            return self.category_ids[row]
+        if key == 'area':
+            area = self.areas[row]
+            return int(area) if self.int_areas[row] else area
+        if key == 'bbox':
+            mask = self.bbox_int_masks[row]
+            return [int(v) if mask >> i & 1 else _float32_value(v)
+                    for i, v in enumerate(self.bboxes[4 * row:4 * row + 4])]
+        if key == 'iscrowd':
+            if key not in self.layouts.values[self.layout_codes[row]]:
+                raise KeyError(key)
+            return self.iscrowd[row]
+        return self._extras.get(row, {})[key]
+
+
+class RecordView(Mapping):
+    """Read-only dict-compatible view of one row of a RecordTable."""
+
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table: RecordTable, row: int):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, key: str):
+        return self._table.field(self._row, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table.keys(self._row))
+
+    def __len__(self) -> int:
+        return len(self._table.keys(self._row))
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+    def to_dict(self) -> dict:
+        return self._table.to_dict(self._row)
+
+
+class ImageRecord(RecordView):
+    __slots__ = ()
+
+
+class AnnotationRecord(RecordView):
+    __slots__ = ()
+
+
+ImageTable.view_class = ImageRecord
+AnnotationTable.view_class = AnnotationRecord
+
+
+# Placeholders left in the parsed JSON for records moved into a table
+_IMAGE = object()
+_ANNOTATION = object()
+
+
+def _all_placeholders(items, placeholder, count: int) -> bool:
+    if items is None:
+        return count == 0
+    return type(items) is list and len(items) == count and all(item is placeholder for item in items)
+
+
+def _restore(obj, rows: Dict[int, Iterator[dict]]):
+    """Replace placeholders with their records again (in parse order)."""
+    if obj is _IMAGE or obj is _ANNOTATION:
+        return next(rows[id(obj)])
+    if type(obj) is list:
+        return [_restore(item, rows) for item in obj]
+    if type(obj) is dict:
+        return {key: _restore(value, rows) for key, value in obj.items()}
+    return obj
+
+
+def load_compact(path: Path) -> dict:
+    """
+    Load a COCO annotation file in compact mode.
+
+    Image and annotation objects are moved into column tables as the JSON is
+    parsed, so the per-object dicts are freed immediately. The parser only
+    sees an object's keys, so records are routed by shape; if that routing
+    does not match the `images` and `annotations` lists exactly (records
+    missing a routing key, or record-shaped objects elsewhere), the file is
+    re-routed by list, so no record is dropped or moved.
+    """
+    images = ImageTable()
+    annotations = AnnotationTable()
+
+    def hook(obj: dict):
+        if 'image_id' in obj and 'bbox' in obj:
+            annotations.append(obj)
+            return _ANNOTATION
+        if 'file_name' in obj:
+            images.append(obj)
+            return _IMAGE
+        return obj
+
+    with open(path, 'r') as f:
+        data = json.load(f, object_hook=hook)
+
+    if not (_all_placeholders(data.get('images'), _IMAGE, len(images))
+            and _all_placeholders(data.get('annotations'), _ANNOTATION, len(annotations))):
+        data = _restore(data, {id(_IMAGE): iter(images.to_dicts()),
+                               id(_ANNOTATION): iter(annotations.to_dicts())})
+        images, annotations = ImageTable(), AnnotationTable()
+        for record in data.get('images', ()):
+            images.append(record)
+        for record in data.get('annotations', ()):
+            annotations.append(record)
+
+    data['images'] = images
+    data['annotations'] = annotations
+    return data
+
+
+def json_default(obj):
+    """json.dump `default` hook for compact records and tables."""
+    if isinstance(obj, RecordView):
+        return obj.to_dict()
+    if isinstance(obj, RecordTable):
+        return obj.to_dicts()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def measure(loader, path: Path):
+    """Return (result, seconds, retained MB) for loader(path)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = loader(path)
+    elapsed = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, retained / (1 << 20)
+
+
+def main() -> int:
+    split = sys.argv[1] if len(sys.argv) > 1 else 'train'
+    path = BASE_DIR / split / '_annotations.coco.json'
+
+    def load_dicts(p: Path) -> dict:
+        with open(p, 'r') as f:
+            return json.load(f)
+
+    print(f"Loading {path}...")
+    data, dict_seconds, dict_mb = measure(load_dicts, path)
+    num_images, num_annotations = len(data['images']), len(data['annotations'])
+    del data
+    _, compact_seconds, compact_mb = measure(load_compact, path)
+
+    print(f"  {num_images:,} images, {num_annotations:,} annotations")
+    print(f"\n{'Mode':<10} {'Load (s)':>10} {'Memory (MB)':>12}")
+    print("-" * 34)
+    print(f"{'dict':<10} {dict_seconds:>10.2f} {dict_mb:>12.1f}")
+    print(f"{'compact':<10} {compact_seconds:>10.2f} {compact_mb:>12.1f}")
+    print("-" * 34)
+    if compact_mb > 0:
+        print(f"Compact mode uses {compact_mb / dict_mb * 100:.0f}% of the dict-mode memory")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
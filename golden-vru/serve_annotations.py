@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Local HTTP service sharing one in-memory copy of the Golden-VRU annotations.
+
+QA viewers and relabeling tools each used to re-parse the ~100MB split JSONs
+just to show one image's boxes. This service loads every split once, indexes
+it (file name -> image + annotations, source -> images, class -> images) and
+answers queries from memory:
+
+    GET /                                    splits, fingerprints, counts
+    GET /<split>/images/<file_name>          image record + its annotations
+    GET /<split>/sources                     images per source
+    GET /<split>/sources/<source>            file names (?offset=&limit=)
+    GET /<split>/classes                     images per class
+    GET /<split>/classes/<name>              file names with that class (?offset=&limit=)
+    GET /<split>/files/<file_name>           image bytes (LRU-cached)
+
+JSON responses carry the split's fingerprint as ETag (If-None-Match -> 304).
+A watcher thread polls the annotation files; when a split's fingerprint
+changes (or its file first appears, e.g. after a DVC checkout), a new index
+is built in the background and swapped in atomically, so requests never see
+a half-loaded split. Image bytes are served through a
+size-bounded LRU cache keyed by (path, size, mtime).
+
+Only file names present in a split's index are served, and the server binds
+to 127.0.0.1 by default.
+
+Usage:
+    python serve_annotations.py [--port 8765] [--host 127.0.0.1]
+                                [--cache-mb 256] [--poll 2] [--verbose]
+"""
+
+import argparse
+import json
+import mimetypes
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from fingerprint import annotation_path, bytes_digest, fingerprint, stat_signature
+
+# Constants
+BASE_DIR = Path(__file__).parent
+SPLITS = ['train', 'valid', 'test']
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_MB = 256
+DEFAULT_POLL_SECONDS = 2.0
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 100000
+
+
+class SplitIndex:
+    """Immutable snapshot of one split's annotations with lookup indexes."""
+
+    def __init__(self, name: str, path: Path):
+        self.name = name
+        self.path = path
+        # Signature and fingerprint describe exactly the bytes that are parsed
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            raw = f.read()
+        self.signature = [st.st_size, st.st_mtime_ns]
+        self.fingerprint = bytes_digest(raw)
+        data = json.loads(raw)
+        del raw
+        self.loaded_at = time.time()
+
+        self.categories = data['categories']
+        category_names = {cat['id']: cat['name'] for cat in self.categories}
+        self.images_by_file = {img['file_name']: img for img in data['images']}
+        self.num_annotations = len(data['annotations'])
+
+        self.annotations_by_image = defaultdict(list)
+        for ann in data['annotations']:
+            self.annotations_by_image[ann['image_id']].append(
+                dict(ann, category=category_names.get(ann['category_id'], 'unknown')))
+
+        sources = defaultdict(list)
+        classes = defaultdict(set)
+        file_by_id = {img['id']: img['file_name'] for img in data['images']}
+        for img in data['images']:
+            sources[img.get('source', 'unknown')].append(img['file_name'])
+        for image_id, anns in self.annotations_by_image.items():
+            if image_id in file_by_id:
+                for ann in anns:
+                    classes[ann['category']].add(file_by_id[image_id])
+        self.files_by_source = {source: sorted(names) for source, names in sources.items()}
+        self.files_by_class = {name: sorted(files) for name, files in classes.items()}
+
+    def summary(self) -> dict:
+        return {
+            'fingerprint': self.fingerprint,
+            'images': len(self.images_by_file),
+            'annotations': self.num_annotations,
+            'loaded_at': self.loaded_at,
+        }
+
+    def image(self, file_name: str) -> Optional[dict]:
+        img = self.images_by_file.get(file_name)
+        if img is None:
+            return None
+        return {'image': img, 'annotations': self.annotations_by_image.get(img['id'], [])}
+
+
+class ByteLRU:
+    """Thread-safe LRU cache of bytes values bounded by total size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items: 'OrderedDict[tuple, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: tuple, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'items': len(self._items), 'bytes': self.size, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+class AnnotationStore:
+    """The current SplitIndex of every split, hot-reloaded on fingerprint change."""
+
+    def __init__(self, base_dir: Path, splits: List[str], cache_bytes: int):
+        self.base_dir = Path(base_dir)
+        self.splits = list(splits)  # Splits without an annotation file yet are loaded once it appears
+        self.indexes: Dict[str, SplitIndex] = {}  # Replaced, never mutated: handlers may iterate it
+        self.image_cache = ByteLRU(cache_bytes)
+        self.reloads = 0
+
+    def load_all(self):
+        for split in self.splits:
+            path = annotation_path(split, self.base_dir)
+            if not path.exists():
+                print(f"  {split}: no {path.name} yet (loaded once it appears)")
+                continue
+            start = time.perf_counter()
+            index = SplitIndex(split, path)
+            self.indexes = {**self.indexes, split: index}
+            print(f"  {split}: {len(index.images_by_file):,} images, {index.num_annotations:,} annotations "
+                  f"({time.perf_counter() - start:.1f}s)")
+
+    def refresh(self):
+        """Rebuild every split whose annotation fingerprint changed, or load it once its file appears."""
+        for split in self.splits:
+            current = self.indexes.get(split)
+            path = annotation_path(split, self.base_dir)
+            if current is None and not path.exists():
+                continue  # Not created yet
+            try:
+                if current is not None and stat_signature(path) == current.signature:
+                    continue
+                if current is not None and fingerprint(path) == current.fingerprint:
+                    current.signature = stat_signature(path)  # Touched, content unchanged
+                    continue
+                start = time.perf_counter()
+                index = SplitIndex(split, path)
+            except (OSError, ValueError) as e:
+                # Missing or mid-write file: keep serving the previous index
+                print(f"  [WARN] {split}: reload failed ({e}), keeping the previous index")
+                continue
+            self.indexes = {**self.indexes, split: index}
+            self.reloads += 1
+            print(f"  {split}: {'reloaded' if current else 'loaded'} ({index.fingerprint[:12]}) "
+                  f"in {time.perf_counter() - start:.1f}s")
+
+    def watch(self, interval: float, stop: threading.Event):
+        while not stop.wait(interval):
+            self.refresh()
+
+    def image_bytes(self, split: str, file_name: str) -> Optional[Tuple[bytes, str]]:
+        """Image file contents (through the LRU cache) and content type."""
+        path = self.base_dir / split / file_name
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = (str(path), st.st_size, st.st_mtime_ns)
+        data = self.image_cache.get(key)
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+            self.image_cache.put(key, data)
+        return data, mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+
+
+def page(items: List[str], query: Dict[str, List[str]]) -> dict:
+    """Paginate a sorted list with ?offset=&limit= (or ?after=<name>)."""
+    # A non-integer limit or offset raises ValueError (a 400 response)
+    limit = min(max(int(query.get('limit', [DEFAULT_LIMIT])[0]), 0), MAX_LIMIT)
+    if 'after' in query:
+        offset = bisect_left(items, query['after'][0])
+        if offset < len(items) and items[offset] == query['after'][0]:
+            offset += 1
+    else:
+        offset = max(int(query.get('offset', [0])[0]), 0)
+    return {'total': len(items), 'offset': offset, 'items': items[offset:offset + limit]}
+
+
+class AnnotationHandler(BaseHTTPRequestHandler):
+    store: AnnotationStore = None
+    verbose = False
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, payload: object, status: int = 200, etag: Optional[str] = None):
+        if etag and self.headers.get('If-None-Match') == f'"{etag}"':
+            self.send_response(304)
+            self.send_header('ETag', f'"{etag}"')
+            self.end_headers()
+            return
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', f'"{etag}"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status: int, message: str):
+        self.send_json({'error': message}, status=status)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        parts = [unquote(part) for part in url.path.strip('/').split('/') if part]
+
+        if not parts:
+            self.send_json({
+                'splits': {name: index.summary() for name, index in self.store.indexes.items()},
+                'reloads': self.store.reloads,
+                'image_cache': self.store.image_cache.stats(),
+            })
+            return
+
+        index = self.store.indexes.get(parts[0])  # One snapshot per request
+        if index is None:
+            self.send_error_json(404, f"Unknown split '{parts[0]}'")
+            return
+        kind, arg = (parts[1] if len(parts) > 1 else None), '/'.join(parts[2:]) or None
+
+        try:
+            if kind == 'images' and arg:
+                result = index.image(arg)
+                if result is None:
+                    self.send_error_json(404, f"No image '{arg}' in {index.name}")
+                else:
+                    self.send_json(result, etag=index.fingerprint)
+            elif kind in ('sources', 'classes'):
+                groups = index.files_by_source if kind == 'sources' else index.files_by_class
+                if arg is None:
+                    self.send_json({name: len(files) for name, files in sorted(groups.items())},
+                                   etag=index.fingerprint)
+                elif arg in groups:
+                    self.send_json(page(groups[arg], query), etag=index.fingerprint)
+                else:
+                    self.send_error_json(404, f"No {kind[:-1]} '{arg}' in {index.name}")
+            elif kind == 'files' and arg:
+                result = self.store.image_bytes(index.name, arg) if arg in index.images_by_file else None
+                if result is None:
+                    self.send_error_json(404, f"No image file '{arg}' in {index.name}")
+                    return
+                data, content_type = result
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            else:
+                self.send_error_json(404, f"Unknown path '{url.path}'")
+        except ValueError as e:
+            self.send_error_json(400, str(e))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Serve Golden-VRU annotations over local HTTP')
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port (default: {DEFAULT_PORT})')
+    parser.add_argument('--cache-mb', type=int, default=DEFAULT_CACHE_MB,
+                        help=f'Image bytes LRU cache size (default: {DEFAULT_CACHE_MB} MB)')
+    parser.add_argument('--poll', type=float, default=DEFAULT_POLL_SECONDS,
+                        help=f'Seconds between annotation change checks (default: {DEFAULT_POLL_SECONDS:g})')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Golden-VRU Annotation Server")
+    print("=" * 60)
+    print()
+
+    store = AnnotationStore(BASE_DIR, SPLITS, args.cache_mb << 20)
+    store.load_all()
+    if not store.indexes:
+        print("\n[WARN] No split annotations found yet; serving them once they appear")
+
+    stop = threading.Event()
+    watcher = threading.Thread(target=store.watch, args=(args.poll, stop), daemon=True)
+    watcher.start()
+
+    AnnotationHandler.store = store
+    AnnotationHandler.verbose = args.verbose
+    server = ThreadingHTTPServer((args.host, args.port), AnnotationHandler)
+    server.daemon_threads = True
+    print(f"\nServing on http://{args.host}:{server.server_port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping")
+    finally:
+        stop.set()
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
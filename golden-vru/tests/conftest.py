@@ -0,0 +1,29 @@
+"""Shared fixtures for the Golden-VRU tooling tests."""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import benchmark  # noqa: E402
+
+SPLITS = ['train', 'valid', 'test']
+
+
+def write_coco(path: Path, data: dict):
+    """Write a COCO dict to path, creating its directory."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """A small synthetic golden-vru tree (stub images) under tmp_path."""
+    base_dir = tmp_path / 'golden-vru'
+    for offset, split in enumerate(SPLITS):
+        benchmark.write_split(base_dir / split, 400 if split == 'train' else 50, benchmark.SEED + offset)
+    return base_dir
@@ -0,0 +1,103 @@
+"""Tests for the content-based version diff (diff_versions.py)."""
+
+import numpy as np
+
+from diff_versions import check_claims, diff_split, matched_rows
+
+CATEGORIES = [{'id': 0, 'name': 'pedestrian'}, {'id': 1, 'name': 'cyclist'}]
+
+
+def image(image_id, file_name, source):
+    return {'id': image_id, 'file_name': file_name, 'width': 100, 'height': 100, 'source': source}
+
+
+def box(ann_id, image_id, bbox, category_id=0):
+    return {'id': ann_id, 'image_id': image_id, 'category_id': category_id,
+            'bbox': bbox, 'area': bbox[2] * bbox[3]}
+
+
+def test_matched_rows():
+    a = np.array([[1, 2], [3, 4], [5, 6]])
+    b = np.array([[5, 6], [7, 8], [1, 2]])
+    in_b, in_a = matched_rows(a, b)
+    assert in_b.tolist() == [True, False, True]
+    assert in_a.tolist() == [True, False, True]
+
+
+def test_matched_rows_empty():
+    in_b, in_a = matched_rows(np.zeros((0, 2), dtype=np.int64), np.array([[1, 2]]))
+    assert in_b.tolist() == [] and in_a.tolist() == [False]
+
+
+def test_diff_split_matches_by_content():
+    old = {
+        'categories': CATEGORIES,
+        'images': [image(0, 'a.jpg', 'bdd100k'), image(1, 'b.jpg', 'bdd100k'),
+                   image(2, 'r.jpg', 'rsud20k')],
+        'annotations': [box(0, 0, [0, 0, 40, 40]), box(1, 0, [0, 0, 40, 40]),
+                        box(2, 1, [10, 10, 50, 50]), box(3, 2, [5, 5, 60, 60])],
+    }
+    # IDs remapped; r.jpg removed, n.jpg added, one duplicate box of a.jpg kept,
+    # b.jpg's box moved (a changed box)
+    new = {
+        'categories': CATEGORIES,
+        'images': [image(10, 'n.jpg', 'nuimages'), image(11, 'b.jpg', 'bdd100k'),
+                   image(12, 'a.jpg', 'bdd100k')],
+        'annotations': [box(20, 12, [0, 0, 40, 40]), box(21, 11, [12, 10, 50, 50]),
+                        box(22, 10, [1, 1, 45, 45], category_id=1)],
+    }
+    result = diff_split(old, new)
+    sources = result['sources']
+
+    assert sources['rsud20k']['images_removed'] == 1
+    assert sources['rsud20k']['boxes_removed'] == 1
+    assert sources['nuimages']['images_added'] == 1
+    assert sources['nuimages']['boxes_added'] == 1
+    assert sources['bdd100k']['images_changed'] == 2
+    assert sources['bdd100k']['boxes_changed'] == 1
+    assert sources['bdd100k']['boxes_removed'] == 1  # The second duplicate of a.jpg
+    assert sources['bdd100k']['boxes_unchanged'] == 1
+    assert result['removed_image_sources'].tolist() == ['rsud20k']
+    assert result['counts'] == {'old': (3, 4, 4, 0), 'new': (3, 3, 2, 1)}
+
+
+def test_identical_versions_have_no_changes():
+    data = {'categories': CATEGORIES, 'images': [image(0, 'a.jpg', 'bdd100k')],
+            'annotations': [box(0, 0, [0, 0, 40, 40])]}
+    result = diff_split(data, data)
+    nonzero = {key: value for key, value in result['sources']['bdd100k'].items() if value}
+    assert nonzero == {'images_unchanged': 1, 'boxes_unchanged': 1}
+    assert result['changed_images'] == 0
+
+
+def rsud_removal(keep_rsud):
+    old = {'categories': CATEGORIES,
+           'images': [image(0, 'a.jpg', 'bdd100k'), image(1, 'r.jpg', 'rsud20k'),
+                      image(2, 's.jpg', 'rsud20k')],
+           'annotations': [box(0, 0, [0, 0, 40, 40]), box(1, 1, [0, 0, 40, 40]),
+                           box(2, 2, [0, 0, 40, 40])]}
+    images = [image(0, 'a.jpg', 'bdd100k')] + ([image(2, 's.jpg', 'rsud20k')] if keep_rsud else [])
+    new = {'categories': CATEGORIES, 'images': images,
+           'annotations': [box(0, 0, [0, 0, 40, 40])]
+           + ([box(2, 2, [0, 0, 40, 40])] if keep_rsud else [])}
+    return {'valid': diff_split(old, new)}
+
+
+def test_check_claims_pass():
+    tables = {'v8.0': {'valid': (3, 3, 3, 0)}, 'v9.0': {'valid': (1, 1, 1, 0)}}
+    checks = check_claims('v8.0', 'v9.0', rsud_removal(keep_rsud=False), tables)
+    assert checks and all(passed for passed, _ in checks)
+
+
+def test_check_claims_fail():
+    tables = {'v9.0': {'valid': (1, 1, 1, 0)}}
+    checks = dict((message, passed) for passed, message in
+                  check_claims('v8.0', 'v9.0', rsud_removal(keep_rsud=True), tables))
+    failed = [message for message, passed in checks.items() if not passed]
+    assert any('STATS.md: 1/1/1/0' in message for message in failed)
+    assert any('removes every rsud20k image (1 left)' in message for message in failed)
+
+
+def test_check_claims_unrelated_versions_only_check_tables():
+    checks = check_claims('v6.0', 'v9.0', rsud_removal(keep_rsud=False), {})
+    assert checks == []
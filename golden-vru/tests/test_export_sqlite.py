@@ -0,0 +1,27 @@
+"""Tests for the SQLite export (export_sqlite.py)."""
+
+import export_sqlite
+from conftest import write_coco
+
+
+def test_missing_splits_and_bad_bboxes_are_skipped(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(export_sqlite, 'BASE_DIR', tmp_path)
+    write_coco(tmp_path / 'valid' / '_annotations.coco.json', {
+        'categories': [{'id': 0, 'name': 'pedestrian'}],
+        'images': [{'id': 0, 'file_name': 'a.jpg', 'width': 10, 'height': 10}],
+        'annotations': [
+            {'id': 0, 'image_id': 0, 'category_id': 0, 'bbox': [0, 0, 5, 5], 'area': 25},
+            {'id': 1, 'image_id': 0, 'category_id': 0, 'bbox': [0, 0, 5], 'area': 25},
+            {'id': 2, 'image_id': 0, 'category_id': 0, 'bbox': None, 'area': 25},
+        ],
+    })
+    conn = export_sqlite.connect(tmp_path / 'db.sqlite')
+
+    assert export_sqlite.refresh(conn) == ['valid']
+    out = capsys.readouterr().out
+    assert 'train: skipped (missing _annotations.coco.json)' in out
+    assert 'skipped 2 annotations without a valid bbox' in out
+    assert conn.execute('SELECT id FROM annotations').fetchall() == [(0,)]
+    assert conn.execute('SELECT num_annotations FROM images').fetchone() == (1,)
+    assert conn.execute('SELECT annotations FROM splits').fetchone() == (1,)
+    assert export_sqlite.refresh(conn) == []
@@ -0,0 +1,67 @@
+"""Tests for the incremental YOLO export (export_yolo.py)."""
+
+import pytest
+
+import export_yolo
+from conftest import write_coco
+from golden_vru import GoldenVRU
+
+
+def write_split(base_dir, file_names):
+    write_coco(base_dir / 'valid' / '_annotations.coco.json', {
+        'categories': [{'id': 0, 'name': 'pedestrian'}],
+        'images': [{'id': i, 'file_name': name, 'width': 100, 'height': 100}
+                   for i, name in enumerate(file_names)],
+        'annotations': [{'id': 0, 'image_id': 0, 'category_id': 0, 'bbox': [10, 10, 20, 40],
+                         'area': 800}],
+    })
+
+
+def export(base_dir, output_dir, force=False):
+    split = GoldenVRU(base_dir, ['valid'])['valid']
+    return export_yolo.export_split(split, output_dir, force=force)
+
+
+@pytest.mark.parametrize('force', [False, True])
+def test_removed_images_lose_their_labels(tmp_path, force):
+    output_dir = tmp_path / 'yolo'
+    write_split(tmp_path, ['a.jpg', 'b.jpg'])
+    assert export(tmp_path, output_dir)['written'] == 2
+
+    write_split(tmp_path, ['a.jpg'])
+    stats = export(tmp_path, output_dir, force=force)
+    assert stats['deleted'] == 1
+    assert sorted(p.name for p in (output_dir / 'valid' / 'labels').iterdir()) == ['a.txt']
+
+
+def test_force_rerenders_unchanged_split(tmp_path):
+    output_dir = tmp_path / 'yolo'
+    write_split(tmp_path, ['a.jpg'])
+    export(tmp_path, output_dir)
+    assert export(tmp_path, output_dir)['skipped'] == 1
+    assert export(tmp_path, output_dir, force=True)['skipped'] == 0
+
+
+def test_label_name_collision_is_an_error(tmp_path):
+    write_split(tmp_path, ['a.jpg', 'a.png'])
+    with pytest.raises(ValueError, match='a.txt'):
+        export(tmp_path, tmp_path / 'yolo')
+
+
+@pytest.mark.parametrize('image, category_id, message', [
+    ({'width': 0, 'height': 100}, 0, 'no valid width/height'),
+    ({'height': 100}, 0, 'no valid width/height'),
+    ({'width': 100, 'height': 100}, 7, 'unknown category ID 7'),
+])
+def test_unnormalizable_annotations_are_errors(tmp_path, image, category_id, message):
+    write_coco(tmp_path / 'valid' / '_annotations.coco.json', {
+        'categories': [{'id': 0, 'name': 'pedestrian'}],
+        'images': [dict(image, id=0, file_name='a.jpg'),
+                   {'id': 1, 'file_name': 'empty.jpg', 'width': 0, 'height': 0}],
+        'annotations': [{'id': 0, 'image_id': 0, 'category_id': category_id,
+                         'bbox': [10, 10, 20, 40], 'area': 800}],
+    })
+    with pytest.raises(ValueError, match=message):
+        export(tmp_path, tmp_path / 'yolo')
+    assert not (tmp_path / 'yolo' / 'valid' / 'labels').exists()
+
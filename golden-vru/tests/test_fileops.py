@@ -0,0 +1,10 @@
+"""Tests for the bulk file helpers (fileops.py)."""
+
+from fileops import count_existing
+
+
+def test_count_existing(tmp_path):
+    for name in ('a.jpg', 'b.jpg'):
+        (tmp_path / name).write_bytes(b'')
+    assert count_existing(tmp_path, ['a.jpg', 'b.jpg', 'c.jpg']) == 2
+    assert count_existing(tmp_path / 'missing', ['a.jpg']) == 0
@@ -0,0 +1,61 @@
+"""Tests for near-duplicate pair counting (find_duplicates.py)."""
+
+import random
+from collections import defaultdict
+from itertools import combinations
+
+import pytest
+
+pytest.importorskip('PIL')
+
+import find_duplicates  # noqa: E402
+
+SPLITS = ['train', 'valid', 'test']
+
+
+def brute_force(entries, threshold):
+    counts = defaultdict(int)
+    pairs = []
+    for i, j in combinations(range(len(entries)), 2):
+        distance = (entries[i][2] ^ entries[j][2]).bit_count()
+        if distance <= threshold:
+            split_a, split_b = sorted((entries[i][0], entries[j][0]), key=SPLITS.index)
+            counts[f"{split_a}/{split_b}"] += 1
+            pairs.append((entries[i][0] == entries[j][0], distance,
+                          f"{entries[i][0]}/{entries[i][1]}", f"{entries[j][0]}/{entries[j][1]}"))
+    return dict(counts), sorted(pairs)
+
+
+def make_entries(seed):
+    rng = random.Random(seed)
+    bases = [rng.getrandbits(64) for _ in range(6)]
+    entries = []
+    for index in range(80):
+        value = rng.choice(bases)
+        for _ in range(rng.choice([0, 0, 1, 3])):
+            value ^= 1 << rng.randrange(64)
+        entries.append((rng.choice(SPLITS), f"{index:03d}.jpg", value))
+    return entries
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_counts_and_examples_match_brute_force(seed, monkeypatch):
+    monkeypatch.setattr(find_duplicates, 'MAX_REPORTED_PAIRS', 25)
+    entries = make_entries(seed)
+    counts, examples = find_duplicates.near_duplicate_pairs(entries, SPLITS, 4)
+
+    expected_counts, expected_pairs = brute_force(entries, 4)
+    assert counts == expected_counts
+    assert len(examples) == 25
+    assert [(not p['cross_split'], p['distance'], p['a'], p['b']) for p in examples] == expected_pairs[:25]
+
+
+@pytest.mark.parametrize('threshold', [-1, find_duplicates.MAX_THRESHOLD + 1])
+def test_threshold_out_of_range_is_rejected(threshold):
+    with pytest.raises(ValueError, match='threshold'):
+        find_duplicates.chunk_bounds(threshold)
+
+
+def test_every_chunk_keeps_a_bit_at_the_maximum_threshold():
+    bounds = find_duplicates.chunk_bounds(find_duplicates.MAX_THRESHOLD)
+    assert all(high > low for low, high in bounds)
@@ -0,0 +1,93 @@
+"""Tests for the lazy GoldenVRU dataset object (golden_vru.py)."""
+
+import os
+
+import pytest
+
+import golden_vru
+from conftest import write_coco
+from golden_vru import GoldenVRU
+from records import RecordTable
+
+
+def make_split(base_dir, sources):
+    data = {
+        'categories': [{'id': 0, 'name': 'pedestrian'}, {'id': 1, 'name': 'cyclist'}],
+        'images': [{'id': i, 'file_name': f'{i}.jpg', 'width': 10, 'height': 10, 'source': source}
+                   for i, source in enumerate(sources)],
+        'annotations': [{'id': i, 'image_id': i, 'category_id': 0, 'bbox': [0, 0, 5, 5], 'area': 25}
+                        for i in range(len(sources))],
+    }
+    write_coco(base_dir / 'valid' / '_annotations.coco.json', data)
+
+
+def bump_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+@pytest.fixture(autouse=True)
+def no_stat_ttl(monkeypatch):
+    """Check the file on every access, so rewrites are seen immediately."""
+    monkeypatch.setattr(golden_vru, 'STAT_TTL', 0.0)
+
+
+def test_views_are_memoized(tmp_path):
+    make_split(tmp_path, ['nuimages', 'bdd100k'])
+    split = GoldenVRU(tmp_path, ['valid'])['valid']
+    assert split.images_by_id is split.images_by_id
+    assert split.source_distribution == {'nuimages': 1, 'bdd100k': 1}
+
+
+def test_view_read_before_data_is_refreshed(tmp_path):
+    make_split(tmp_path, ['nuimages'])
+    split = GoldenVRU(tmp_path, ['valid'])['valid']
+    first = split.fingerprint
+    assert not split.loaded
+
+    make_split(tmp_path, ['nuimages', 'bdd100k'])
+    bump_mtime(split.path)
+    assert split.fingerprint != first
+
+
+def test_views_follow_file_changes(tmp_path):
+    make_split(tmp_path, ['nuimages'])
+    split = GoldenVRU(tmp_path, ['valid'])['valid']
+    assert split.source_distribution == {'nuimages': 1}
+    fingerprint = split.fingerprint
+
+    make_split(tmp_path, ['rsud20k', 'rsud20k'])
+    bump_mtime(split.path)
+    assert split.source_distribution == {'rsud20k': 2}
+    assert len(split.images) == 2
+    assert split.fingerprint != fingerprint
+
+
+def test_compact_mode(tmp_path):
+    make_split(tmp_path, ['nuimages', 'bdd100k'])
+    split = GoldenVRU(tmp_path, ['valid'], compact=True)['valid']
+    assert isinstance(split.images, RecordTable)
+    assert split.source_distribution == {'nuimages': 1, 'bdd100k': 1}
+    assert split.annotations_by_image[1][0]['area'] == 25
+
+
+def test_stat_is_reused_within_ttl(tmp_path, monkeypatch):
+    make_split(tmp_path, ['nuimages'])
+    split = GoldenVRU(tmp_path, ['valid'])['valid']
+    monkeypatch.setattr(golden_vru, 'STAT_TTL', 60.0)
+    assert split.source_distribution == {'nuimages': 1}
+
+    calls = []
+    monkeypatch.setattr(golden_vru, 'stat_signature', lambda path: calls.append(path))
+    for _ in range(3):
+        assert split.source_distribution == {'nuimages': 1}
+    assert calls == []
+
+
+def test_unload_releases_data_and_views(tmp_path):
+    make_split(tmp_path, ['nuimages'])
+    split = GoldenVRU(tmp_path, ['valid'])['valid']
+    assert split.source_distribution == {'nuimages': 1}
+    split.unload()
+    assert not split.loaded and not split._views
+    assert split.source_distribution == {'nuimages': 1}
@@ -0,0 +1,138 @@
+"""Tests for the write-ahead journal's apply, resume and rollback (journal.py)."""
+
+import json
+import os
+
+import pytest
+
+from journal import Journal
+
+
+@pytest.fixture
+def tree(tmp_path):
+    split_dir = tmp_path / 'valid'
+    split_dir.mkdir()
+    for name in ('a.jpg', 'b.jpg', 'c.jpg'):
+        (split_dir / name).write_bytes(name.encode())
+    (split_dir / '_annotations.coco.json').write_text('{"version": 1}')
+    return tmp_path
+
+
+def snapshot(root):
+    """Relative path -> contents of every file outside the journal directory."""
+    return {str(path.relative_to(root)): path.read_bytes()
+            for path in sorted(root.rglob('*'))
+            if path.is_file() and '.journal' not in path.parts}
+
+
+def plan(tree):
+    split_dir = tree / 'valid'
+    journal = Journal('test', tree / '.journal')
+    journal.plan_copy(split_dir / '_annotations.coco.json', split_dir / '_annotations.coco.bak.json')
+    journal.plan_copy(split_dir / 'a.jpg', tree / 'rsud' / 'a.jpg')
+    journal.plan_delete(split_dir / 'a.jpg')
+    journal.plan_delete(split_dir / 'b.jpg')
+    journal.plan_write_json(split_dir / '_annotations.coco.json', {'version': 2})
+    journal.plan_write_json(tree / 'rsud' / '_annotations.coco.json', {'version': 1})
+    journal.finish_plan()
+    return journal
+
+
+def test_apply_then_rollback_restores_the_tree(tree):
+    before = snapshot(tree)
+    journal = plan(tree)
+    counts = journal.apply()
+    assert counts == {'copied': 2, 'deleted': 2, 'written': 2, 'skipped': 0, 'missing': 0, 'failed': 0}
+    assert journal.delete_stats['deleted'] == 2 and journal.delete_stats['files_per_second'] > 0
+    assert not (tree / 'valid' / 'a.jpg').exists()
+    assert json.loads((tree / 'valid' / '_annotations.coco.json').read_text()) == {'version': 2}
+
+    Journal('test', tree / '.journal').rollback()
+    assert snapshot(tree) == before
+    assert not (tree / '.journal' / 'test').exists()
+
+
+def test_interrupted_apply_rolls_back(tree, monkeypatch):
+    before = snapshot(tree)
+    journal = plan(tree)
+
+    applied = []
+    original = Journal._apply_op
+
+    def interrupt(self, op):
+        if len(applied) == 3:
+            raise KeyboardInterrupt
+        applied.append(op['seq'])
+        return original(self, op)
+
+    monkeypatch.setattr(Journal, '_apply_op', interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        journal.apply()
+    journal.close()
+    monkeypatch.setattr(Journal, '_apply_op', original)
+
+    reopened = Journal('test', tree / '.journal')
+    assert reopened.unfinished
+    reopened.rollback()
+    assert snapshot(tree) == before
+
+
+def test_interrupted_apply_resumes(tree, monkeypatch):
+    journal = plan(tree)
+    original = Journal._apply_op
+
+    def interrupt(self, op):
+        if op['op'] == 'write':
+            raise KeyboardInterrupt
+        return original(self, op)
+
+    monkeypatch.setattr(Journal, '_apply_op', interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        journal.apply()
+    journal.close()
+    monkeypatch.setattr(Journal, '_apply_op', original)
+
+    reopened = Journal('test', tree / '.journal')
+    assert [op['op'] for op in reopened.pending] == ['write', 'write']
+    assert reopened.apply()['written'] == 2
+    assert json.loads((tree / 'rsud' / '_annotations.coco.json').read_text()) == {'version': 1}
+
+    reopened.finish()
+    assert not (tree / 'valid' / '.trash').exists()
+    assert not list(tree.rglob('*.journal-*'))
+
+
+def test_discard_removes_staged_files(tree):
+    before = snapshot(tree)
+    journal = Journal('test', tree / '.journal')
+    journal.plan_delete(tree / 'valid' / 'a.jpg')
+    journal.plan_write_json(tree / 'valid' / '_annotations.coco.json', {'version': 2})
+    journal.close()
+
+    reopened = Journal('test', tree / '.journal')
+    assert reopened.state == 'planning'
+    reopened.discard()
+    assert snapshot(tree) == before
+
+
+def test_failed_delete_is_counted_and_left_in_place(tree, monkeypatch):
+    journal = Journal('test', tree / '.journal')
+    journal.plan_delete(tree / 'valid' / 'a.jpg')
+    journal.plan_delete(tree / 'valid' / 'b.jpg')
+    journal.plan_delete(tree / 'valid' / 'gone.jpg')
+    journal.finish_plan()
+
+    replace = os.replace
+
+    def refuse_a(src, dst):
+        if str(src).endswith('a.jpg'):
+            raise PermissionError(13, 'Permission denied')
+        return replace(src, dst)
+
+    monkeypatch.setattr(os, 'replace', refuse_a)
+    counts = journal.apply()
+    assert (counts['deleted'], counts['missing'], counts['failed']) == (1, 1, 1)
+    stats = journal.delete_stats
+    assert (stats['deleted'], stats['missing'], stats['failed']) == (1, 1, 1)
+    assert stats['errors'] == [f"{tree / 'valid' / 'a.jpg'}: Permission denied"]
+    assert (tree / 'valid' / 'a.jpg').exists()
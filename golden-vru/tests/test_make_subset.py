@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pytest
+
+import make_subset
+from conftest import write_coco
+from golden_vru import GoldenVRU
+
+
+def picked_names(split, fraction, seed):
+    selected, strata = make_subset.select_images(split, fraction, seed)
+    assert len(selected) == sum(strata.values())
+    return {split.images[i]['file_name'] for i in selected}
+
+
+def test_selection_is_seeded_and_order_independent(dataset, tmp_path):
+    split = GoldenVRU(dataset)['train']
+    first = picked_names(split, 0.05, seed=3)
+    assert len(first) == 20
+    assert picked_names(split, 0.05, seed=3) == first
+    assert picked_names(split, 0.05, seed=4) != first
+
+    # Reordering the images must not change the picks
+    data = dict(split.data, images=split.images[::-1])
+    write_coco(tmp_path / 'reordered' / 'train' / '_annotations.coco.json', data)
+    assert picked_names(GoldenVRU(tmp_path / 'reordered')['train'], 0.05, seed=3) == first
+
+
+def test_selection_keeps_source_mix(dataset):
+    split = GoldenVRU(dataset)['train']
+    selected, _ = make_subset.select_images(split, 0.1, seed=0)
+    picked = [split.images[i].get('source') for i in selected]
+    for source, images in split.images_by_source.items():
+        assert abs(picked.count(source) - len(images) * 0.1) <= len(split.images) * 0.01
+
+
+def test_allocate_is_proportional_and_exact():
+    quotas = make_subset.allocate(np.array([50, 30, 15, 5]), 10)
+    assert quotas.sum() == 10
+    assert quotas.tolist() == [5, 3, 2, 0]  # Remainder tie goes to the first stratum
+
+
+@pytest.mark.parametrize('relative', ['.', '..', 'train', 'valid/nested'])
+def test_refuses_dataset_and_ancestor_outputs(dataset, relative):
+    with pytest.raises(ValueError):
+        make_subset.check_output_dir(dataset / relative, dataset)
+
+
+def test_build_prunes_only_marked_directories(dataset, tmp_path):
+    data = GoldenVRU(dataset)
+    output_dir = tmp_path / 'subset'
+    split = data['valid']
+
+    make_subset.build_split(data, split, output_dir, 0.1, seed=0)
+    split_dir = output_dir / 'valid'
+    (split_dir / 'stale.jpg').write_bytes(b'x')
+    stats = make_subset.build_split(data, split, output_dir, 0.1, seed=0)
+    assert stats['deleted'] == 1
+    assert not (split_dir / 'stale.jpg').exists()
+    with open(split_dir / '_annotations.coco.json') as f:
+        assert len(json.load(f)['images']) == stats['images'] == 5
+
+    foreign = tmp_path / 'foreign'
+    (foreign / 'valid').mkdir(parents=True)
+    (foreign / 'valid' / 'keep.jpg').write_bytes(b'x')
+    with pytest.raises(ValueError):
+        make_subset.build_split(data, split, foreign, 0.1, seed=0)
+    assert (foreign / 'valid' / 'keep.jpg').exists()
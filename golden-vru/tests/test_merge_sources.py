@@ -0,0 +1,93 @@
+"""Tests for the N-source merge (merge_sources.py)."""
+
+import json
+import tarfile
+
+import pytest
+
+import merge_sources
+from conftest import write_coco
+
+
+def coco(image_ids, annotations, categories):
+    return {
+        'categories': [{'id': i, 'name': name} for i, name in enumerate(categories)],
+        'images': [{'id': i, 'file_name': f'{i}.jpg', 'width': 10, 'height': 10} for i in image_ids],
+        'annotations': [{'id': i, 'image_id': image_id, 'category_id': cat, 'bbox': [0, 0, 5, 5],
+                         'area': 25, 'iscrowd': 0}
+                        for i, (image_id, cat) in enumerate(annotations)],
+    }
+
+
+@pytest.fixture
+def tree(tmp_path):
+    write_coco(tmp_path / 'golden' / 'train' / '_annotations.coco.json',
+               coco([0, 1], [(0, 0), (1, 1)], ['pedestrian', 'cyclist']))
+    write_coco(tmp_path / 'a' / 'train' / '_annotations.coco.json',
+               coco([0, 5], [(0, 0), (5, 0), (9, 0)], ['pedestrian']))
+    write_coco(tmp_path / 'b' / 'train' / '_annotations.coco.json',
+               coco([3], [(3, 0)], ['cyclist']))
+    return tmp_path
+
+
+def test_sources_are_shifted_past_running_max(tree):
+    sources = [merge_sources.make_source('a', tree / 'a'), merge_sources.make_source('b', tree / 'b')]
+    stats = merge_sources.merge_split('train', sources, dry_run=True, base_dir=tree / 'golden')
+    assert stats['merged_images'] == 5
+    assert stats['merged_annotations'] == 5
+    assert stats['a_orphan_annotations'] == 1
+    assert stats['pedestrian'] == 3 and stats['cyclist'] == 2
+
+    path = tree / 'golden' / 'train' / '_annotations.coco.json'
+    merge_sources.write_merged(path, 'train', merge_sources.load_annotations(path), sources,
+                               lambda source, data: None)
+    with open(path) as f:
+        merged = json.load(f)
+    # a: images 0, 5 -> 2, 7; b starts past a's maximum (7): image 3 -> 11
+    assert [img['id'] for img in merged['images']] == [0, 1, 2, 7, 11]
+    assert [ann['id'] for ann in merged['annotations']] == [0, 1, 2, 3, 5]
+    assert merged['annotations'][-1]['category_id'] == 1  # b's cyclist mapped by name
+
+
+def test_orphans_do_not_attach_to_another_sources_image(tree):
+    # a's orphan (image 9) would be shifted to 11, b's image 3 after its offset
+    sources = [merge_sources.make_source('a', tree / 'a'), merge_sources.make_source('b', tree / 'b')]
+    path = tree / 'golden' / 'train' / '_annotations.coco.json'
+    merge_sources.write_merged(path, 'train', merge_sources.load_annotations(path), sources,
+                               lambda source, data: None)
+    with open(path) as f:
+        merged = json.load(f)
+    image_ids = {img['id'] for img in merged['images']}
+    assert all(ann['image_id'] in image_ids for ann in merged['annotations'])
+    assert [ann['category_id'] for ann in merged['annotations'] if ann['image_id'] == 11] == [1]
+
+
+@pytest.mark.parametrize('category_id', [7, -1])
+def test_out_of_range_category_ids_are_unmapped(tree, category_id):
+    data = coco([0], [(0, 0)], ['pedestrian'])
+    data['annotations'][0]['category_id'] = category_id
+    write_coco(tree / 'c' / 'train' / '_annotations.coco.json', data)
+    source = merge_sources.make_source('c', tree / 'c')
+    with pytest.raises(ValueError, match='unmapped category IDs'):
+        merge_sources.merge_split('train', [source], dry_run=True, base_dir=tree / 'golden')
+
+
+def test_keep_category_ids(tree):
+    source = merge_sources.make_source('b', tree / 'b', keep_category_ids=True)
+    stats = merge_sources.merge_split('train', [source], dry_run=True, base_dir=tree / 'golden')
+    assert stats['pedestrian'] == 2 and stats['cyclist'] == 1
+
+
+def test_missing_source_images_are_reported_not_fatal(tree, capsys):
+    (tree / 'a' / 'train' / '0.jpg').write_bytes(b'jpeg')
+    (tree / 'b' / 'train' / '3.jpg').write_bytes(b'jpeg')
+    with tarfile.open(tree / 'b.tar', 'w') as tar:
+        tar.add(tree / 'b' / 'train' / '_annotations.coco.json', arcname='train/_annotations.coco.json')
+    sources = [merge_sources.make_source('a', tree / 'a'), merge_sources.make_source('b', tree / 'b.tar')]
+
+    stats = merge_sources.merge_split('train', sources, base_dir=tree / 'golden')
+    assert stats['missing_images'] == 2  # a/5.jpg and b's 3.jpg (not in the archive)
+    assert (tree / 'golden' / 'train' / 'a_0.jpg').exists()
+    assert stats['merged_images'] == 5
+    out = capsys.readouterr().out
+    assert '2 source images missing' in out and '5.jpg' in out and 'train/3.jpg' in out
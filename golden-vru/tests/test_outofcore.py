@@ -0,0 +1,70 @@
+"""Tests for the out-of-core streaming pass (outofcore.py)."""
+
+import sys
+
+import pytest
+
+import extract_rsud
+import filter_small_objects
+import journal
+import outofcore
+from golden_vru import GoldenVRU
+
+
+@pytest.fixture
+def patched(dataset, tmp_path, monkeypatch):
+    for module in (outofcore, filter_small_objects, extract_rsud):
+        monkeypatch.setattr(module, 'BASE_DIR', dataset)
+    monkeypatch.setattr(extract_rsud, 'RSUD_OUTPUT_DIR', tmp_path / 'rsud-vru')
+    monkeypatch.setattr(journal, 'JOURNAL_DIR', tmp_path / '.journal')
+    return dataset
+
+
+def test_removed_file_names_are_spilled(patched):
+    result = outofcore.process_split('valid', filter_small=True, extract=True)
+    try:
+        data = GoldenVRU(patched, ['valid'])['valid'].data
+        expected, _ = filter_small_objects.filter_small_objects(data)
+        removed = result['filter']['removed_image_files']
+        assert isinstance(removed, outofcore.NameSpill)
+        assert list(removed) == list(removed)
+        assert len(removed) == len(data['images']) - len(expected['images']) > 0
+        assert set(removed) <= {img['file_name'] for img in data['images']}
+    finally:
+        outofcore.close_result(result)
+
+
+def test_aborted_plan_removes_staged_files(patched, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError('planning failed')
+
+    monkeypatch.setattr(outofcore, 'plan_split', fail)
+    monkeypatch.setattr(sys, 'argv', ['outofcore.py', '--filter', '--extract-rsud', '--apply',
+                                      '--split', 'valid'])
+    with pytest.raises(RuntimeError):
+        outofcore.main()
+
+    for path in outofcore.staged_paths('valid'):
+        assert not path.exists()
+
+
+def test_discarded_plan_staged_files_are_removed(patched, monkeypatch):
+    staged_output, _ = outofcore.staged_paths('test')
+    staged_output.write_text('{}')
+    monkeypatch.setattr(sys, 'argv', ['outofcore.py', '--filter', '--apply', '--split', 'valid'])
+    outofcore.main()
+    assert not staged_output.exists()
+
+
+def test_orphan_groups_are_bounded(monkeypatch):
+    monkeypatch.setattr(outofcore, 'MAX_ORPHAN_GROUP', 3)
+    images = [{'id': 100}, {'id': 200}]
+    annotations = ([{'id': i, 'image_id': i} for i in range(7)]
+                   + [{'id': 7, 'image_id': 100}]
+                   + [{'id': 8 + i, 'image_id': 300 + i} for i in range(4)])
+    groups = list(outofcore.iter_image_groups(images, annotations))
+
+    assert all(len(anns) <= 3 for img, anns in groups if img is None)
+    assert [ann['id'] for img, anns in groups if img is None for ann in anns] == [0, 1, 2, 3, 4, 5, 6,
+                                                                                   8, 9, 10, 11]
+    assert [(img['id'], len(anns)) for img, anns in groups if img is not None] == [(100, 1), (200, 0)]
@@ -0,0 +1,20 @@
+"""Tests for the cached figure rendering (plot_analysis.py)."""
+
+import plot_analysis
+
+
+def test_no_inputs_renders_nothing(tmp_path):
+    manifest_path = tmp_path / 'cache' / 'figures.json'
+    status = plot_analysis.render_all({}, tmp_path / 'analysis', manifest_path)
+    assert status == {}
+    assert not manifest_path.exists()
+
+
+def test_combined_without_rows_returns_early(tmp_path):
+    path = tmp_path / 'combined.png'
+    plot_analysis.render_figure('combined', {}, str(path))
+    assert not path.exists()
+
+
+def test_empty_splits_have_no_figure_inputs():
+    assert plot_analysis.figure_inputs({}) == {}
@@ -0,0 +1,93 @@
+"""Tests for compact record loading (records.py)."""
+
+import json
+
+from records import AnnotationTable, json_default, load_compact
+from conftest import write_coco
+
+
+def dump(data) -> str:
+    return json.dumps(data, default=json_default)
+
+
+def test_round_trip_is_identical(tmp_path):
+    data = {
+        'info': {'description': 'test'},
+        'categories': [{'id': 0, 'name': 'pedestrian'}, {'id': 1, 'name': 'cyclist'}],
+        'images': [
+            {'id': 1, 'file_name': 'nuimages_CAM_FRONT_a.jpg', 'width': 1600, 'height': 900,
+             'source': 'nuimages'},
+            {'id': 2, 'license': 1, 'file_name': 'b.jpg', 'height': 720, 'width': 1280},
+        ],
+        'annotations': [
+            {'id': 1, 'image_id': 1, 'category_id': 0, 'bbox': [1, 2, 3, 4], 'area': 12,
+             'iscrowd': 0},
+            {'id': 2, 'image_id': 1, 'category_id': 1, 'bbox': [1.5, 2.25, 3.0, 4],
+             'area': 12.0},
+            {'id': 3, 'image_id': 2, 'category_id': 0, 'segmentation': [], 'area': 10.5,
+             'bbox': [0.1, 123.456789, 16777217, 2], 'iscrowd': 0},
+            {'id': 4, 'image_id': 2, 'category_id': True, 'bbox': [0, 0, 1, 1], 'area': 1,
+             'iscrowd': 0},
+        ],
+    }
+    path = tmp_path / 'ann.json'
+    write_coco(path, data)
+
+    compact = load_compact(path)
+    assert dump(compact) == json.dumps(data)
+    assert 'iscrowd' not in compact['annotations'][1]
+    assert compact['annotations'][0]['area'] == 12 and type(compact['annotations'][0]['area']) is int
+    assert 'source' not in compact['images'][1]
+
+
+def test_non_float32_exact_bbox_is_kept_verbatim():
+    table = AnnotationTable()
+    table.append({'id': 1, 'image_id': 1, 'category_id': 0, 'bbox': [0.1, 2, 3, 4], 'area': 1.0})
+    table.append({'id': 2, 'image_id': 1, 'category_id': 0, 'bbox': [123.456789, 2, 3, 4],
+                  'area': 1.0})
+    assert 0 not in table._fallback
+    assert table._fallback[1]['bbox'][0] == 123.456789
+    assert table[1]['bbox'] == [123.456789, 2, 3, 4]
+
+
+def test_records_without_routing_keys_are_not_dropped(tmp_path):
+    data = {
+        'images': [{'id': 1, 'file_name': 'a.jpg', 'width': 10, 'height': 10},
+                   {'id': 2, 'width': 10, 'height': 10}],
+        'annotations': [{'id': 1, 'image_id': 1, 'category_id': 0, 'bbox': [1, 1, 2, 2], 'area': 4},
+                        {'id': 2, 'image_id': 1, 'category_id': 0, 'area': 4}],
+        'categories': [{'id': 0, 'name': 'pedestrian'}],
+    }
+    path = tmp_path / 'ann.json'
+    write_coco(path, data)
+
+    compact = load_compact(path)
+    assert len(compact['images']) == 2
+    assert len(compact['annotations']) == 2
+    assert dump(compact) == json.dumps(data)
+
+
+def test_record_shaped_objects_stay_in_their_list(tmp_path):
+    data = {
+        'info': {'file_name': 'release.zip'},
+        'images': [{'id': 1, 'file_name': 'a.jpg', 'width': 10, 'height': 10}],
+        'annotations': [{'id': 1, 'image_id': 1, 'category_id': 0, 'bbox': [1, 1, 2, 2],
+                         'area': 4, 'file_name': 'a.jpg'}],
+    }
+    path = tmp_path / 'ann.json'
+    write_coco(path, data)
+
+    compact = load_compact(path)
+    assert compact['info'] == {'file_name': 'release.zip'}
+    assert [img['id'] for img in compact['images']] == [1]
+    assert [ann['id'] for ann in compact['annotations']] == [1]
+    assert dump(compact) == json.dumps(data)
+
+
+def test_benchmark_split_round_trips(dataset):
+    path = dataset / 'valid' / '_annotations.coco.json'
+    with open(path) as f:
+        data = json.load(f)
+    compact = load_compact(path)
+    assert dump(compact) == json.dumps(data)
+    assert not compact['annotations']._fallback
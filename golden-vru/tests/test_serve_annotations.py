@@ -0,0 +1,53 @@
+"""Tests for the annotation server's indexes and pagination (serve_annotations.py)."""
+
+import pytest
+
+from conftest import write_coco
+from fingerprint import file_digest
+from serve_annotations import AnnotationStore, SplitIndex, page
+
+ITEMS = [f'{i:03d}.jpg' for i in range(10)]
+
+
+def test_page_clamps_negative_limit_and_offset():
+    assert page(ITEMS, {'limit': ['-5']})['items'] == []
+    assert page(ITEMS, {'offset': ['-3'], 'limit': ['2']})['items'] == ITEMS[:2]
+    assert page(ITEMS, {'after': ['004.jpg'], 'limit': ['2']})['items'] == ['005.jpg', '006.jpg']
+
+
+@pytest.mark.parametrize('query', [{'limit': ['ten']}, {'offset': ['']}])
+def test_page_rejects_non_integer_values(query):
+    with pytest.raises(ValueError):
+        page(ITEMS, query)
+
+
+def write_split(path):
+    write_coco(path, {
+        'categories': [{'id': 0, 'name': 'pedestrian'}],
+        'images': [{'id': 1, 'file_name': 'a.jpg', 'width': 10, 'height': 10}],
+        'annotations': [{'id': 1, 'image_id': 1, 'category_id': 0, 'bbox': [0, 0, 5, 5], 'area': 25}],
+    })
+
+
+def test_index_fingerprints_the_parsed_file(tmp_path):
+    path = tmp_path / 'valid' / '_annotations.coco.json'
+    write_split(path)
+    index = SplitIndex('valid', path)
+    assert index.fingerprint == file_digest(path)
+    assert index.signature[0] == path.stat().st_size
+    assert index.image('a.jpg')['annotations'][0]['category'] == 'pedestrian'
+
+
+def test_split_appearing_later_is_loaded(tmp_path):
+    write_split(tmp_path / 'valid' / '_annotations.coco.json')
+    store = AnnotationStore(tmp_path, ['train', 'valid'], 1 << 20)
+    store.load_all()
+    assert list(store.indexes) == ['valid']
+
+    store.refresh()
+    assert list(store.indexes) == ['valid'] and store.reloads == 0
+
+    write_split(tmp_path / 'train' / '_annotations.coco.json')
+    store.refresh()
+    assert sorted(store.indexes) == ['train', 'valid']
+    assert store.indexes['train'].image('a.jpg') is not None
@@ -0,0 +1,43 @@
+"""Tests for the size threshold sweep (threshold_sweep.py)."""
+
+import numpy as np
+
+import filter_small_objects
+import threshold_sweep
+from golden_vru import GoldenVRU
+
+
+def test_sweep_matches_filter_small_objects(dataset, monkeypatch):
+    data = GoldenVRU(dataset, ['train'])['train'].data
+    areas = sorted({ann['area'] for ann in data['annotations']})
+    # Include thresholds exactly equal to existing areas (kept: the filter removes area < t)
+    values = {16 * 16, 32 * 32, 48 * 48, areas[len(areas) // 4], areas[len(areas) // 2]}
+    thresholds = np.array(sorted(values), dtype=np.float64)
+
+    results = threshold_sweep.sweep_split(data, thresholds)
+    total = threshold_sweep.combine(results.values(), len(thresholds))
+    rows = threshold_sweep.threshold_rows(total, thresholds)
+
+    for threshold, row in zip(thresholds.tolist(), rows):
+        monkeypatch.setattr(filter_small_objects, 'SIZE_THRESHOLD', threshold)
+        _, stats = filter_small_objects.filter_small_objects(data)
+        assert row['removed_annotations'] == stats['removed_annotations']
+        assert row['images_removed'] == stats['removed_images']
+        assert row.get('removed_pedestrian', 0) == stats['small_pedestrian']
+        assert row.get('removed_cyclist', 0) == stats['small_cyclist']
+    assert any(row['removed_annotations'] for row in rows)
+
+
+def test_area_equal_to_threshold_is_kept():
+    data = {
+        'categories': [{'id': 0, 'name': 'pedestrian'}],
+        'images': [{'id': 0, 'file_name': 'a.jpg'}, {'id': 1, 'file_name': 'b.jpg'}],
+        'annotations': [{'id': 0, 'image_id': 0, 'category_id': 0, 'area': 1024},
+                        {'id': 1, 'image_id': 1, 'category_id': 0, 'area': 1023}],
+    }
+    thresholds = np.array([1024.0])
+    row = threshold_sweep.threshold_rows(
+        threshold_sweep.combine(threshold_sweep.sweep_split(data, thresholds).values(), 1), thresholds)[0]
+    _, stats = filter_small_objects.filter_small_objects(data)
+    assert row['removed_annotations'] == stats['removed_annotations'] == 1
+    assert row['images_removed'] == stats['removed_images'] == 1
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+What-if sweep over small-object size thresholds.
+
+filter_small_objects.py removes annotations with area < SIZE_THRESHOLD and
+then every image left without annotations. Checking another cutoff used to
+mean another dry run. This sweep evaluates many thresholds at once:
+
+1. Each split's annotation areas are sorted once per (category, source) group
+2. Each image's minimum and maximum annotation area is computed; an image
+   loses an annotation at threshold t if min < t, and is removed if max < t
+3. All thresholds are then counted with a single searchsorted per group
+
+For every threshold it reports annotations removed (by class), images removed
+(and images that lose at least one box) and the resulting pedestrian ratio,
+per split and per source.
+
+Usage:
+    python threshold_sweep.py [--thresholds 16x16,24x24,1024,...] [--by-source]
+                              [--compact] [--output FILE.csv]
+"""
+
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from filter_small_objects import SIZE_THRESHOLD, SPLITS, load_coco_annotations
+
+# Constants
+BASE_DIR = Path(__file__).parent
+DEFAULT_SIDES = range(8, 65, 2)  # 8x8 .. 64x64 px
+
+
+def parse_threshold(value: str) -> int:
+    """Parse an area threshold given as '1024' or '32x32'."""
+    if 'x' in value:
+        width, height = value.split('x')
+        return int(width) * int(height)
+    return int(value)
+
+
+def sweep_split(data: dict, thresholds: np.ndarray) -> dict:
+    """
+    Evaluate every threshold on one split's COCO data.
+
+    Returns per-source results, each holding the total counts and one array
+    (aligned with thresholds) per statistic:
+        {source: {'images': n, 'annotations': {cat: n},
+                  'removed': {cat: array}, 'images_removed': array,
+                  'images_touched': array}}
+    """
+    categories = {cat['id']: cat['name'] for cat in data['categories']}
+    images = data['images']
+    image_index = {img['id']: i for i, img in enumerate(images)}
+    source_names = sorted({img.get('source', 'unknown') for img in images})
+    source_codes = {name: code for code, name in enumerate(source_names)}
+    image_sources = np.fromiter((source_codes[img.get('source', 'unknown')] for img in images),
+                                dtype=np.int32, count=len(images))
+
+    anns = data['annotations']
+    areas = np.fromiter((ann['area'] for ann in anns), dtype=np.float64, count=len(anns))
+    ann_images = np.fromiter((image_index.get(ann['image_id'], -1) for ann in anns),
+                             dtype=np.int64, count=len(anns))
+    ann_categories = np.fromiter((ann['category_id'] for ann in anns), dtype=np.int64, count=len(anns))
+
+    # Annotations of unknown image IDs keep no image alive; they are reported as 'orphaned'
+    known = ann_images >= 0
+    ann_sources = np.full(len(anns), -1, dtype=np.int32)
+    ann_sources[known] = image_sources[ann_images[known]]
+
+    # Per-image min/max area (images without annotations: max = -inf, min = +inf)
+    max_area = np.full(len(images), -np.inf)
+    min_area = np.full(len(images), np.inf)
+    np.maximum.at(max_area, ann_images[known], areas[known])
+    np.minimum.at(min_area, ann_images[known], areas[known])
+
+    results = {}
+    groups = list(enumerate(source_names))
+    if not known.all():
+        groups.append((-1, 'orphaned'))
+
+    for code, source in groups:
+        in_source = image_sources == code
+        ann_mask = ann_sources == code
+
+        # An image is removed when all of its annotations are (or it has none)
+        entry = {
+            'images': int(in_source.sum()),
+            'annotations': {},
+            'removed': {},
+            'images_removed': np.searchsorted(np.sort(max_area[in_source]), thresholds, side='left'),
+            'images_touched': np.searchsorted(np.sort(min_area[in_source]), thresholds, side='left'),
+        }
+        for cat_id in np.unique(ann_categories[ann_mask]):
+            name = categories.get(int(cat_id), 'unknown')
+            group = np.sort(areas[ann_mask & (ann_categories == cat_id)])
+            entry['annotations'][name] = entry['annotations'].get(name, 0) + len(group)
+            entry['removed'][name] = (entry['removed'].get(name, 0)
+                                      + np.searchsorted(group, thresholds, side='left'))
+        results[source] = entry
+
+    return results
+
+
+def combine(results: List[dict], num_thresholds: int) -> dict:
+    """Sum per-source results (e.g. all sources of a split, or all splits)."""
+    zeros = np.zeros(num_thresholds, dtype=np.int64)
+    total = {'images': 0, 'annotations': {}, 'removed': {},
+             'images_removed': zeros.copy(), 'images_touched': zeros.copy()}
+    for entry in results:
+        total['images'] += entry['images']
+        total['images_removed'] = total['images_removed'] + entry['images_removed']
+        total['images_touched'] = total['images_touched'] + entry['images_touched']
+        for name, count in entry['annotations'].items():
+            total['annotations'][name] = total['annotations'].get(name, 0) + count
+            total['removed'][name] = total['removed'].get(name, zeros) + entry['removed'][name]
+    return total
+
+
+def threshold_rows(entry: dict, thresholds: np.ndarray) -> List[Dict[str, object]]:
+    """One row of statistics per threshold."""
+    names = sorted(entry['annotations'])
+    total_anns = sum(entry['annotations'].values())
+    rows = []
+    for k, threshold in enumerate(thresholds):
+        row = {'threshold': int(threshold), 'annotations': total_anns}
+        remaining = {}
+        for name in names:
+            row[f'removed_{name}'] = int(entry['removed'][name][k])
+            remaining[name] = entry['annotations'][name] - row[f'removed_{name}']
+        row['removed_annotations'] = sum(row[f'removed_{name}'] for name in names)
+        row['images'] = entry['images']
+        row['images_removed'] = int(entry['images_removed'][k])
+        row['images_touched'] = int(entry['images_touched'][k])
+        remaining_total = sum(remaining.values())
+        row['pedestrian_ratio'] = remaining.get('pedestrian', 0) / remaining_total if remaining_total else 0.0
+        rows.append(row)
+    return rows
+
+
+def print_table(title: str, rows: List[Dict[str, object]]):
+    """Print a sweep table, marking the current SIZE_THRESHOLD."""
+    print(f"\n{title}")
+    print(f"{'Threshold':>11} {'Ann removed':>13} {'Pedestrian':>11} {'Cyclist':>9} "
+          f"{'Img removed':>13} {'Img touched':>12} {'Ped ratio':>10}")
+    print("-" * 86)
+    for row in rows:
+        side = int(round(row['threshold'] ** 0.5))
+        label = f"{side}x{side}" if side * side == row['threshold'] else str(row['threshold'])
+        marker = '*' if row['threshold'] == SIZE_THRESHOLD else ' '
+        ann_pct = row['removed_annotations'] / row['annotations'] * 100 if row['annotations'] else 0.0
+        img_pct = row['images_removed'] / row['images'] * 100 if row['images'] else 0.0
+        print(f"{marker}{label:>10} {row['removed_annotations']:>8,} {ann_pct:>3.0f}% "
+              f"{row.get('removed_pedestrian', 0):>11,} {row.get('removed_cyclist', 0):>9,} "
+              f"{row['images_removed']:>8,} {img_pct:>3.0f}% {row['images_touched']:>12,} "
+              f"{row['pedestrian_ratio'] * 100:>9.1f}%")
+    print("-" * 86)
+
+
+def write_csv(path: Path, tables: Dict[tuple, List[Dict[str, object]]]):
+    """Write every (split, source) table as one long CSV."""
+    fieldnames = ['split', 'source']
+    for rows in tables.values():
+        for key in rows[0]:
+            if key not in fieldnames:
+                fieldnames.append(key)
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, restval=0)
+        writer.writeheader()
+        for (split, source), rows in tables.items():
+            for row in rows:
+                writer.writerow({'split': split, 'source': source, **row})
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Sweep small-object size thresholds')
+    parser.add_argument('--thresholds', help='Comma-separated areas or WxH sizes '
+                                             '(default: 8x8 to 64x64 in steps of 2 px)')
+    parser.add_argument('--by-source', action='store_true', help='Print a table per source')
+    parser.add_argument('--compact', action='store_true', help='Load annotations as compact records')
+    parser.add_argument('--output', type=Path, help='Write per-split, per-source results as CSV')
+    args = parser.parse_args()
+
+    if args.thresholds is not None:
+        try:
+            values = [parse_threshold(v) for v in args.thresholds.split(',') if v.strip()]
+        except ValueError:
+            parser.error(f"invalid --thresholds: {args.thresholds!r}")
+        if not values:
+            parser.error("--thresholds needs at least one area or WxH size")
+    else:
+        values = [side * side for side in DEFAULT_SIDES]
+    thresholds = np.array(sorted(set(values)), dtype=np.float64)
+
+    print("=" * 60)
+    print("Golden-VRU Size Threshold Sweep")
+    print("=" * 60)
+    print(f"\n{len(thresholds)} thresholds from {int(thresholds[0])} to {int(thresholds[-1])} px² "
+          f"(* = current {SIZE_THRESHOLD} px²)")
+
+    start = time.perf_counter()
+    per_split = {}
+    for split in SPLITS:
+        split_start = time.perf_counter()
+        data = load_coco_annotations(split, compact=args.compact)
+        per_split[split] = sweep_split(data, thresholds)
+        print(f"  {split}: {len(data['images']):,} images, {len(data['annotations']):,} annotations "
+              f"({time.perf_counter() - split_start:.2f}s)")
+        del data
+
+    tables = {}
+    for split, results in per_split.items():
+        tables[(split, 'all')] = threshold_rows(combine(results.values(), len(thresholds)), thresholds)
+        for source, entry in results.items():
+            tables[(split, source)] = threshold_rows(entry, thresholds)
+
+    all_results = [entry for results in per_split.values() for entry in results.values()]
+    print_table("All splits", threshold_rows(combine(all_results, len(thresholds)), thresholds))
+    for split in SPLITS:
+        print_table(f"{split.capitalize()}", tables[(split, 'all')])
+
+    if args.by_source:
+        sources = sorted({source for results in per_split.values() for source in results})
+        for source in sources:
+            entries = [results[source] for results in per_split.values() if source in results]
+            print_table(f"Source: {source}", threshold_rows(combine(entries, len(thresholds)), thresholds))
+
+    if args.output:
+        write_csv(args.output, tables)
+        print(f"\nResults written to {args.output}")
+
+    print(f"\nSwept {len(thresholds)} thresholds in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,28 +8,32 @@ Checks:
 3. No small objects remain (area >= 1024)
 4. Image counts match annotation file
 5. Annotation counts are consistent
+
+Splits are loaded and indexed through GoldenVRU (golden_vru.py); --compact
+loads them as compact records (records.py) to cut memory use.
+--leakage also checks for near-duplicate images across splits
+(find_duplicates.py, requires Pillow).
 """
 
-import json
 import os
 from collections import defaultdict
 from pathlib import Path
 from typing import Dict, List, Tuple
 
+from golden_vru import GoldenVRU
+
 # Constants
 BASE_DIR = Path(__file__).parent
 SPLITS = ['train', 'valid', 'test']
 SIZE_THRESHOLD = 32 * 32  # 1024 pixels
 
 
-def load_coco_annotations(split: str) -> dict:
-    """Load COCO annotations for a split."""
-    ann_path = BASE_DIR / split / '_annotations.coco.json'
-    with open(ann_path, 'r') as f:
-        return json.load(f)
+def load_coco_annotations(split: str, compact: bool = False) -> dict:
+    """Load COCO annotations for a split (as compact records with compact=True)."""
+    return GoldenVRU(BASE_DIR, [split], compact=compact)[split].data
 
 
-def validate_split(split: str) -> Tuple[bool, List[str]]:
+def validate_split(split: str, compact: bool = False) -> Tuple[bool, List[str]]:
     """Validate a single split."""
     errors = []
     warnings = []
@@ -38,17 +42,17 @@ def validate_split(split: str) -> Tuple[bool, List[str]]:
     print("-" * 40)
 
     # Load annotations
-    data = load_coco_annotations(split)
-    split_dir = BASE_DIR / split
+    dataset = GoldenVRU(BASE_DIR, [split], compact=compact)
+    data = dataset[split].data
+    split_dir = dataset.image_dir(split)
 
     # Get valid category IDs
-    valid_cat_ids = {cat['id'] for cat in data['categories']}
-    categories = {cat['id']: cat['name'] for cat in data['categories']}
+    categories = dataset[split].category_names
+    valid_cat_ids = set(categories)
     print(f"  Categories: {categories}")
 
-    # Build image ID to filename mapping
-    image_id_to_file = {img['id']: img['file_name'] for img in data['images']}
-    image_ids_in_annotations = set(image_id_to_file.keys())
+    # Image IDs present in the annotation file
+    image_ids_in_annotations = dataset[split].images_by_id
 
     # Check 1: All image files exist
     print(f"  Checking image files exist...")
@@ -146,18 +150,9 @@ def validate_split(split: str) -> Tuple[bool, List[str]]:
     print(f"    Images: {len(data['images']):,}")
     print(f"    Annotations: {len(data['annotations']):,}")
 
-    class_counts = defaultdict(int)
-    size_counts = {'medium': 0, 'large': 0}
-    SIZE_MEDIUM = 96 * 96
-
-    for ann in data['annotations']:
-        cat_name = categories.get(ann['category_id'], 'unknown')
-        class_counts[cat_name] += 1
-
-        if ann['area'] < SIZE_MEDIUM:
-            size_counts['medium'] += 1
-        else:
-            size_counts['large'] += 1
+    class_counts = dataset[split].class_distribution
+    size_dist = dataset[split].size_distribution
+    size_counts = {'medium': size_dist['small'] + size_dist['medium'], 'large': size_dist['large']}
 
     total = sum(class_counts.values())
     for cat_name, count in sorted(class_counts.items()):
@@ -170,7 +165,32 @@ def validate_split(split: str) -> Tuple[bool, List[str]]:
     return is_valid, errors, warnings
 
 
-def main():
+def check_leakage() -> Tuple[bool, List[str]]:
+    """Check for near-duplicate images across splits (train/test leakage)."""
+    from find_duplicates import find_near_duplicates
+
+    errors = []
+
+    print(f"\nChecking cross-split near-duplicates...")
+    print("-" * 40)
+    report = find_near_duplicates(BASE_DIR, SPLITS)
+
+    if report['cross_split_pairs'] == 0:
+        print(f"  [PASS] No near-duplicates across splits ({report['images']:,} images)")
+    else:
+        print(f"  [FAIL] {report['cross_split_pairs']:,} near-duplicate pairs across splits")
+        for key, count in sorted(report['pair_counts'].items()):
+            split_a, split_b = key.split('/')
+            if split_a != split_b:
+                errors.append(f"{count:,} near-duplicate pairs between {split_a} and {split_b}")
+        cross = [p for p in report['pairs'] if p['cross_split']]
+        for pair in cross[:5]:
+            errors.append(f"Near-duplicate: {pair['a']} <-> {pair['b']} (distance {pair['distance']})")
+
+    return len(errors) == 0, errors
+
+
+def main(compact: bool = False, leakage: bool = False):
     """Main validation function."""
     print("=" * 60)
     print("Golden-VRU Dataset Validation")
@@ -181,12 +201,18 @@ def main():
     all_warnings = []
 
     for split in SPLITS:
-        is_valid, errors, warnings = validate_split(split)
+        is_valid, errors, warnings = validate_split(split, compact=compact)
         if not is_valid:
             all_valid = False
             all_errors.extend([f"[{split}] {e}" for e in errors])
         all_warnings.extend([f"[{split}] {w}" for w in warnings])
 
+    if leakage:
+        is_clean, errors = check_leakage()
+        if not is_clean:
+            all_valid = False
+            all_errors.extend([f"[leakage] {e}" for e in errors])
+
     print("\n" + "=" * 60)
     print("VALIDATION RESULT")
     print("=" * 60)
@@ -211,4 +237,4 @@ def main():
 
 if __name__ == '__main__':
     import sys
-    sys.exit(main())
+    sys.exit(main(compact='--compact' in sys.argv, leakage='--leakage' in sys.argv))